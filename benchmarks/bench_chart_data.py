@@ -0,0 +1,107 @@
+"""
+Chart stage of the trend agent: the old temporary-CSV handoff (write the
+rows, inject pd.read_csv and os.remove into the plotting code) against
+run_chart() with the in-memory DataFrame, plus the data handoff alone,
+including a shared memory segment for out-of-process runs.
+
+Run from the repository root:
+
+    python benchmarks/bench_chart_data.py --rows 1000
+"""
+
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pandas as pd
+from langchain_experimental.utilities import PythonREPL
+
+from pipelines.common_files.columnar import ColumnarResult
+from pipelines.common_files.shared_frame import SharedFrame, attach_frame
+from pipelines.common_files.viz_utils import prepare_chart_code, run_chart
+
+PLOT = (
+    "import matplotlib.pyplot as plt\n"
+    "df['DAY'] = pd.to_datetime(df['TIMEUTC']).dt.date\n"
+    "counts = df.groupby('DAY')['ERRORS'].sum()\n"
+    "plt.figure(figsize=(8, 4))\n"
+    "plt.plot(counts.index, counts.values)\n"
+)
+
+
+def make_result(rows: int) -> ColumnarResult:
+    start = datetime.datetime(2025, 1, 1)
+    return ColumnarResult.from_rows(
+        ["TIMEUTC", "HOST", "ERRORS", "AVG_MS"],
+        [(start + datetime.timedelta(hours=i), f"web-{i % 8}", i % 17, i / 7) for i in range(rows)],
+    )
+
+
+def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main_bench():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = make_result(args.rows)
+    workdir = tempfile.mkdtemp()
+    chart = os.path.join(workdir, "chart.png")
+
+    def csv_path() -> str:
+        csv_filename = os.path.join(workdir, f"{uuid.uuid4()}.csv")
+        result.to_pandas().to_csv(csv_filename, index=False)
+        return csv_filename
+
+    def csv_handoff():
+        csv_filename = csv_path()
+        pd.read_csv(csv_filename)
+        os.remove(csv_filename)
+
+    def shared_handoff():
+        with SharedFrame(result.to_pandas()) as shared:
+            with attach_frame(shared.handle) as df:
+                del df
+
+    def old_chart():
+        csv_filename = csv_path()
+        code = (
+            f"import pandas as pd\ndf = pd.read_csv(r'{csv_filename}')\n"
+            + PLOT + f"\nimport os\nos.remove(r'{csv_filename}')"
+        )
+        PythonREPL().run(prepare_chart_code(code, chart))
+
+    def new_chart():
+        run_chart(PLOT, result.to_pandas(), chart)
+
+    print(f"{args.rows} rows")
+    handoff = timed(csv_handoff, args.repeat)
+    print(f"data: CSV write + read_csv     {handoff * 1000:8.2f} ms")
+    for name, fn in (("data: to_pandas (in process)", result.to_pandas),
+                     ("data: shared memory segment", shared_handoff)):
+        seconds = timed(fn, args.repeat)
+        print(f"{name:30} {seconds * 1000:8.2f} ms   ({handoff / seconds:.1f}x)")
+
+    old = timed(old_chart, args.repeat)
+    new = timed(new_chart, args.repeat)
+    print(f"chart stage, CSV handoff       {old * 1000:8.2f} ms")
+    print(f"chart stage, run_chart(df)     {new * 1000:8.2f} ms   ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main_bench()
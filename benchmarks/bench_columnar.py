@@ -0,0 +1,91 @@
+"""
+Memory held per request by a query result: the list of row tuples the
+agents used to pass around against the ColumnarResult execute_sql returns,
+plus the DataFrame a chart builds from each.
+
+Rows are shaped like an AuditTrail/ELMAH_Error join (ints, floats,
+timestamps, low-cardinality and free-text strings, some NULLs) and are
+created fresh per value, as a driver does. Run from the repository root:
+
+    python benchmarks/bench_columnar.py --rows 1000 --columns 20
+"""
+
+import argparse
+import datetime
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pandas as pd
+
+from pipelines.common_files.columnar import ColumnarResult
+
+
+def make_value(kind: int, row: int):
+    if kind == 0:
+        return row * 7919
+    if kind == 1:
+        return row / 3.0
+    if kind == 2:
+        return datetime.datetime(2025, 7, 1) + datetime.timedelta(minutes=row)
+    if kind == 3:
+        return "".join(["web-", str(row % 8)])
+    if kind == 4:
+        return f"Object reference not set to an instance of an object (request {row})"
+    return None if row % 5 == 0 else "".join(["role-", str(row % 3)])
+
+
+def fetch_rows(rows: int, columns: int):
+    return [tuple(make_value(c % 6, r) for c in range(columns)) for r in range(rows)]
+
+
+def retained(build) -> int:
+    """Bytes still allocated after `build()` returns, while its result is alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main_bench():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--columns", type=int, default=20)
+    args = parser.parse_args()
+    names = [f"COL_{c}" for c in range(args.columns)]
+
+    def tuples():
+        return fetch_rows(args.rows, args.columns)
+
+    def columnar():
+        return ColumnarResult.from_rows(names, fetch_rows(args.rows, args.columns))
+
+    def tuples_with_frame():
+        rows = fetch_rows(args.rows, args.columns)
+        return rows, pd.DataFrame(rows, columns=names)
+
+    def columnar_with_frame():
+        result = ColumnarResult.from_rows(names, fetch_rows(args.rows, args.columns))
+        return result, result.to_pandas()
+
+    print(f"{args.rows} rows x {args.columns} columns")
+    base = retained(tuples)
+    size = retained(columnar)
+    print(f"list of tuples            {base / 1024:9.1f} KB")
+    print(f"ColumnarResult            {size / 1024:9.1f} KB   ({base / size:.1f}x smaller)")
+    base = retained(tuples_with_frame)
+    size = retained(columnar_with_frame)
+    print(f"tuples + DataFrame        {base / 1024:9.1f} KB")
+    print(f"columnar + to_pandas()    {size / 1024:9.1f} KB   ({base / size:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main_bench()
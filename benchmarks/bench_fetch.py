@@ -0,0 +1,117 @@
+"""
+Fetching a large result: LangChain's SQLDatabase._execute (a dict per row,
+headers parsed from the SELECT clause; the old execute_sql_safe path)
+against sql_utils.execute_sql (raw DBAPI cursor, bulk fetchmany, tuples).
+Reports rows/second and the tracemalloc peak of each.
+
+Uses a SQLite file shaped like ELMAH_Error; pass --url and --sql to measure
+a real database instead. Run from the repository root:
+
+    python benchmarks/bench_fetch.py --rows 100000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import create_engine, text
+
+from pipelines.common_files.sql_utils import execute_sql, extract_column_names_from_sql
+
+SQL = "SELECT Sequence, Host, Type, Source, Message, StatusCode, TimeUtc FROM ELMAH_Error"
+
+
+def build_sqlite(path: str, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE ELMAH_Error (Sequence INTEGER PRIMARY KEY, Host VARCHAR(50), "
+            "Type VARCHAR(100), Source VARCHAR(60), Message VARCHAR(500), "
+            "StatusCode INTEGER, TimeUtc TIMESTAMP)"
+        ))
+        conn.execute(text(
+            "INSERT INTO ELMAH_Error VALUES (:seq, :host, :type, :source, :message, :status, :time)"
+        ), [
+            {
+                "seq": i,
+                "host": f"web-{i % 8:02d}",
+                "type": "System.NullReferenceException",
+                "source": "StaffConnect.Web",
+                "message": f"Object reference not set to an instance of an object (request {i})",
+                "status": 500 if i % 3 else 404,
+                "time": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:{i % 60:02d}:00",
+            }
+            for i in range(rows)
+        ])
+    engine.dispose()
+
+
+def langchain_path(db: SQLDatabase, sql: str, max_rows: int):
+    # execute_sql_safe before the cursor path
+    result = db._execute(sql)
+    headers = extract_column_names_from_sql(sql)
+    return headers, result[:max_rows]
+
+
+def cursor_path(db: SQLDatabase, sql: str, max_rows: int):
+    result = execute_sql(db, sql)
+    if result.error:
+        raise RuntimeError(result.error)
+    return result.headers, result.rows
+
+
+def measure(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        headers, rows = fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    headers, rows = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak, len(rows)
+
+
+def main_bench():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="")
+    parser.add_argument("--sql", default=SQL)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--arraysize", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    url = args.url
+    if not url:
+        db_path = os.path.join(tempfile.mkdtemp(), "fetch.db")
+        build_sqlite(db_path, args.rows)
+        url = f"sqlite:///{db_path}"
+
+    os.environ["SQL_MAX_ROWS"] = str(args.rows)
+    os.environ["SQL_FETCH_ARRAYSIZE"] = str(args.arraysize)
+    db = SQLDatabase(create_engine(url), include_tables=["ELMAH_Error"] if not args.url else None)
+
+    results = {
+        "SQLDatabase._execute": measure(lambda: langchain_path(db, args.sql, args.rows), args.repeat),
+        "execute_sql (cursor)": measure(lambda: cursor_path(db, args.sql, args.rows), args.repeat),
+    }
+    base_time, base_peak, _ = results["SQLDatabase._execute"]
+    for name, (seconds, peak, rows) in results.items():
+        print(
+            f"{name:22} {rows:8d} rows  {rows / seconds:12,.0f} rows/s  "
+            f"peak {peak / 2**20:7.1f} MB   ({base_time / seconds:.1f}x faster, "
+            f"{base_peak / peak:.1f}x less memory)"
+        )
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,118 @@
+"""
+Requests per second against the gateway with a large pipeline registry,
+comparing a full registry rebuild on every request (the old behaviour) with
+the cached, generation-counted registry.
+
+Run from the repository root:
+
+    python benchmarks/bench_registry.py --pipelines 90 --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+from pydantic import BaseModel
+
+import logging
+
+import main
+from config import API_KEY
+
+
+class Valves(BaseModel):
+    pipelines: list = ["*"]
+    priority: int = 0
+
+
+class FakePipe:
+    def __init__(self, i):
+        self.id = f"pipe_{i}"
+        self.name = f"Pipe {i}"
+        self.valves = Valves()
+
+
+class FakeFilter(FakePipe):
+    def __init__(self, i):
+        super().__init__(i)
+        self.id = f"filter_{i}"
+        self.type = "filter"
+
+
+class FakeManifold(FakePipe):
+    def __init__(self, i):
+        super().__init__(i)
+        self.id = f"manifold_{i}"
+        self.type = "manifold"
+
+    def pipelines(self):
+        # Providers typically build this list from an API call or config.
+        return [{"id": f"model-{n}", "name": f"model {n}"} for n in range(8)]
+
+
+def populate(count: int):
+    main.PIPELINE_MODULES.clear()
+    kinds = [FakePipe, FakeManifold, FakeFilter]
+    for i in range(count):
+        pipeline = kinds[i % len(kinds)](i)
+        main.PIPELINE_MODULES[pipeline.id] = pipeline
+        main.PIPELINE_NAMES[pipeline.id] = pipeline.id
+    main.REGISTRY.invalidate()
+
+
+async def run(path: str, requests: int, concurrency: int) -> float:
+    headers = {"Authorization": f"Bearer {API_KEY}"}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker(count):
+            for _ in range(count):
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(worker(requests // concurrency) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - start
+    return (requests // concurrency) * concurrency / elapsed
+
+
+def main_bench():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pipelines", type=int, default=90)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    populate(args.pipelines)
+    print(
+        f"{len(main.PIPELINE_MODULES)} pipeline modules, "
+        f"{len(main.REGISTRY.get())} registry entries"
+    )
+
+    cached_get_all_pipelines = main.get_all_pipelines
+
+    def rebuild_every_time():
+        main.REGISTRY.invalidate()
+        return main.REGISTRY.get()
+
+    for path in ("/", "/v1/models"):
+        main.get_all_pipelines = rebuild_every_time
+        before = asyncio.run(run(path, args.requests, args.concurrency))
+        main.get_all_pipelines = cached_get_all_pipelines
+        after = asyncio.run(run(path, args.requests, args.concurrency))
+        print(
+            f"GET {path:<11} rebuild per request: {before:8.1f} req/s   "
+            f"cached registry: {after:8.1f} req/s   ({after / before:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,106 @@
+"""
+Accuracy and latency of the local intent classifier against the LLM router,
+using leave-one-out over the labeled router examples: each question is
+classified by a classifier built from all the other examples.
+
+The LLM router is only measured when OPENAI_API_KEY is set. Run from the
+repository root:
+
+    python benchmarks/bench_router.py --threshold 0.75
+    OPENAI_API_KEY=... python benchmarks/bench_router.py --model gpt-4o-mini
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipelines.staffconnect_chat_files.intent_classifier import EXAMPLES_PATH, IntentClassifier
+from pipelines.staffconnect_chat_files.registry import agent_specs
+
+
+def load_examples(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [
+            (record["question"], record["route"])
+            for record in map(json.loads, filter(str.strip, f))
+        ]
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(name, latencies, correct, answered, total):
+    print(
+        f"{name:<18} accuracy {correct / max(answered, 1):6.1%}   "
+        f"coverage {answered / total:6.1%}   "
+        f"p50 {percentile(latencies, 0.5) * 1000:9.3f} ms   "
+        f"p95 {percentile(latencies, 0.95) * 1000:9.3f} ms"
+    )
+
+
+def bench_local(examples, threshold):
+    keywords = {spec.route: spec.keywords for spec in agent_specs() if spec.keywords}
+    decisions, latencies = [], []
+    for i, (question, _) in enumerate(examples):
+        classifier = IntentClassifier(
+            examples[:i] + examples[i + 1:], keywords=keywords, threshold=threshold
+        )
+        start = time.perf_counter()
+        decision = classifier.classify(question)
+        latencies.append(time.perf_counter() - start)
+        decisions.append(decision)
+
+    answered = [(d, route) for d, (_, route) in zip(decisions, examples) if d.route]
+    correct = sum(1 for d, route in answered if d.route == route)
+    report("local", latencies, correct, len(answered), len(examples))
+    return decisions
+
+
+def bench_llm(examples, model, decisions):
+    from langchain_openai import ChatOpenAI
+    from pipelines.staffconnect_chat_files.router_agent import create_router
+
+    router = create_router(ChatOpenAI(model=model, temperature=0))
+    routes, latencies = [], []
+    for question, _ in examples:
+        start = time.perf_counter()
+        routes.append(router.invoke({"question": question})["route"])
+        latencies.append(time.perf_counter() - start)
+
+    correct = sum(1 for route, (_, label) in zip(routes, examples) if route == label)
+    report(f"llm ({model})", latencies, correct, len(examples), len(examples))
+
+    # Local first, LLM for the rest; local latency is negligible next to the LLM.
+    combined = [d.route or route for d, route in zip(decisions, routes)]
+    combined_latencies = [0.0 if d.route else t for d, t in zip(decisions, latencies)]
+    correct = sum(1 for route, (_, label) in zip(combined, examples) if route == label)
+    report("local + llm", combined_latencies, correct, len(examples), len(examples))
+
+
+def main_bench():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--examples", default=EXAMPLES_PATH)
+    parser.add_argument("--threshold", type=float, default=0.75)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    args = parser.parse_args()
+
+    examples = load_examples(args.examples)
+    print(f"{len(examples)} labeled questions, threshold {args.threshold}")
+    decisions = bench_local(examples, args.threshold)
+
+    if os.getenv("OPENAI_API_KEY"):
+        bench_llm(examples, args.model, decisions)
+    else:
+        print("OPENAI_API_KEY not set; skipping the LLM router")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,86 @@
+"""
+Startup cost of building the staffconnect SQLDatabase: full schema
+reflection (the old behaviour) against a cold start that reflects only the
+agents' tables and writes a snapshot, and a warm start from that snapshot.
+
+Uses a SQLite file with many unrelated tables to stand in for a large
+Oracle schema; pass --url to measure a real database instead. Run from the
+repository root:
+
+    python benchmarks/bench_schema.py --tables 500
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import create_engine, text
+
+from pipelines.common_files.schema_cache import STAFFCONNECT_TABLES, SchemaCache
+
+
+def build_sqlite(path: str, tables: int, columns: int):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for name in list(STAFFCONNECT_TABLES) + [f"Other_{i}" for i in range(tables)]:
+            cols = ", ".join(f"col_{c} VARCHAR(50)" for c in range(columns))
+            conn.execute(text(f"CREATE TABLE {name} (id INTEGER PRIMARY KEY, {cols})"))
+            conn.execute(text(f"CREATE INDEX ix_{name} ON {name} (col_0)"))
+    engine.dispose()
+
+
+def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main_bench():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="")
+    parser.add_argument("--tables", type=int, default=500)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    workdir = tempfile.mkdtemp()
+    url = args.url
+    if not url:
+        db_path = os.path.join(workdir, "schema.db")
+        build_sqlite(db_path, args.tables, args.columns)
+        url = f"sqlite:///{db_path}"
+    snapshot_path = os.path.join(workdir, "schema_snapshot.pkl")
+
+    # A fresh engine per run, as after a process restart
+    def full():
+        SQLDatabase(create_engine(url))
+
+    def cold():
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+        SchemaCache(create_engine(url), snapshot_path).load_database()
+
+    def warm():
+        SchemaCache(create_engine(url), snapshot_path).load_database()
+
+    full_time = timed(full, args.repeat)
+    cold_time = timed(cold, args.repeat)
+    warm_time = timed(warm, args.repeat)
+    print(f"full reflection        {full_time * 1000:9.1f} ms")
+    print(f"cold start (5 tables)  {cold_time * 1000:9.1f} ms   ({full_time / cold_time:.1f}x)")
+    print(f"warm start (snapshot)  {warm_time * 1000:9.1f} ms   ({full_time / warm_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main_bench()
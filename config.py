@@ -22,3 +22,39 @@ LOG_LEVELS = {
 
 API_KEY = os.getenv("PIPELINES_API_KEY", "0p3n-w3bu!")
 PIPELINES_DIR = os.getenv("PIPELINES_DIR", "./pipelines")
+
+# Seconds a manifold's `pipelines()` listing stays cached. Empty means it is
+# only refreshed when the pipeline is reloaded or its valves change.
+PIPELINES_MANIFOLD_TTL = float(os.getenv("PIPELINES_MANIFOLD_TTL", "0") or 0) or None
+
+# Requests each pipeline serves at once (also the size of its thread pool for
+# synchronous `pipe()` implementations), and how many more may wait before the
+# gateway answers 429. Pipelines can override both with `max_concurrency` and
+# `max_queue` attributes.
+PIPELINES_MAX_CONCURRENCY = int(os.getenv("PIPELINES_MAX_CONCURRENCY", "8"))
+PIPELINES_MAX_QUEUE = int(os.getenv("PIPELINES_MAX_QUEUE", "32"))
+
+# Threads used to import pipeline modules in parallel.
+PIPELINES_LOAD_WORKERS = int(os.getenv("PIPELINES_LOAD_WORKERS", "8"))
+
+# Seconds a single pipeline's on_startup may take before it is disabled.
+PIPELINES_STARTUP_TIMEOUT = float(os.getenv("PIPELINES_STARTUP_TIMEOUT", "120"))
+
+# Hashes of each pipeline's frontmatter requirements, so unchanged pipelines
+# skip dependency resolution on the next start or reload.
+PIPELINES_REQUIREMENTS_STATE = os.getenv(
+    "PIPELINES_REQUIREMENTS_STATE",
+    os.path.join(PIPELINES_DIR, ".requirements_state.json"),
+)
+
+# Seconds a replaced pipeline may keep serving in-flight requests after a
+# reload before its on_shutdown is called anyway.
+PIPELINES_DRAIN_TIMEOUT = float(os.getenv("PIPELINES_DRAIN_TIMEOUT", "300"))
+
+# Reload pipelines automatically when files under PIPELINES_DIR change.
+# PIPELINES_WATCH_MODE is "auto" (inotify via watchdog, else polling),
+# "inotify" or "poll".
+PIPELINES_WATCH = os.getenv("PIPELINES_WATCH", "false").lower() == "true"
+PIPELINES_WATCH_MODE = os.getenv("PIPELINES_WATCH_MODE", "auto").lower()
+PIPELINES_WATCH_DEBOUNCE = float(os.getenv("PIPELINES_WATCH_DEBOUNCE", "1.0"))
+PIPELINES_WATCH_POLL_INTERVAL = float(os.getenv("PIPELINES_WATCH_POLL_INTERVAL", "2.0"))
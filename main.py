@@ -1,15 +1,27 @@
 from fastapi import FastAPI, Request, Depends, status, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.concurrency import run_in_threadpool
 
+from starlette.background import BackgroundTask
 from starlette.responses import StreamingResponse, Response
 from pydantic import BaseModel, ConfigDict
-from typing import List, Union, Generator, Iterator
+from typing import List, Union, Generator, Iterator, AsyncGenerator, AsyncIterator
 
 
 from utils.pipelines.auth import bearer_security, get_current_user
 from utils.pipelines.main import get_last_user_message, stream_message_template
 from utils.pipelines.misc import convert_to_raw_url
+from utils.pipelines.registry import PipelineRegistry
+from utils.pipelines.executor import PipelineExecutors, QueueFullError
+from utils.pipelines.coalesce import RequestCoalescer, request_key
+from utils.pipelines.metrics import MetricsRegistry
+from utils.pipelines.loader import diff_pipeline_files, run_hook, run_hooks
+from utils.pipelines.requirements import RequirementsResolver, parse_requirements
+from utils.pipelines.watcher import (
+    PipelineWatcher,
+    affected_modules,
+    module_dependencies,
+    purge_modules,
+)
 
 from contextlib import asynccontextmanager
 from concurrent.futures import ThreadPoolExecutor
@@ -18,17 +30,31 @@ from urllib.parse import urlparse
 
 import shutil
 import aiohttp
+import asyncio
 import os
 import importlib.util
 import logging
 import time
 import json
 import uuid
-import sys
-import subprocess
 
 
-from config import API_KEY, PIPELINES_DIR, LOG_LEVELS
+from config import (
+    API_KEY,
+    PIPELINES_DIR,
+    LOG_LEVELS,
+    PIPELINES_MANIFOLD_TTL,
+    PIPELINES_MAX_CONCURRENCY,
+    PIPELINES_MAX_QUEUE,
+    PIPELINES_LOAD_WORKERS,
+    PIPELINES_STARTUP_TIMEOUT,
+    PIPELINES_REQUIREMENTS_STATE,
+    PIPELINES_DRAIN_TIMEOUT,
+    PIPELINES_WATCH,
+    PIPELINES_WATCH_MODE,
+    PIPELINES_WATCH_DEBOUNCE,
+    PIPELINES_WATCH_POLL_INTERVAL,
+)
 
 if not os.path.exists(PIPELINES_DIR):
     os.makedirs(PIPELINES_DIR)
@@ -37,6 +63,101 @@ if not os.path.exists(PIPELINES_DIR):
 PIPELINES = {}
 PIPELINE_MODULES = {}
 PIPELINE_NAMES = {}
+# module name -> {"import": seconds, "startup": seconds, "status": ...}
+PIPELINE_LOAD_TIMES = {}
+# Phase -> seconds for the last startup or reload
+LOAD_TIMINGS = {}
+# module name -> fingerprint of the file it was last loaded from
+PIPELINE_FILES = {}
+# module name -> source files under PIPELINES_DIR that the module imports
+PIPELINE_DEPENDENCIES = {}
+# Serializes reloads; replaced pipelines drain in these background tasks.
+RELOAD_LOCK = asyncio.Lock()
+RETIRING_TASKS = set()
+
+# Built once and rebuilt only when a reload, upload, delete or valves update
+# invalidates it.
+REGISTRY = PipelineRegistry(PIPELINE_MODULES, manifold_ttl=PIPELINES_MANIFOLD_TTL)
+
+# Each pipeline gets its own bounded thread pool and wait queue; sync pipes
+# run there, async pipes are awaited directly on the event loop.
+PIPE_EXECUTORS = PipelineExecutors(
+    max_concurrency=PIPELINES_MAX_CONCURRENCY, max_queue=PIPELINES_MAX_QUEUE
+)
+
+# Pipeline modules are imported in parallel on this pool.
+LOADER_EXECUTOR = ThreadPoolExecutor(
+    max_workers=PIPELINES_LOAD_WORKERS, thread_name_prefix="pipeline-loader"
+)
+REQUIREMENTS = RequirementsResolver(PIPELINES_REQUIREMENTS_STATE)
+
+# Identical in-flight completions for pipelines with the `coalesce` valve on
+# share one run.
+COALESCER = RequestCoalescer()
+
+# Served from /metrics in the Prometheus text format. Latencies are labelled
+# with the requested model id, so percentiles can be computed per model.
+METRICS = MetricsRegistry()
+QUEUE_WAIT_SECONDS = METRICS.histogram(
+    "pipelines_queue_wait_seconds",
+    "Time a request waited for an admission slot.",
+    ("pipeline",),
+)
+PIPE_SECONDS = METRICS.histogram(
+    "pipelines_pipe_seconds",
+    "Time for pipe() to return its result or stream.",
+    ("pipeline",),
+)
+FIRST_CHUNK_SECONDS = METRICS.histogram(
+    "pipelines_first_chunk_seconds",
+    "Time from receiving a streaming request to sending its first SSE chunk.",
+    ("pipeline",),
+)
+STREAM_SECONDS = METRICS.histogram(
+    "pipelines_stream_duration_seconds",
+    "Total duration of streaming completions.",
+    ("pipeline",),
+)
+COMPLETION_SECONDS = METRICS.histogram(
+    "pipelines_completion_seconds",
+    "Total duration of non-streaming completions.",
+    ("pipeline",),
+)
+FILTER_SECONDS = METRICS.histogram(
+    "pipelines_filter_seconds",
+    "Time spent in filter inlet and outlet hooks.",
+    ("pipeline", "stage"),
+)
+ERRORS = METRICS.counter(
+    "pipelines_errors_total",
+    "Requests that failed with an exception.",
+    ("pipeline", "stage"),
+)
+REJECTED = METRICS.counter(
+    "pipelines_rejected_total",
+    "Requests rejected with 429 because the wait queue was full.",
+    ("pipeline",),
+)
+COALESCED = METRICS.counter(
+    "pipelines_coalesced_total",
+    "Requests served by joining an identical in-flight request.",
+    ("pipeline",),
+)
+INFLIGHT = METRICS.gauge(
+    "pipelines_inflight_requests",
+    "Requests currently being served.",
+    ("pipeline",),
+)
+QUEUE_DEPTH = METRICS.gauge(
+    "pipelines_queue_depth",
+    "Requests waiting for an admission slot.",
+    ("pipeline",),
+)
+PIPELINE_STATS = METRICS.gauge(
+    "pipelines_pipeline_stat",
+    "Values reported by a pipeline's optional metrics() hook, e.g. cache hits.",
+    ("pipeline", "name"),
+)
 
 # Add GLOBAL_LOG_LEVEL for Pipeplines
 log_level = os.getenv("GLOBAL_LOG_LEVEL", "INFO").upper()
@@ -44,70 +165,7 @@ logging.basicConfig(level=LOG_LEVELS[log_level])
 
 
 def get_all_pipelines():
-    pipelines = {}
-    for pipeline_id in PIPELINE_MODULES.keys():
-        pipeline = PIPELINE_MODULES[pipeline_id]
-
-        if hasattr(pipeline, "type"):
-            if pipeline.type == "manifold":
-                manifold_pipelines = []
-
-                # Check if pipelines is a function or a list
-                if callable(pipeline.pipelines):
-                    manifold_pipelines = pipeline.pipelines()
-                else:
-                    manifold_pipelines = pipeline.pipelines
-
-                for p in manifold_pipelines:
-                    manifold_pipeline_id = f'{pipeline_id}.{p["id"]}'
-
-                    manifold_pipeline_name = p["name"]
-                    if hasattr(pipeline, "name"):
-                        manifold_pipeline_name = (
-                            f"{pipeline.name}{manifold_pipeline_name}"
-                        )
-
-                    pipelines[manifold_pipeline_id] = {
-                        "module": pipeline_id,
-                        "type": pipeline.type if hasattr(pipeline, "type") else "pipe",
-                        "id": manifold_pipeline_id,
-                        "name": manifold_pipeline_name,
-                        "valves": (
-                            pipeline.valves if hasattr(pipeline, "valves") else None
-                        ),
-                    }
-            if pipeline.type == "filter":
-                pipelines[pipeline_id] = {
-                    "module": pipeline_id,
-                    "type": (pipeline.type if hasattr(pipeline, "type") else "pipe"),
-                    "id": pipeline_id,
-                    "name": (
-                        pipeline.name if hasattr(pipeline, "name") else pipeline_id
-                    ),
-                    "pipelines": (
-                        pipeline.valves.pipelines
-                        if hasattr(pipeline, "valves")
-                        and hasattr(pipeline.valves, "pipelines")
-                        else []
-                    ),
-                    "priority": (
-                        pipeline.valves.priority
-                        if hasattr(pipeline, "valves")
-                        and hasattr(pipeline.valves, "priority")
-                        else 0
-                    ),
-                    "valves": pipeline.valves if hasattr(pipeline, "valves") else None,
-                }
-        else:
-            pipelines[pipeline_id] = {
-                "module": pipeline_id,
-                "type": (pipeline.type if hasattr(pipeline, "type") else "pipe"),
-                "id": pipeline_id,
-                "name": (pipeline.name if hasattr(pipeline, "name") else pipeline_id),
-                "valves": pipeline.valves if hasattr(pipeline, "valves") else None,
-            }
-
-    return pipelines
+    return REGISTRY.get()
 
 
 def parse_frontmatter(content):
@@ -119,35 +177,52 @@ def parse_frontmatter(content):
     return frontmatter
 
 
-def install_frontmatter_requirements(requirements):
-    if requirements:
-        req_list = [req.strip() for req in requirements.split(",")]
-        for req in req_list:
-            print(f"Installing requirement: {req}")
-            subprocess.check_call([sys.executable, "-m", "pip", "install", req])
-    else:
-        print("No requirements found in frontmatter.")
+def read_frontmatter(module_path):
+    # Read the module content
+    with open(module_path, "r", encoding="utf-8", errors="replace") as file:
+        content = file.read()
 
+    # Parse frontmatter
+    frontmatter = {}
+    if content.startswith('"""'):
+        end = content.find('"""', 3)
+        if end != -1:
+            frontmatter_content = content[3:end]
+            frontmatter = parse_frontmatter(frontmatter_content)
+    return frontmatter
 
-async def load_module_from_path(module_name, module_path):
 
-    try:
-        # Read the module content
-        with open(module_path, "r", encoding="utf-8", errors="replace") as file:
-           content = file.read()
-
-        # Parse frontmatter
-        frontmatter = {}
-        if content.startswith('"""'):
-            end = content.find('"""', 3)
-            if end != -1:
-                frontmatter_content = content[3:end]
-                frontmatter = parse_frontmatter(frontmatter_content)
-
-        # Install requirements if specified
+async def install_frontmatter_requirements(module_paths):
+    """
+    Installs the frontmatter requirements of all given modules in one batch.
+    Modules whose requirements are unchanged since the last run are skipped.
+    """
+    pending = {}
+    for module_name, module_path in module_paths.items():
+        try:
+            frontmatter = read_frontmatter(module_path)
+        except OSError as e:
+            logging.error(f"Could not read {module_path}: {e}")
+            continue
         if "requirements" in frontmatter:
-            install_frontmatter_requirements(frontmatter["requirements"])
+            pending[module_name] = parse_requirements(frontmatter["requirements"])
+
+    if not pending:
+        print("No requirements found in frontmatter.")
+        return {"seconds": 0.0}
 
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(LOADER_EXECUTOR, REQUIREMENTS.resolve, pending)
+    except Exception as e:
+        # Modules with missing dependencies will fail to import and be reported there.
+        logging.error(f"Failed to install pipeline requirements: {e}")
+        return {"seconds": 0.0, "error": str(e)}
+
+
+def import_module_from_path(module_name, module_path):
+
+    try:
         # Load the module
         spec = importlib.util.spec_from_file_location(module_name, module_path)
         module = importlib.util.module_from_spec(spec)
@@ -174,86 +249,334 @@ async def load_module_from_path(module_name, module_path):
     return None
 
 
-async def load_modules_from_directory(directory):
-    global PIPELINE_MODULES
-    global PIPELINE_NAMES
-
-    for filename in os.listdir(directory):
-        if filename.endswith(".py"):
-            module_name = filename[:-3]  # Remove the .py extension
-            module_path = os.path.join(directory, filename)
-
-            # Create subfolder matching the filename without the .py extension
-            subfolder_path = os.path.join(directory, module_name)
-            if not os.path.exists(subfolder_path):
-                os.makedirs(subfolder_path)
-                logging.info(f"Created subfolder: {subfolder_path}")
-
-            # Create a valves.json file if it doesn't exist
-            valves_json_path = os.path.join(subfolder_path, "valves.json")
-            if not os.path.exists(valves_json_path):
-                with open(valves_json_path, "w") as f:
-                    json.dump({}, f)
-                logging.info(f"Created valves.json in: {subfolder_path}")
-
-            pipeline = await load_module_from_path(module_name, module_path)
-            if pipeline:
-                # Overwrite pipeline.valves with values from valves.json
-                if os.path.exists(valves_json_path):
-                    with open(valves_json_path, "r") as f:
-                        valves_json = json.load(f)
-                        if hasattr(pipeline, "valves"):
-                            ValvesModel = pipeline.valves.__class__
-                            # Create a ValvesModel instance using default values and overwrite with valves_json
-                            combined_valves = {
-                                **pipeline.valves.model_dump(),
-                                **valves_json,
-                            }
-                            valves = ValvesModel(**combined_valves)
-                            pipeline.valves = valves
+async def load_module_from_path(module_name, module_path):
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    pipeline = await loop.run_in_executor(
+        LOADER_EXECUTOR, import_module_from_path, module_name, module_path
+    )
+    PIPELINE_LOAD_TIMES[module_name] = {"import": time.perf_counter() - start}
+    return pipeline
+
+
+def prepare_module_folder(directory, module_name):
+    # Create subfolder matching the filename without the .py extension
+    subfolder_path = os.path.join(directory, module_name)
+    if not os.path.exists(subfolder_path):
+        os.makedirs(subfolder_path)
+        logging.info(f"Created subfolder: {subfolder_path}")
+
+    # Create a valves.json file if it doesn't exist
+    valves_json_path = os.path.join(subfolder_path, "valves.json")
+    if not os.path.exists(valves_json_path):
+        with open(valves_json_path, "w") as f:
+            json.dump({}, f)
+        logging.info(f"Created valves.json in: {subfolder_path}")
 
-                            logging.info(f"Updated valves for module: {module_name}")
+    return valves_json_path
 
-                pipeline_id = pipeline.id if hasattr(pipeline, "id") else module_name
-                PIPELINE_MODULES[pipeline_id] = pipeline
-                PIPELINE_NAMES[pipeline_id] = module_name
-                logging.info(f"Loaded module: {module_name}")
-            else:
-                logging.warning(f"No Pipeline class found in {module_name}")
 
+async def load_modules(directory, module_names):
+    """
+    Installs requirements for, imports and applies saved valves to the given
+    modules. Returns {pipeline_id: (module_name, pipeline)} for the modules
+    that loaded; nothing is registered yet.
+    """
+    requirements_stats = await install_frontmatter_requirements(
+        {
+            module_name: os.path.join(directory, f"{module_name}.py")
+            for module_name in module_names
+        }
+    )
+    LOAD_TIMINGS["requirements"] = requirements_stats["seconds"]
+    logging.info(f"Requirements: {requirements_stats}")
+
+    import_start = time.perf_counter()
+
+    # Import every module in the loader pool at once; results keep directory order.
+    pipelines = await asyncio.gather(
+        *(
+            load_module_from_path(module_name, os.path.join(directory, f"{module_name}.py"))
+            for module_name in module_names
+        )
+    )
+
+    LOAD_TIMINGS["import"] = time.perf_counter() - import_start
+
+    # Record which files under the directory each module imports, so a change
+    # to a shared helper reloads exactly the pipelines that use it.
+    loop = asyncio.get_running_loop()
+    dependencies = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                LOADER_EXECUTOR,
+                module_dependencies,
+                os.path.join(directory, f"{module_name}.py"),
+                directory,
+            )
+            for module_name in module_names
+        )
+    )
+    PIPELINE_DEPENDENCIES.update(zip(module_names, dependencies))
+
+    loaded = {}
+    for module_name, pipeline in zip(module_names, pipelines):
+        valves_json_path = prepare_module_folder(directory, module_name)
+
+        if pipeline:
+            # Overwrite pipeline.valves with values from valves.json
+            if os.path.exists(valves_json_path):
+                with open(valves_json_path, "r") as f:
+                    valves_json = json.load(f)
+                    if hasattr(pipeline, "valves"):
+                        ValvesModel = pipeline.valves.__class__
+                        # Create a ValvesModel instance using default values and overwrite with valves_json
+                        combined_valves = {
+                            **pipeline.valves.model_dump(),
+                            **valves_json,
+                        }
+                        valves = ValvesModel(**combined_valves)
+                        pipeline.valves = valves
+
+                        logging.info(f"Updated valves for module: {module_name}")
+
+            pipeline_id = pipeline.id if hasattr(pipeline, "id") else module_name
+            loaded[pipeline_id] = (module_name, pipeline)
+            logging.info(f"Loaded module: {module_name}")
+        else:
+            logging.warning(f"No Pipeline class found in {module_name}")
+
+    return loaded
+
+
+async def start_pipelines(pipelines, names):
+    """
+    Runs on_startup concurrently for {pipeline_id: pipeline} (module names come
+    from `names`). Returns the pipelines that started; one whose hook fails or
+    exceeds PIPELINES_STARTUP_TIMEOUT is left out instead of blocking the others.
+    """
+    startup_start = time.perf_counter()
+    results = await run_hooks(pipelines, "on_startup", PIPELINES_STARTUP_TIMEOUT)
+
+    started = {}
+    for pipeline_id, (hook_status, elapsed) in results.items():
+        load_times = PIPELINE_LOAD_TIMES.setdefault(names[pipeline_id], {})
+        load_times["startup"] = elapsed
+        load_times["status"] = hook_status
+
+        if hook_status in ("timeout", "error"):
+            logging.error(f"Pipeline {pipeline_id} not started: on_startup {hook_status}")
+        else:
+            started[pipeline_id] = pipelines[pipeline_id]
+
+    LOAD_TIMINGS["startup"] = time.perf_counter() - startup_start
+    return started
+
+
+def swap_pipelines(modules, names, changed_ids):
+    """Atomically publishes a new set of pipeline modules to request handlers."""
+    global PIPELINE_MODULES, PIPELINE_NAMES, PIPELINES
+
+    PIPELINE_MODULES = modules
+    PIPELINE_NAMES = names
+    REGISTRY.swap(modules, changed_ids)
+    PIPELINES = get_all_pipelines()
+    app.state.PIPELINES = PIPELINES
+
+
+async def retire_pipeline(pipeline_id, pipeline):
+    """Shuts down a replaced pipeline once its in-flight requests have finished."""
+    if not await REGISTRY.drain(pipeline, PIPELINES_DRAIN_TIMEOUT):
+        logging.warning(
+            f"Pipeline {pipeline_id} still has {REGISTRY.inflight(pipeline)} "
+            f"requests in flight after {PIPELINES_DRAIN_TIMEOUT}s; shutting down"
+        )
+    await run_hook(pipeline_id, pipeline, "on_shutdown", None)
+    if pipeline_id not in PIPELINE_MODULES:
+        PIPE_EXECUTORS.discard(pipeline_id)
+    logging.info(f"Retired pipeline: {pipeline_id}")
+
+
+def log_load_timings(module_names):
+    for module_name in module_names:
+        load_times = PIPELINE_LOAD_TIMES.get(module_name, {})
+        logging.info(
+            f"Pipeline {module_name}: import {load_times.get('import', 0):.2f}s, "
+            f"startup {load_times.get('startup', 0):.2f}s ({load_times.get('status', 'failed')})"
+        )
+    logging.info(
+        "Pipelines ready in {total:.2f}s (requirements {requirements:.2f}s, "
+        "import {import:.2f}s, startup {startup:.2f}s)".format(
+            **{"requirements": 0.0, "import": 0.0, "startup": 0.0, **LOAD_TIMINGS}
+        )
+    )
+
+
+async def load_modules_from_directory(directory):
     global PIPELINES
+
+    changed, _, fingerprints = diff_pipeline_files(directory, {})
+    loaded = await load_modules(directory, changed)
+
+    for pipeline_id, (module_name, pipeline) in loaded.items():
+        PIPELINE_MODULES[pipeline_id] = pipeline
+        PIPELINE_NAMES[pipeline_id] = module_name
+        # Files that failed to load stay unrecorded, so the next reload retries them.
+        PIPELINE_FILES[module_name] = fingerprints[module_name]
+
+    REGISTRY.invalidate()
     PIPELINES = get_all_pipelines()
 
 
 async def on_startup():
+    start = time.perf_counter()
+    LOAD_TIMINGS.clear()
     await load_modules_from_directory(PIPELINES_DIR)
 
-    for module in PIPELINE_MODULES.values():
-        if hasattr(module, "on_startup"):
-            await module.on_startup()
+    started = await start_pipelines(dict(PIPELINE_MODULES), PIPELINE_NAMES)
+    for pipeline_id in list(PIPELINE_MODULES.keys()):
+        if pipeline_id not in started:
+            PIPELINE_MODULES.pop(pipeline_id, None)
+            PIPELINE_FILES.pop(PIPELINE_NAMES.pop(pipeline_id, None), None)
+
+    REGISTRY.invalidate()
+    LOAD_TIMINGS["total"] = time.perf_counter() - start
+    log_load_timings(list(PIPELINE_LOAD_TIMES.keys()))
 
 
 async def on_shutdown():
-    for module in PIPELINE_MODULES.values():
-        if hasattr(module, "on_shutdown"):
-            await module.on_shutdown()
+    await COALESCER.wait()
+    await asyncio.gather(*RETIRING_TASKS)
+    await run_hooks(PIPELINE_MODULES, "on_shutdown")
 
 
-async def reload():
-    await on_shutdown()
-    # Clear existing pipelines
-    PIPELINES.clear()
-    PIPELINE_MODULES.clear()
-    PIPELINE_NAMES.clear()
-    # Load pipelines afresh
-    await on_startup()
+async def reload(full=False, modules=()):
+    """
+    Reloads the pipelines whose files were added, modified or removed since
+    they were last loaded. Unchanged pipelines keep running untouched, along
+    with their connections and caches. `full` reloads every pipeline.
+
+    `modules` names extra pipelines to reload because a file they import
+    changed; their cached imports are dropped first so the edit is picked up.
+
+    Replacements are imported and started off to the side, then swapped in
+    atomically, so requests never see a partially loaded registry. Replaced
+    pipelines keep serving their in-flight streams and are shut down once
+    those have drained. A pipeline whose new version fails to import or
+    start keeps running its old version; its file is retried on the next
+    reload.
+    """
+    async with RELOAD_LOCK:
+        start = time.perf_counter()
+        changed, removed, fingerprints = diff_pipeline_files(PIPELINES_DIR, PIPELINE_FILES)
+        if full:
+            changed = list(fingerprints.keys())
+        else:
+            changed += [
+                module_name
+                for module_name in modules
+                if module_name in fingerprints and module_name not in changed
+            ]
+
+        for module_name in modules:
+            purge_modules(PIPELINE_DEPENDENCIES.get(module_name, ()))
+
+        if not changed and not removed:
+            logging.info("Reload: no pipeline files changed.")
+            return
+
+        logging.info(f"Reload: changed {changed}, removed {removed}")
+        LOAD_TIMINGS.clear()
+
+        loaded = await load_modules(PIPELINES_DIR, changed) if changed else {}
+        loaded_names = {
+            pipeline_id: module_name for pipeline_id, (module_name, _) in loaded.items()
+        }
+        started = await start_pipelines(
+            {pipeline_id: pipeline for pipeline_id, (_, pipeline) in loaded.items()},
+            loaded_names,
+        )
+
+        started_modules = {loaded_names[pipeline_id] for pipeline_id in started}
+        failed = [module_name for module_name in changed if module_name not in started_modules]
+        for module_name in failed:
+            if module_name in PIPELINE_NAMES.values():
+                logging.error(f"Reload of {module_name} failed; keeping the running version")
+            else:
+                logging.error(f"Pipeline {module_name} failed to load")
+
+        # Only pipelines that were removed or have a started replacement retire.
+        stale_modules = started_modules | set(removed)
+        stale_ids = [
+            pipeline_id
+            for pipeline_id, module_name in PIPELINE_NAMES.items()
+            if module_name in stale_modules
+        ]
+
+        modules = {
+            pipeline_id: pipeline
+            for pipeline_id, pipeline in PIPELINE_MODULES.items()
+            if pipeline_id not in stale_ids
+        }
+        names = {
+            pipeline_id: module_name
+            for pipeline_id, module_name in PIPELINE_NAMES.items()
+            if pipeline_id not in stale_ids
+        }
+        modules.update(started)
+        names.update({pipeline_id: loaded_names[pipeline_id] for pipeline_id in started})
+
+        retired = {pipeline_id: PIPELINE_MODULES[pipeline_id] for pipeline_id in stale_ids}
+        swap_pipelines(modules, names, list(set(stale_ids) | set(started)))
+
+        for module_name in removed:
+            PIPELINE_LOAD_TIMES.pop(module_name, None)
+            PIPELINE_FILES.pop(module_name, None)
+            PIPELINE_DEPENDENCIES.pop(module_name, None)
+            REQUIREMENTS.forget(module_name)
+        for module_name in failed:
+            PIPELINE_FILES.pop(module_name, None)
+        PIPELINE_FILES.update(
+            {module_name: fingerprints[module_name] for module_name in started_modules}
+        )
+
+        for pipeline_id, pipeline in retired.items():
+            task = asyncio.create_task(retire_pipeline(pipeline_id, pipeline))
+            RETIRING_TASKS.add(task)
+            task.add_done_callback(RETIRING_TASKS.discard)
+
+        LOAD_TIMINGS["total"] = time.perf_counter() - start
+        log_load_timings(changed)
+
+
+async def reload_changed_files(paths):
+    """Watcher callback: reloads changed pipelines and the pipelines importing changed files."""
+    affected = affected_modules(paths, PIPELINE_DEPENDENCIES)
+    logging.info(f"Detected changes in {sorted(paths)}; dependents: {sorted(affected)}")
+    await reload(modules=affected)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await on_startup()
+
+    watcher = None
+    if PIPELINES_WATCH:
+        watcher = PipelineWatcher(
+            PIPELINES_DIR,
+            reload_changed_files,
+            debounce=PIPELINES_WATCH_DEBOUNCE,
+            poll_interval=PIPELINES_WATCH_POLL_INTERVAL,
+            mode=PIPELINES_WATCH_MODE,
+        )
+        watcher.start()
+
     yield
+
+    if watcher is not None:
+        await watcher.stop()
     await on_shutdown()
+    PIPE_EXECUTORS.shutdown()
 
 
 app = FastAPI(docs_url="/docs", redoc_url=None, lifespan=lifespan)
@@ -275,52 +598,72 @@ app.add_middleware(
 
 @app.middleware("http")
 async def check_url(request: Request, call_next):
-    start_time = int(time.time())
+    start_time = time.perf_counter()
     app.state.PIPELINES = get_all_pipelines()
     response = await call_next(request)
-    process_time = int(time.time()) - start_time
-    response.headers["X-Process-Time"] = str(process_time)
+    process_time = time.perf_counter() - start_time
+    response.headers["X-Process-Time"] = f"{process_time:.6f}"
 
     return response
 
 
+def build_models_response(pipelines: dict) -> bytes:
+    return json.dumps(
+        {
+            "data": [
+                {
+                    "id": pipeline["id"],
+                    "name": pipeline["name"],
+                    "object": "model",
+                    "created": int(time.time()),
+                    "owned_by": "openai",
+                    "pipeline": {
+                        "type": pipeline["type"],
+                        **(
+                            {
+                                "pipelines": (
+                                    pipeline["valves"].pipelines
+                                    if pipeline.get("valves", None)
+                                    else []
+                                ),
+                                "priority": pipeline.get("priority", 0),
+                            }
+                            if pipeline.get("type", "pipe") == "filter"
+                            else {}
+                        ),
+                        "valves": pipeline["valves"] != None,
+                    },
+                }
+                for pipeline in pipelines.values()
+            ],
+            "object": "list",
+            "pipelines": True,
+        }
+    ).encode("utf-8")
+
+
+# (pipelines dict the body was rendered from, serialized body)
+MODELS_RESPONSE_CACHE = (None, b"")
+
+
 @app.get("/v1/models")
 @app.get("/models")
 async def get_models(user: str = Depends(get_current_user)):
     """
     Returns the available pipelines
     """
+    global MODELS_RESPONSE_CACHE
+
     app.state.PIPELINES = get_all_pipelines()
-    return {
-        "data": [
-            {
-                "id": pipeline["id"],
-                "name": pipeline["name"],
-                "object": "model",
-                "created": int(time.time()),
-                "owned_by": "openai",
-                "pipeline": {
-                    "type": pipeline["type"],
-                    **(
-                        {
-                            "pipelines": (
-                                pipeline["valves"].pipelines
-                                if pipeline.get("valves", None)
-                                else []
-                            ),
-                            "priority": pipeline.get("priority", 0),
-                        }
-                        if pipeline.get("type", "pipe") == "filter"
-                        else {}
-                    ),
-                    "valves": pipeline["valves"] != None,
-                },
-            }
-            for pipeline in app.state.PIPELINES.values()
-        ],
-        "object": "list",
-        "pipelines": True,
-    }
+
+    # The registry hands back the same dict until it is rebuilt, so the
+    # serialized listing can be reused until then.
+    pipelines, content = MODELS_RESPONSE_CACHE
+    if pipelines is not app.state.PIPELINES:
+        content = build_models_response(app.state.PIPELINES)
+        MODELS_RESPONSE_CACHE = (app.state.PIPELINES, content)
+
+    return Response(content=content, media_type="application/json")
 
 
 @app.get("/v1")
@@ -348,9 +691,11 @@ async def list_pipelines(user: str = Depends(get_current_user)):
                         if hasattr(PIPELINE_MODULES[pipeline_id], "valves")
                         else False
                     ),
+                    "load": PIPELINE_LOAD_TIMES.get(PIPELINE_NAMES[pipeline_id], {}),
                 }
                 for pipeline_id in list(PIPELINE_MODULES.keys())
-            ]
+            ],
+            "timings": LOAD_TIMINGS,
         }
     else:
         raise HTTPException(
@@ -359,6 +704,40 @@ async def list_pipelines(user: str = Depends(get_current_user)):
         )
 
 
+@app.get("/v1/pipelines/executors")
+@app.get("/pipelines/executors")
+async def list_pipeline_executors(user: str = Depends(get_current_user)):
+    if user == API_KEY:
+        return {"data": PIPE_EXECUTORS.stats()}
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key",
+        )
+
+
+@app.get("/metrics")
+async def get_metrics(user: str = Depends(get_current_user)):
+    if user == API_KEY:
+        for pipeline_id, stats in PIPE_EXECUTORS.stats().items():
+            QUEUE_DEPTH.set(stats["queued"], pipeline=pipeline_id)
+        for pipeline_id, module in list(PIPELINE_MODULES.items()):
+            hook = getattr(module, "metrics", None)
+            if not callable(hook):
+                continue
+            try:
+                for name, value in hook().items():
+                    PIPELINE_STATS.set(value, pipeline=pipeline_id, name=name)
+            except Exception as e:
+                logging.warning(f"metrics() of pipeline {pipeline_id} failed: {e}")
+        return Response(content=METRICS.render(), media_type=METRICS.CONTENT_TYPE)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key",
+        )
+
+
 class AddPipelineForm(BaseModel):
     url: str
 
@@ -479,10 +858,7 @@ async def delete_pipeline(
     pipeline_id = form_data.id
     pipeline_name = PIPELINE_NAMES.get(pipeline_id.split(".")[0], None)
 
-    if PIPELINE_MODULES[pipeline_id]:
-        if hasattr(PIPELINE_MODULES[pipeline_id], "on_shutdown"):
-            await PIPELINE_MODULES[pipeline_id].on_shutdown()
-
+    # The reload below notices the missing file and shuts the pipeline down.
     pipeline_path = os.path.join(PIPELINES_DIR, f"{pipeline_name}.py")
     if os.path.exists(pipeline_path):
         os.remove(pipeline_path)
@@ -500,9 +876,9 @@ async def delete_pipeline(
 
 @app.post("/v1/pipelines/reload")
 @app.post("/pipelines/reload")
-async def reload_pipelines(user: str = Depends(get_current_user)):
+async def reload_pipelines(full: bool = False, user: str = Depends(get_current_user)):
     if user == API_KEY:
-        await reload()
+        await reload(full=full)
         return {"message": "Pipelines reloaded successfully."}
     else:
         raise HTTPException(
@@ -514,14 +890,13 @@ async def reload_pipelines(user: str = Depends(get_current_user)):
 @app.get("/v1/{pipeline_id}/valves")
 @app.get("/{pipeline_id}/valves")
 async def get_valves(pipeline_id: str):
-    if pipeline_id not in PIPELINE_MODULES:
+    pipeline = PIPELINE_MODULES.get(pipeline_id)
+    if pipeline is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Pipeline {pipeline_id} not found",
         )
 
-    pipeline = PIPELINE_MODULES[pipeline_id]
-
     if hasattr(pipeline, "valves") is False:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -534,14 +909,13 @@ async def get_valves(pipeline_id: str):
 @app.get("/v1/{pipeline_id}/valves/spec")
 @app.get("/{pipeline_id}/valves/spec")
 async def get_valves_spec(pipeline_id: str):
-    if pipeline_id not in PIPELINE_MODULES:
+    pipeline = PIPELINE_MODULES.get(pipeline_id)
+    if pipeline is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Pipeline {pipeline_id} not found",
         )
 
-    pipeline = PIPELINE_MODULES[pipeline_id]
-
     if hasattr(pipeline, "valves") is False:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -555,14 +929,14 @@ async def get_valves_spec(pipeline_id: str):
 @app.post("/{pipeline_id}/valves/update")
 async def update_valves(pipeline_id: str, form_data: dict):
 
-    if pipeline_id not in PIPELINE_MODULES:
+    pipeline = PIPELINE_MODULES.get(pipeline_id)
+    module_name = PIPELINE_NAMES.get(pipeline_id)
+    if pipeline is None or module_name is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Pipeline {pipeline_id} not found",
         )
 
-    pipeline = PIPELINE_MODULES[pipeline_id]
-
     if hasattr(pipeline, "valves") is False:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -575,7 +949,7 @@ async def update_valves(pipeline_id: str, form_data: dict):
         pipeline.valves = valves
 
         # Determine the directory path for the valves.json file
-        subfolder_path = os.path.join(PIPELINES_DIR, PIPELINE_NAMES[pipeline_id])
+        subfolder_path = os.path.join(PIPELINES_DIR, module_name)
         valves_json_path = os.path.join(subfolder_path, "valves.json")
 
         # Save the updated valves data back to the valves.json file
@@ -584,6 +958,8 @@ async def update_valves(pipeline_id: str, form_data: dict):
 
         if hasattr(pipeline, "on_valves_updated"):
             await pipeline.on_valves_updated()
+
+        REGISTRY.invalidate(pipeline_id)
     except Exception as e:
         print(e)
         raise HTTPException(
@@ -610,8 +986,16 @@ async def filter_inlet(pipeline_id: str, form_data: FilterForm):
     except:
         pass
 
-    pipeline = PIPELINE_MODULES[pipeline_id]
+    pipeline = PIPELINE_MODULES.get(pipeline_id)
+    if pipeline is None:
+        # Swapped out by a reload since the registry snapshot was taken.
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Filter {pipeline_id} not found",
+        )
 
+    REGISTRY.acquire(pipeline)
+    start_time = time.perf_counter()
     try:
         if hasattr(pipeline, "inlet"):
             body = await pipeline.inlet(form_data.body, form_data.user)
@@ -620,10 +1004,16 @@ async def filter_inlet(pipeline_id: str, form_data: FilterForm):
             return form_data.body
     except Exception as e:
         print(e)
+        ERRORS.inc(pipeline=pipeline_id, stage="inlet")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"{str(e)}",
         )
+    finally:
+        FILTER_SECONDS.observe(
+            time.perf_counter() - start_time, pipeline=pipeline_id, stage="inlet"
+        )
+        REGISTRY.release(pipeline)
 
 
 @app.post("/v1/{pipeline_id}/filter/outlet")
@@ -642,8 +1032,16 @@ async def filter_outlet(pipeline_id: str, form_data: FilterForm):
     except:
         pass
 
-    pipeline = PIPELINE_MODULES[pipeline_id]
+    pipeline = PIPELINE_MODULES.get(pipeline_id)
+    if pipeline is None:
+        # Swapped out by a reload since the registry snapshot was taken.
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Filter {pipeline_id} not found",
+        )
 
+    REGISTRY.acquire(pipeline)
+    start_time = time.perf_counter()
     try:
         if hasattr(pipeline, "outlet"):
             body = await pipeline.outlet(form_data.body, form_data.user)
@@ -652,15 +1050,22 @@ async def filter_outlet(pipeline_id: str, form_data: FilterForm):
             return form_data.body
     except Exception as e:
         print(e)
+        ERRORS.inc(pipeline=pipeline_id, stage="outlet")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"{str(e)}",
         )
+    finally:
+        FILTER_SECONDS.observe(
+            time.perf_counter() - start_time, pipeline=pipeline_id, stage="outlet"
+        )
+        REGISTRY.release(pipeline)
 
 
 @app.post("/v1/chat/completions")
 @app.post("/chat/completions")
 async def generate_openai_chat_completion(form_data: OpenAIChatCompletionForm):
+    request_start = time.perf_counter()
     messages = [message.model_dump() for message in form_data.messages]
     user_message = get_last_user_message(messages)
 
@@ -673,119 +1078,251 @@ async def generate_openai_chat_completion(form_data: OpenAIChatCompletionForm):
             detail=f"Pipeline {form_data.model} not found",
         )
 
-    def job():
-        print(form_data.model)
+    pipeline = app.state.PIPELINES[form_data.model]
+    pipeline_id = form_data.model
 
-        pipeline = app.state.PIPELINES[form_data.model]
-        pipeline_id = form_data.model
+    if pipeline["type"] == "manifold":
+        manifold_id, pipeline_id = pipeline_id.split(".", 1)
+        module_id = manifold_id
+    else:
+        module_id = pipeline_id
+    module = PIPELINE_MODULES.get(module_id)
 
-        print(pipeline_id)
+    if module is None:
+        # Swapped out by a reload since the registry snapshot was taken.
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Pipeline {form_data.model} not found",
+        )
+    pipe = module.pipe
+    executor, limiter = PIPE_EXECUTORS.get(module_id, module)
+
+    pipe_kwargs = {
+        "user_message": user_message,
+        "model_id": pipeline_id,
+        "messages": messages,
+        "body": form_data.model_dump(),
+    }
 
-        if pipeline["type"] == "manifold":
-            manifold_id, pipeline_id = pipeline_id.split(".", 1)
-            pipe = PIPELINE_MODULES[manifold_id].pipe
-        else:
-            pipe = PIPELINE_MODULES[pipeline_id].pipe
+    async def call_pipe():
+        start_time = time.perf_counter()
+        res = await executor.call(pipe, **pipe_kwargs)
+        PIPE_SECONDS.observe(time.perf_counter() - start_time, pipeline=form_data.model)
+        return res
 
-        if form_data.stream:
+    async def generate_completion():
+        res = await call_pipe()
+        logging.info(f"stream:false:{res}")
 
-            def stream_content():
-                res = pipe(
-                    user_message=user_message,
-                    model_id=pipeline_id,
-                    messages=messages,
-                    body=form_data.model_dump(),
-                )
-                logging.info(f"stream:true:{res}")
-
-                if isinstance(res, str):
-                    message = stream_message_template(form_data.model, res)
-                    logging.info(f"stream_content:str:{message}")
-                    yield f"data: {json.dumps(message)}\n\n"
-
-                if isinstance(res, Iterator):
-                    for line in res:
-                        if isinstance(line, BaseModel):
-                            line = line.model_dump_json()
-                            line = f"data: {line}"
-
-                        elif isinstance(line, dict):
-                            line = json.dumps(line)
-                            line = f"data: {line}"
-
-                        try:
-                            line = line.decode("utf-8")
-                            logging.info(f"stream_content:Generator:{line}")
-                        except:
-                            pass
-
-                        if isinstance(line, str) and line.startswith("data:"):
-                            yield f"{line}\n\n"
-                        else:
-                            line = stream_message_template(form_data.model, line)
-                            yield f"data: {json.dumps(line)}\n\n"
-
-                if isinstance(res, str) or isinstance(res, Generator):
-                    finish_message = {
-                        "id": f"{form_data.model}-{str(uuid.uuid4())}",
-                        "object": "chat.completion.chunk",
-                        "created": int(time.time()),
-                        "model": form_data.model,
-                        "choices": [
-                            {
-                                "index": 0,
-                                "delta": {},
-                                "logprobs": None,
-                                "finish_reason": "stop",
-                            }
-                        ],
-                    }
+        if isinstance(res, dict):
+            return res
+        elif isinstance(res, BaseModel):
+            return res.model_dump()
+        else:
 
-                    yield f"data: {json.dumps(finish_message)}\n\n"
-                    yield f"data: [DONE]"
+            message = ""
 
-            return StreamingResponse(stream_content(), media_type="text/event-stream")
-        else:
-            res = pipe(
-                user_message=user_message,
-                model_id=pipeline_id,
-                messages=messages,
-                body=form_data.model_dump(),
-            )
-            logging.info(f"stream:false:{res}")
+            if isinstance(res, str):
+                message = res
 
-            if isinstance(res, dict):
-                return res
-            elif isinstance(res, BaseModel):
-                return res.model_dump()
-            else:
+            if isinstance(res, (Generator, AsyncGenerator)):
+                async for stream in executor.iterate(res):
+                    if isinstance(stream, dict) and "event" in stream:
+                        # Status events only mean something to streaming clients.
+                        continue
+                    message = f"{message}{stream}"
 
-                message = ""
+            logging.info(f"stream:false:{message}")
+            return {
+                "id": f"{form_data.model}-{str(uuid.uuid4())}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": form_data.model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {
+                            "role": "assistant",
+                            "content": message,
+                        },
+                        "logprobs": None,
+                        "finish_reason": "stop",
+                    }
+                ],
+            }
 
-                if isinstance(res, str):
-                    message = res
+    coalesce_key = None
+    if getattr(getattr(module, "valves", None), "coalesce", False):
+        coalesce_key = request_key(form_data.model, messages, form_data.stream)
 
-                if isinstance(res, Generator):
-                    for stream in res:
-                        message = f"{message}{stream}"
+    def join_leader():
+        # Subscribe to an identical request that is already running, if any.
+        if coalesce_key is None:
+            return None
+        if form_data.stream:
+            follower = COALESCER.join_stream(coalesce_key)
+            if follower is not None:
+                return StreamingResponse(follower, media_type="text/event-stream")
+            return None
+        return COALESCER.join(coalesce_key)
+
+    # Pin this instance and its executor before waiting for a slot: a reload
+    # that replaces either while the request is queued must not shut it down
+    # underneath us.
+    REGISTRY.acquire(module)
+    executor.lease()
+    admitted = False
+    try:
+        follower = join_leader()
+        if follower is not None:
+            COALESCED.inc(pipeline=form_data.model)
+            return follower if form_data.stream else await follower
+
+        # Fails fast with 429 once this pipeline's wait queue is full.
+        try:
+            admitted_at = await limiter.acquire()
+        except QueueFullError as e:
+            REJECTED.inc(pipeline=form_data.model)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Pipeline {form_data.model} is busy, retry later",
+                headers={"Retry-After": str(e.retry_after)},
+            )
 
-                logging.info(f"stream:false:{message}")
-                return {
+        QUEUE_WAIT_SECONDS.observe(admitted_at - request_start, pipeline=form_data.model)
+
+        # A leader may have started while this request was queued.
+        follower = join_leader()
+        if follower is not None:
+            limiter.release()
+            COALESCED.inc(pipeline=form_data.model)
+            return follower if form_data.stream else await follower
+
+        admitted = True
+    finally:
+        # From here on the completion or stream below releases the pin.
+        if not admitted:
+            executor.release()
+            REGISTRY.release(module)
+
+    INFLIGHT.inc(pipeline=form_data.model)
+
+    if form_data.stream:
+
+        released = False
+
+        def release_stream():
+            # Runs once, from the stream's finally or from the response's
+            # background task, whichever comes first.
+            nonlocal released
+            if released:
+                return
+            released = True
+            STREAM_SECONDS.observe(
+                time.perf_counter() - request_start, pipeline=form_data.model
+            )
+            INFLIGHT.dec(pipeline=form_data.model)
+            limiter.release(admitted_at)
+            executor.release()
+            REGISTRY.release(module)
+
+        async def release_unconsumed():
+            # The body is never iterated if the client goes away before it starts.
+            release_stream()
+
+        async def stream_content():
+            # Keeps a replaced pipeline alive until this stream has finished.
+            first_chunk = True
+            try:
+                async for chunk in generate_stream():
+                    if first_chunk:
+                        first_chunk = False
+                        FIRST_CHUNK_SECONDS.observe(
+                            time.perf_counter() - request_start, pipeline=form_data.model
+                        )
+                    yield chunk
+            except Exception:
+                ERRORS.inc(pipeline=form_data.model, stage="stream")
+                raise
+            finally:
+                release_stream()
+
+        async def generate_stream():
+            res = await call_pipe()
+            logging.info(f"stream:true:{res}")
+
+            if isinstance(res, str):
+                message = stream_message_template(form_data.model, res)
+                logging.info(f"stream_content:str:{message}")
+                yield f"data: {json.dumps(message)}\n\n"
+
+            if isinstance(res, (Iterator, AsyncIterator)):
+                async for line in executor.iterate(res):
+                    if isinstance(line, BaseModel):
+                        line = line.model_dump_json()
+                        line = f"data: {line}"
+
+                    elif isinstance(line, dict):
+                        line = json.dumps(line)
+                        line = f"data: {line}"
+
+                    try:
+                        line = line.decode("utf-8")
+                        logging.info(f"stream_content:Generator:{line}")
+                    except:
+                        pass
+
+                    if isinstance(line, str) and line.startswith("data:"):
+                        yield f"{line}\n\n"
+                    else:
+                        line = stream_message_template(form_data.model, line)
+                        yield f"data: {json.dumps(line)}\n\n"
+
+            if isinstance(res, (str, Generator, AsyncGenerator)):
+                finish_message = {
                     "id": f"{form_data.model}-{str(uuid.uuid4())}",
-                    "object": "chat.completion",
+                    "object": "chat.completion.chunk",
                     "created": int(time.time()),
                     "model": form_data.model,
                     "choices": [
                         {
                             "index": 0,
-                            "message": {
-                                "role": "assistant",
-                                "content": message,
-                            },
+                            "delta": {},
                             "logprobs": None,
                             "finish_reason": "stop",
                         }
                     ],
                 }
 
-    return await run_in_threadpool(job)
+                yield f"data: {json.dumps(finish_message)}\n\n"
+                yield f"data: [DONE]"
+
+        if coalesce_key is not None:
+            # The coalescer drains the stream in a task of its own.
+            content = COALESCER.lead_stream(coalesce_key, stream_content())
+            return StreamingResponse(content, media_type="text/event-stream")
+        return StreamingResponse(
+            stream_content(),
+            media_type="text/event-stream",
+            background=BackgroundTask(release_unconsumed),
+        )
+    else:
+
+        async def complete():
+            try:
+                return await generate_completion()
+            except Exception:
+                ERRORS.inc(pipeline=form_data.model, stage="pipe")
+                raise
+            finally:
+                COMPLETION_SECONDS.observe(
+                    time.perf_counter() - request_start, pipeline=form_data.model
+                )
+                INFLIGHT.dec(pipeline=form_data.model)
+                limiter.release(admitted_at)
+                executor.release()
+                REGISTRY.release(module)
+
+        if coalesce_key is not None:
+            return await COALESCER.lead(coalesce_key, complete())
+        return await complete()
@@ -0,0 +1,260 @@
+import contextlib
+import gc
+import io
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+from typing import Optional
+
+try:
+    import resource
+except ImportError:
+    # Windows: only the wall-clock timeout applies
+    resource = None
+
+from pipelines.common_files.shared_frame import SharedFrame, attach_frame
+
+# Seconds a new worker may take to import matplotlib/pandas and warm the font cache
+STARTUP_TIMEOUT = 60.0
+
+
+def _limit_memory(megabytes: int):
+    """Caps the address space at what the warm worker already uses plus `megabytes`."""
+    if resource is None or megabytes <= 0:
+        return
+    try:
+        with open("/proc/self/statm") as f:
+            baseline = int(f.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        baseline = 0
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = baseline + megabytes * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError) as e:
+        logging.warning(f"Chart worker memory limit not applied: {e}")
+
+
+def _limit_cpu(seconds: float):
+    """Lets the next job use `seconds` more CPU time before SIGXCPU ends the worker."""
+    if resource is None or seconds <= 0:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (ValueError, OSError) as e:
+        logging.warning(f"Chart worker CPU limit not applied: {e}")
+
+
+def _worker_main(conn, cpu_seconds: float, memory_mb: int):
+    """Chart worker process: preloads the plotting stack, then runs one job per message."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    from matplotlib import font_manager
+
+    # Load the font cache and draw once so the first chart pays no warm-up
+    font_manager.findfont(font_manager.FontProperties(family=matplotlib.rcParams["font.family"]))
+    figure = plt.figure()
+    figure.gca().plot([0, 1], [0, 1])
+    figure.canvas.draw()
+    plt.close("all")
+    defaults = matplotlib.rcParams.copy()
+
+    _limit_memory(memory_mb)
+    conn.send("ready")
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        code, handle = job
+        _limit_cpu(cpu_seconds)
+
+        namespace = {"__name__": "__chart__", "pd": pd}
+        output = io.StringIO()
+        try:
+            with contextlib.ExitStack() as stack:
+                if handle is not None:
+                    namespace["df"] = stack.enter_context(attach_frame(handle))
+                try:
+                    with contextlib.redirect_stdout(output):
+                        exec(code, namespace)
+                finally:
+                    # Drop the shared memory views before the frame is detached
+                    namespace.clear()
+            result = output.getvalue()
+        except BaseException as e:
+            result = repr(e)
+        finally:
+            plt.close("all")
+            matplotlib.rcParams.update(defaults)
+            # Young generations only: a full collection with pandas loaded costs ~25 ms per job
+            gc.collect(1)
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self, context, cpu_seconds: float, memory_mb: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, cpu_seconds, memory_mb),
+            name="chart-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout: float) -> bool:
+        try:
+            if not self.ready and self.conn.poll(timeout):
+                self.ready = self.conn.recv() == "ready"
+        except (EOFError, OSError):
+            return False
+        return self.ready
+
+    def stop(self, kill: bool = False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                self.process.kill()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=5)
+        self.conn.close()
+
+
+class ChartPool:
+    """
+    Warm worker processes that run generated plotting code, one job per
+    worker at a time. Each job gets a fresh namespace with `df` (mapped from
+    shared memory, see shared_frame) and `pd`; pyplot figures and rcParams
+    are reset after it. A job is limited to `cpu_seconds` of CPU time and
+    `memory_mb` of extra address space (POSIX only) and to `timeout` seconds
+    of wall-clock time; a worker that overruns is killed and replaced, so a
+    runaway script never blocks the caller for longer than the timeout.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        timeout: float = 30.0,
+        cpu_seconds: float = 20.0,
+        memory_mb: int = 1024,
+    ):
+        self.size = max(1, workers)
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+
+        # spawn: never fork a gateway process that is running threads
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.jobs = 0
+        self.timeouts = 0
+        self.crashes = 0
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._context, self.cpu_seconds, self.memory_mb)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _replace(self, worker: _Worker):
+        with self._lock:
+            self._workers.discard(worker)
+        worker.stop(kill=True)
+        if not self._closed:
+            self._idle.put(self._spawn())
+
+    def _acquire(self, timeout: float) -> Optional[_Worker]:
+        # A worker that cannot start is replaced once; a second failure means they all would fail
+        for _ in range(2):
+            try:
+                worker = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                return None
+            if worker.process.is_alive() and worker.wait_ready(STARTUP_TIMEOUT):
+                return worker
+            logging.warning("Chart worker failed to start; starting a new one")
+            self._replace(worker)
+        return None
+
+    def render(self, code: str, df=None, timeout: Optional[float] = None) -> str:
+        """
+        Runs `code` in a worker with `df` bound and returns what it printed,
+        the repr of the exception it raised, or why it was stopped.
+        """
+        if self._closed:
+            return "Chart pool is closed"
+        timeout = self.timeout if timeout is None else timeout
+        worker = self._acquire(timeout)
+        if worker is None:
+            return "Execution failed: no chart worker available"
+
+        shared = SharedFrame(df) if df is not None else None
+        with self._lock:
+            self.jobs += 1
+        try:
+            worker.conn.send((code, shared.handle if shared is not None else None))
+            if worker.conn.poll(timeout):
+                result = worker.conn.recv()
+                self._idle.put(worker)
+                return result
+            with self._lock:
+                self.timeouts += 1
+            logging.warning(f"Chart job exceeded {timeout}s; replacing its worker")
+            self._replace(worker)
+            return "Execution timed out"
+        except (EOFError, OSError):
+            with self._lock:
+                self.crashes += 1
+            worker.process.join(timeout=5)
+            exitcode = worker.process.exitcode
+            self._replace(worker)
+            if resource is not None and exitcode == -signal.SIGXCPU:
+                return "Execution stopped: CPU time limit exceeded"
+            return f"Execution failed: chart worker exited with code {exitcode}"
+        finally:
+            if shared is not None:
+                shared.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "jobs": self.jobs,
+                "timeouts": self.timeouts,
+                "crashes": self.crashes,
+            }
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            workers, self._workers = list(self._workers), set()
+        for worker in workers:
+            worker.stop()
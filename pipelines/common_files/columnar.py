@@ -0,0 +1,161 @@
+import datetime
+import sys
+from collections.abc import Sequence
+from typing import Any, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+_INT64_MIN, _INT64_MAX = -(2 ** 63), 2 ** 63 - 1
+# Largest magnitude up to which every int is exact in a float64
+_FLOAT_EXACT_INT = 2 ** 53
+
+# NumPy 2 variable-width UTF-8 strings with None for NULL; short strings are stored inline
+_STRING_DTYPE = np.dtypes.StringDType(na_object=None) if hasattr(np.dtypes, "StringDType") else None
+
+# float64 for int columns with NULLs; the metadata turns values back into ints for rows
+_NULLABLE_INT_DTYPE = np.dtype(np.float64, metadata={"nullable_int": True})
+
+
+def _string_column(values: List[Any]) -> np.ndarray:
+    if _STRING_DTYPE is not None:
+        return np.array(values, dtype=_STRING_DTYPE)
+    # Drivers return a new str per row; repeated values (hosts, types) can share one
+    shared = {}
+    return _object_column([shared.setdefault(value, value) for value in values])
+
+
+def _object_column(values: List[Any]) -> np.ndarray:
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def _numeric_column(values: List[Any], kinds: set) -> Any:
+    """
+    float64 with NaN for NULL for numbers mixed with NULLs or each other, as
+    pandas reads them from CSV; None when ints would lose precision.
+    """
+    numbers = [value for value in values if value is not None]
+    if float not in kinds and max(-min(numbers), max(numbers)) > _FLOAT_EXACT_INT:
+        return None
+    dtype = np.float64 if float in kinds else _NULLABLE_INT_DTYPE
+    return np.array([np.nan if value is None else value for value in values], dtype=dtype)
+
+
+def column_values(column: np.ndarray) -> List[Any]:
+    """A column's values as Python objects, with None for the NaN that stands for NULL."""
+    values = column.tolist()
+    if column.dtype.kind != "f":
+        return values
+    if column.dtype.metadata and column.dtype.metadata.get("nullable_int"):
+        return [None if value != value else int(value) for value in values]
+    if not np.isnan(column).any():
+        return values
+    return [None if value != value else value for value in values]
+
+
+def to_column(values: List[Any]) -> np.ndarray:
+    """
+    Packs one column of values into the most compact array that gives the
+    values back (see column_values): int64, float64, bool or datetime64 when
+    all values share that type, float64 with NaN for numeric columns with
+    NULLs or mixed ints and floats (ints in a mix read back as floats),
+    NumPy strings for text (NULLs included), and object arrays otherwise.
+    """
+    if not values:
+        return np.empty(0, dtype=object)
+    kinds = {type(value) for value in values}
+    if kinds <= {str, type(None)} and str in kinds:
+        return _string_column(values)
+    if len(kinds) == 1:
+        kind = kinds.pop()
+        if kind is int and _INT64_MIN <= min(values) and max(values) <= _INT64_MAX:
+            return np.array(values, dtype=np.int64)
+        if kind is float:
+            return np.array(values, dtype=np.float64)
+        if kind is bool:
+            return np.array(values, dtype=bool)
+        if kind is datetime.datetime and all(value.tzinfo is None for value in values):
+            return np.array(values, dtype="datetime64[us]")
+        if kind is datetime.date:
+            return np.array(values, dtype="datetime64[D]")
+    elif kinds <= {int, float, type(None)}:
+        column = _numeric_column(values, kinds)
+        if column is not None:
+            return column
+    return _object_column(values)
+
+
+class ColumnarResult(Sequence):
+    """
+    A query result stored as one NumPy array per column. It reads like the
+    list of row tuples it replaces (len, indexing, iteration and == give
+    plain Python values), while the UI, the result cache and charts use the
+    columns directly: to_pandas() wraps them without copying numeric data.
+    """
+
+    __slots__ = ("names", "columns")
+
+    def __init__(self, names: Iterable[str], columns: Iterable[np.ndarray]):
+        self.names = list(names)
+        self.columns = list(columns)
+
+    @classmethod
+    def from_rows(cls, names: Iterable[str], rows: List[Any]) -> "ColumnarResult":
+        names = list(names)
+        if not rows:
+            return cls(names, [np.empty(0, dtype=object) for _ in names])
+        return cls(names, [to_column(list(values)) for values in zip(*rows)])
+
+    @property
+    def dtypes(self) -> List[np.dtype]:
+        return [column.dtype for column in self.columns]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the arrays and, for object columns, the distinct values they point to."""
+        size = 0
+        for column in self.columns:
+            size += column.nbytes
+            if column.dtype == object:
+                size += sum(sys.getsizeof(value) for value in {id(v): v for v in column}.values())
+        return size
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[self.names.index(name)]
+
+    def to_pandas(self) -> pd.DataFrame:
+        df = pd.DataFrame(dict(enumerate(self.columns)), copy=False)
+        df.columns = self.names
+        return df
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # NumPy slices are views
+            return ColumnarResult(self.names, [column[index] for column in self.columns])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("row index out of range")
+        return tuple(column_values(column[index:index + 1])[0] for column in self.columns)
+
+    def __iter__(self):
+        return zip(*(column_values(column) for column in self.columns))
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ColumnarResult) and self.names != other.names:
+            return False
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == [tuple(row) for row in other]
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        columns = ", ".join(f"{name}: {column.dtype}" for name, column in zip(self.names, self.columns))
+        return f"ColumnarResult({len(self)} rows; {columns})"
+
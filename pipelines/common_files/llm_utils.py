@@ -62,3 +62,59 @@ def extract_json_from_markdown(text: str) -> dict:
         return {"sql_query": sql_match.group(1).strip()}
         
     return {}
+
+class JsonStringFieldStreamer:
+    """
+    Incrementally extracts one string field from JSON that is still being
+    generated, so its text can be shown while the LLM is writing it.
+
+    feed() takes the next chunk of raw LLM output and returns the newly
+    decoded characters of `field` (empty until the field starts).
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, field: str):
+        self._start = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self._buffer = ""
+        self._pos = None
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        if self.done:
+            return ""
+        if self._pos is None:
+            match = self._start.search(self._buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        out = []
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            if char == '"':
+                self.done = True
+                break
+            if char != "\\":
+                out.append(char)
+                self._pos += 1
+                continue
+
+            # Escape sequence; wait for the rest of it if it is cut off.
+            if self._pos + 1 >= len(buffer):
+                break
+            code = buffer[self._pos + 1]
+            if code == "u":
+                if self._pos + 6 > len(buffer):
+                    break
+                try:
+                    out.append(chr(int(buffer[self._pos + 2:self._pos + 6], 16)))
+                except ValueError:
+                    pass
+                self._pos += 6
+            else:
+                out.append(self._ESCAPES.get(code, code))
+                self._pos += 2
+        return "".join(out)
@@ -0,0 +1,254 @@
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from pipelines.common_files.result_cache import VOLATILE_SQL
+
+# Words that do not change which SQL answers a question.
+STOPWORDS = frozenset("""
+a an the of for to in on at by from with about and or is are was were be been
+do does did can could would will should please me my i we us our you your
+show list give tell get find display what which who how much
+there any all some that this these those it its
+""".split())
+
+# Phrases asking for a row count rather than the rows; they become one
+# "count" token so a COUNT(*) query is never reused for a listing question.
+_COUNT_PHRASE = re.compile(r"\b(?:how many|counts?|(?:total )?number of)\b")
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:-[0-9]+)*")
+_DATE_TOKEN = re.compile(r"\d")
+
+
+def _resolve_dates(text: str, today: datetime.date) -> str:
+    """Replaces relative day/week/month/year phrases with absolute dates."""
+    week = today - datetime.timedelta(days=today.weekday())
+    first = today.replace(day=1)
+    last_month = (first - datetime.timedelta(days=1)).replace(day=1)
+    phrases = [
+        (r"\bday before yesterday\b", (today - datetime.timedelta(days=2)).isoformat()),
+        (r"\byesterday\b", (today - datetime.timedelta(days=1)).isoformat()),
+        (r"\btoday\b", today.isoformat()),
+        (r"\b(this|current) week\b", f"week {week.isoformat()}"),
+        (r"\b(last|previous) week\b", f"week {(week - datetime.timedelta(days=7)).isoformat()}"),
+        (r"\b(this|current) month\b", f"month {first:%Y-%m}"),
+        (r"\b(last|previous) month\b", f"month {last_month:%Y-%m}"),
+        (r"\b(this|current) year\b", f"year {today.year}"),
+        (r"\b(last|previous) year\b", f"year {today.year - 1}"),
+    ]
+    for pattern, replacement in phrases:
+        text = re.sub(pattern, replacement, text)
+    return text
+
+
+def _singular(token: str) -> str:
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def normalize_question(question: str, today: Optional[datetime.date] = None) -> str:
+    """
+    Cache key for a question: lower case, relative dates resolved against
+    `today`, counting phrases reduced to "count", punctuation, stopwords and
+    plural "s" dropped.
+
+        >>> normalize_question("How many logins yesterday?", datetime.date(2025, 8, 2))
+        'count login 2025-08-01'
+    """
+    text = _resolve_dates(question.lower(), today or datetime.date.today())
+    text = _COUNT_PHRASE.sub(" count ", text)
+    tokens = [_singular(token) for token in _TOKEN.findall(text) if token not in STOPWORDS]
+    return " ".join(tokens)
+
+
+def load_sentence_embedder(model_name: str) -> Optional[Callable[[List[str]], Any]]:
+    """
+    Returns a function embedding a list of texts with a local
+    sentence-transformers model, or None if the package is not installed.
+    """
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        logging.warning("sentence-transformers not installed; semantic question cache disabled.")
+        return None
+    model = SentenceTransformer(model_name)
+    return lambda texts: model.encode(texts, normalize_embeddings=True)
+
+
+class QuestionCache:
+    """
+    Maps questions to the LLM output they produced (e.g. generated SQL), so a
+    repeated question skips generation.
+
+    Entries are keyed by `namespace` (the agent) and the normalized question,
+    evicted least-recently-used beyond `max_entries` or after `ttl` seconds,
+    and saved to `path` as JSON. With an `embedder`, a question with no exact
+    match may reuse the closest entry whose embedding similarity is at least
+    `similarity` and whose dates and numbers are the same.
+
+    An entry whose question named a relative date and whose SQL uses the
+    database clock (SYSDATE etc.) is only reused on the day it was stored.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 1000,
+        ttl: float = 7 * 24 * 3600,
+        embedder: Optional[Callable[[List[str]], Any]] = None,
+        similarity: float = 0.92,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embedder = embedder
+        self.similarity = similarity
+
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._vectors: Dict[tuple, Sequence[float]] = {}
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        if path:
+            self.load()
+
+    def _expired(self, entry: Dict[str, Any], today: str) -> bool:
+        if self.ttl and time.time() - entry["stored_at"] > self.ttl:
+            return True
+        return bool(entry.get("day")) and entry["day"] != today
+
+    def _embed(self, key: tuple) -> Optional[Sequence[float]]:
+        try:
+            return list(self.embedder([key[1]])[0])
+        except Exception as e:
+            logging.warning(f"Question embedding failed: {e}")
+            return None
+
+    def _nearest(self, key: tuple, today: str) -> Optional[tuple]:
+        vector = self._embed(key)
+        if vector is None:
+            return None
+        anchors = {t for t in key[1].split() if _DATE_TOKEN.search(t)}
+
+        best, best_score = None, self.similarity
+        for other, other_vector in self._vectors.items():
+            if other[0] != key[0] or self._expired(self._entries[other], today):
+                continue
+            if {t for t in other[1].split() if _DATE_TOKEN.search(t)} != anchors:
+                continue
+            score = sum(a * b for a, b in zip(vector, other_vector))
+            if score >= best_score:
+                best, best_score = other, score
+        return best
+
+    def get(self, namespace: str, question: str) -> Optional[Dict[str, Any]]:
+        today = datetime.date.today()
+        key = (namespace, normalize_question(question, today))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, today.isoformat()):
+                self._remove(key)
+                entry = None
+            if entry is None and self.embedder is not None and self._vectors:
+                nearest = self._nearest(key, today.isoformat())
+                if nearest is not None:
+                    key, entry = nearest, self._entries[nearest]
+                    self.semantic_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return dict(entry["value"])
+
+    def put(self, namespace: str, question: str, value: Dict[str, Any]):
+        today = datetime.date.today()
+        normalized = normalize_question(question, today)
+        key = (namespace, normalized)
+        relative = _resolve_dates(question.lower(), today) != question.lower()
+        entry = {
+            "value": dict(value),
+            "stored_at": time.time(),
+            "day": today.isoformat() if relative and VOLATILE_SQL.search(value.get("sql_query", "")) else None,
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if self.embedder is not None:
+                vector = self._embed(key)
+                if vector is not None:
+                    self._vectors[key] = vector
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self.save()
+
+    def discard(self, namespace: str, question: str):
+        """Drops a question's entry, e.g. when its cached SQL stopped working."""
+        with self._lock:
+            self._remove((namespace, normalize_question(question)))
+            self.save()
+
+    def _remove(self, key: tuple):
+        self._entries.pop(key, None)
+        self._vectors.pop(key, None)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load question cache {self.path}: {e}")
+            return
+
+        today = datetime.date.today().isoformat()
+        with self._lock:
+            for record in records:
+                key = (record["namespace"], record["question"])
+                entry = {k: record[k] for k in ("value", "stored_at", "day")}
+                if not self._expired(entry, today):
+                    self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.embedder is not None and self._entries:
+                keys = list(self._entries)
+                try:
+                    vectors = self.embedder([key[1] for key in keys])
+                    self._vectors = {key: list(v) for key, v in zip(keys, vectors)}
+                except Exception as e:
+                    logging.warning(f"Question embedding failed: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            records = [
+                {"namespace": key[0], "question": key[1], **entry}
+                for key, entry in self._entries.items()
+            ]
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(records, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Could not save question cache {self.path}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,244 @@
+import datetime
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional
+
+from pipelines.common_files.columnar import ColumnarResult
+from pipelines.common_files.sql_utils import SQLResult, extract_tables
+
+# Functions whose value depends on when the query runs.
+VOLATILE_SQL = re.compile(
+    r"\b(sysdate|systimestamp|current_date|current_timestamp|localtimestamp|now\s*\(|getdate\s*\()",
+    re.IGNORECASE,
+)
+# Date literals such as DATE '2025-07-01', TO_DATE('2025-07', 'YYYY-MM') or '2025-07-31 23:59'
+_DATE_LITERAL = re.compile(r"'(\d{4})-(\d{2})(?:-(\d{2}))?")
+# A comparison that bounds a column from above (or pins it) with a date literal
+_UPPER_BOUND = re.compile(
+    r"(<=?|(?<![<>!])=|\bbetween\b.+?\band)\s*(date|timestamp|to_date\s*\(|to_timestamp\s*\()?\s*'\d{4}-\d{2}",
+    re.IGNORECASE,
+)
+_STRING_OR_TEXT = re.compile(r"('(?:[^']|'')*')|([^']+)")
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+# Seconds per TTL class; see ttl_class(). "watched" replaces "default" for
+# queries whose tables are all tracked by a watermark poller.
+DEFAULT_TTLS = {"volatile": 60, "default": 300, "historical": 24 * 3600, "watched": 3600}
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Canonical text of a query: comments dropped, whitespace collapsed, and
+    everything outside string literals lower-cased.
+    """
+    sql = _COMMENTS.sub(" ", sql).strip().rstrip(";")
+    parts = []
+    for literal, text in _STRING_OR_TEXT.findall(sql):
+        if literal:
+            parts.append(literal)
+        else:
+            text = re.sub(r"\s+", " ", text.lower())
+            parts.append(re.sub(r"\s*([(),=<>+*/-])\s*", r"\1", text))
+    return "".join(parts).strip()
+
+
+def sql_fingerprint(sql: str) -> str:
+    return hashlib.sha256(normalize_sql(sql).encode("utf-8")).hexdigest()
+
+
+def ttl_class(sql: str, today: Optional[datetime.date] = None) -> str:
+    """
+    "volatile" for queries reading the database clock (SYSDATE etc.),
+    "historical" for queries bounded above by dates before today, whose
+    result cannot change any more, and "default" for everything else.
+    """
+    if VOLATILE_SQL.search(sql):
+        return "volatile"
+
+    today = today or datetime.date.today()
+    ends = []
+    for year, month, day in _DATE_LITERAL.findall(sql):
+        try:
+            if day:
+                ends.append(datetime.date(int(year), int(month), int(day)))
+            else:
+                # 'YYYY-MM' covers the whole month
+                next_month = datetime.date(int(year) + int(month) // 12, int(month) % 12 + 1, 1)
+                ends.append(next_month - datetime.timedelta(days=1))
+        except ValueError:
+            return "default"
+    if ends and max(ends) < today and _UPPER_BOUND.search(sql):
+        return "historical"
+    return "default"
+
+
+def estimate_size(headers: List[str], rows: Any) -> int:
+    """Approximate memory held by a result, in bytes."""
+    size = sys.getsizeof(headers)
+    if isinstance(rows, ColumnarResult):
+        return size + rows.nbytes
+    size += sys.getsizeof(rows)
+    for row in rows:
+        values = row.values() if isinstance(row, dict) else row
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in values)
+    return size
+
+
+class _Entry(NamedTuple):
+    value: Any
+    size: int
+    expires_at: float
+    kind: str
+    tables: FrozenSet[str]
+
+
+class ResultCache:
+    """
+    Query results keyed by SQL fingerprint, kept for a TTL that depends on
+    ttl_class(). Least-recently-used entries are evicted once the results
+    held exceed `max_bytes`; results larger than `max_entry_bytes` are not
+    cached at all.
+
+    Entries remember the tables their SQL reads, so `invalidate_tables()` can
+    drop exactly the ones a data change affects. Queries reading only
+    `watched` tables (those a watermark poller tracks) are kept for the
+    longer "watched" TTL instead of the default one. Rendered charts are
+    cached alongside the results they were drawn from.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: Optional[int] = None,
+        ttls: Optional[Dict[str, float]] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 4
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.watched: FrozenSet[str] = frozenset()
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # table -> time.monotonic() of its last invalidation
+        self._invalidated_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _get(self, key: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key: str, sql: str, value: Any, size: int, started_at: Optional[float]):
+        kind = ttl_class(sql)
+        tables = extract_tables(sql)
+        if kind == "default" and tables and tables <= self.watched:
+            kind = "watched"
+        ttl = self.ttls.get(kind, 0)
+        if ttl <= 0 or size > self.max_entry_bytes:
+            return
+
+        with self._lock:
+            if started_at is not None and any(
+                self._invalidated_at.get(table, float("-inf")) >= started_at for table in tables
+            ):
+                # The data changed while the query ran; the result may predate it.
+                return
+            self._remove(key)
+            self._entries[key] = _Entry(value, size, time.monotonic() + ttl, kind, tables)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get(self, sql: str) -> Optional[SQLResult]:
+        entry = self._get(sql_fingerprint(sql))
+        if entry is None:
+            return None
+        headers, rows, truncated, types = entry.value
+        if not isinstance(rows, ColumnarResult):
+            rows = list(rows)
+        # A ColumnarResult is shared, not copied: its arrays are never modified after the fetch
+        return SQLResult(list(headers), rows, None, truncated, types)
+
+    def put(self, sql: str, result: SQLResult, started_at: Optional[float] = None):
+        """
+        Caches a successful result. `started_at` is the time.monotonic() at
+        which the query started; results of queries overtaken by an
+        invalidation of one of their tables are not stored.
+        """
+        if result.error:
+            return
+        rows = result.rows if isinstance(result.rows, ColumnarResult) else list(result.rows)
+        value = (list(result.headers), rows, result.truncated, result.types)
+        size = estimate_size(result.headers, result.rows)
+        self._put(sql_fingerprint(sql), sql, value, size, started_at)
+
+    @staticmethod
+    def _chart_key(sql: str, python_code: str) -> str:
+        code = hashlib.sha256(python_code.encode("utf-8")).hexdigest()
+        return f"chart:{sql_fingerprint(sql)}:{code}"
+
+    def get_chart(self, sql: str, python_code: str) -> Optional[str]:
+        """Filename of a chart rendered by `python_code` from the result of `sql`."""
+        entry = self._get(self._chart_key(sql, python_code))
+        if entry is None or not os.path.exists(entry.value):
+            return None
+        return entry.value
+
+    def put_chart(self, sql: str, python_code: str, filename: str, started_at: Optional[float] = None):
+        self._put(self._chart_key(sql, python_code), sql, filename, sys.getsizeof(filename), started_at)
+
+    def invalidate_tables(self, tables) -> int:
+        """Drops the results and charts that read any of `tables`."""
+        tables = {table.upper() for table in tables}
+        now = time.monotonic()
+        with self._lock:
+            for table in tables:
+                self._invalidated_at[table] = now
+            stale = [key for key, entry in self._entries.items() if entry.tables & tables]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
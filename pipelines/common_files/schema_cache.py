@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.engine import Engine
+
+# Tables the staffconnect agents query; the rest of the schema is never reflected.
+STAFFCONNECT_TABLES = ("AuditTrail", "Master_ActionType", "Users", "Master_Role", "ELMAH_Error")
+
+
+def schema_version(engine: Engine, tables: Iterable[str], schema: Optional[str] = None) -> Optional[str]:
+    """
+    Cheap token that changes whenever the DDL of `tables` does: LAST_DDL_TIME
+    on Oracle, PRAGMA schema_version on SQLite, and a hash of the column
+    definitions in information_schema elsewhere. None if it cannot be read.
+    """
+    names = sorted(table.upper() for table in tables)
+    dialect = engine.dialect.name
+    try:
+        with engine.connect() as conn:
+            if dialect == "sqlite":
+                rows = conn.execute(text("PRAGMA schema_version")).fetchall()
+            elif dialect == "oracle":
+                binds = ", ".join(f":t{i}" for i in range(len(names)))
+                params = {f"t{i}": name for i, name in enumerate(names)}
+                owner = ""
+                if schema:
+                    owner = " AND owner = :owner"
+                    params["owner"] = schema.upper()
+                rows = conn.execute(text(
+                    "SELECT owner, object_name, TO_CHAR(last_ddl_time, 'YYYY-MM-DD HH24:MI:SS') "
+                    f"FROM all_objects WHERE object_type = 'TABLE' AND object_name IN ({binds}){owner} "
+                    "ORDER BY owner, object_name"
+                ), params).fetchall()
+            else:
+                binds = ", ".join(f":t{i}" for i in range(len(names)))
+                params = {f"t{i}": name for i, name in enumerate(names)}
+                rows = conn.execute(text(
+                    "SELECT table_schema, table_name, column_name, data_type, is_nullable "
+                    "FROM information_schema.columns "
+                    f"WHERE UPPER(table_name) IN ({binds}) "
+                    "ORDER BY table_schema, table_name, ordinal_position"
+                ), params).fetchall()
+    except Exception as e:
+        logging.warning(f"Could not read schema version: {e}")
+        return None
+    payload = json.dumps([dialect, [list(row) for row in rows]], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def reflect_tables(
+    engine: Engine, tables: Iterable[str], schema: Optional[str] = None
+) -> Tuple[MetaData, List[str], List[str]]:
+    """
+    Reflects only `tables` (matched case-insensitively against the database's
+    own names). Returns (metadata, table names used, all table names).
+    """
+    all_tables = inspect(engine).get_table_names(schema=schema)
+    wanted = {table.lower() for table in tables}
+    include = [name for name in all_tables if name.lower() in wanted]
+    missing = wanted - {name.lower() for name in include}
+    if missing:
+        logging.warning(f"Tables not found in database: {', '.join(sorted(missing))}")
+
+    metadata = MetaData()
+    metadata.reflect(bind=engine, only=include, schema=schema)
+    return metadata, include, all_tables
+
+
+class SnapshotSQLDatabase(SQLDatabase):
+    """
+    SQLDatabase built from already reflected metadata, e.g. a schema
+    snapshot, instead of inspecting the database in its constructor.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        metadata: MetaData,
+        include_tables: List[str],
+        all_tables: List[str],
+        schema: Optional[str] = None,
+        sample_rows_in_table_info: int = 3,
+        indexes_in_table_info: bool = False,
+        custom_table_info: Optional[dict] = None,
+        max_string_length: int = 300,
+    ):
+        self._engine = engine
+        self._schema = schema
+        self._all_tables = set(all_tables)
+        self._include_tables = set(include_tables)
+        self._ignore_tables = set()
+        self._usable_tables = set(include_tables)
+        self._sample_rows_in_table_info = sample_rows_in_table_info
+        self._indexes_in_table_info = indexes_in_table_info
+        self._custom_table_info = custom_table_info
+        self._max_string_length = max_string_length
+        self._view_support = False
+        self._metadata = metadata
+        self._lazy_inspector = None
+
+    @property
+    def _inspector(self):
+        # Only needed for index info; inspecting on demand keeps startup to one query.
+        if self._lazy_inspector is None:
+            self._lazy_inspector = inspect(self._engine)
+        return self._lazy_inspector
+
+    def replace_schema(self, metadata: MetaData, include_tables: List[str], all_tables: List[str]):
+        self._metadata = metadata
+        self._include_tables = set(include_tables)
+        self._usable_tables = set(include_tables)
+        self._all_tables = set(all_tables)
+
+
+class SchemaCache:
+    """
+    Pickled snapshot of the reflected `tables`, reused while the database's
+    schema_version() is unchanged. Snapshots are keyed by database URL
+    (without password), schema and table list, so one file never serves a
+    different database.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        path: str,
+        tables: Iterable[str] = STAFFCONNECT_TABLES,
+        schema: Optional[str] = None,
+    ):
+        self.engine = engine
+        self.path = path
+        self.tables = tuple(tables)
+        self.schema = schema
+        self.version: Optional[str] = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def key(self) -> str:
+        url = self.engine.url.render_as_string(hide_password=True)
+        return json.dumps([url, self.schema, sorted(t.lower() for t in self.tables)])
+
+    def _load(self, version: str):
+        try:
+            with open(self.path, "rb") as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Could not read schema snapshot {self.path}: {e}")
+            return None
+        if snapshot.get("key") != self.key or snapshot.get("version") != version:
+            return None
+        return snapshot
+
+    def _save(self, snapshot: dict):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.warning(f"Could not write schema snapshot {self.path}: {e}")
+
+    def _reflect(self, version: Optional[str]) -> dict:
+        metadata, include, all_tables = reflect_tables(self.engine, self.tables, self.schema)
+        snapshot = {
+            "key": self.key,
+            "version": version,
+            "metadata": metadata,
+            "include_tables": include,
+            "all_tables": all_tables,
+        }
+        if version is not None:
+            self._save(snapshot)
+        return snapshot
+
+    def load_database(self, **kwargs) -> SnapshotSQLDatabase:
+        """
+        Returns a SQLDatabase from the snapshot if it is current (warm start),
+        otherwise reflects the tables and writes a new snapshot (cold start).
+        """
+        start = time.perf_counter()
+        version = schema_version(self.engine, self.tables, self.schema)
+        snapshot = self._load(version) if version is not None else None
+        warm = snapshot is not None
+        if not warm:
+            snapshot = self._reflect(version)
+        self.version = version
+
+        db = SnapshotSQLDatabase(
+            self.engine,
+            snapshot["metadata"],
+            snapshot["include_tables"],
+            snapshot["all_tables"],
+            schema=self.schema,
+            **kwargs,
+        )
+        logging.info(
+            f"Schema {'loaded from snapshot' if warm else 'reflected'} "
+            f"({'warm' if warm else 'cold'} start) in {time.perf_counter() - start:.3f}s"
+        )
+        return db
+
+    def refresh(self, db: SnapshotSQLDatabase) -> bool:
+        """Re-reflects into `db` if the schema changed since it was loaded."""
+        version = schema_version(self.engine, self.tables, self.schema)
+        if version is not None and version == self.version:
+            return False
+        start = time.perf_counter()
+        snapshot = self._reflect(version)
+        db.replace_schema(snapshot["metadata"], snapshot["include_tables"], snapshot["all_tables"])
+        self.version = version
+        logging.info(f"Schema changed; reflected again in {time.perf_counter() - start:.3f}s")
+        return True
+
+    def start_refresh(self, db: SnapshotSQLDatabase, interval: float,
+                      on_refresh: Optional[Callable[[], None]] = None):
+        """Checks the schema version every `interval` seconds in a daemon thread."""
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    if self.refresh(db) and on_refresh is not None:
+                        on_refresh()
+                except Exception as e:
+                    logging.error(f"Schema refresh failed: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="schema-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,78 @@
+import logging
+import pickle
+import sys
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Iterator, NamedTuple, Tuple
+
+import pandas as pd
+
+
+class FrameHandle(NamedTuple):
+    """Picklable reference to a DataFrame placed in shared memory by SharedFrame."""
+    name: str
+    # Pickle protocol 5 stream of the DataFrame without its out-of-band column buffers
+    header: bytes
+    # (start, end) of each out-of-band buffer within the segment
+    spans: Tuple[Tuple[int, int], ...]
+
+
+class SharedFrame:
+    """
+    Copies a DataFrame's column buffers into one shared memory segment so
+    another process can map them instead of receiving a CSV file or a
+    pickled copy. Numeric columns travel out of band; object and string
+    columns are small enough to stay in the header. The owner keeps the
+    segment until close(), which must come after the reader is done.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        buffers = []
+        header = pickle.dumps(df, protocol=5, buffer_callback=buffers.append)
+        raws = [buffer.raw() for buffer in buffers]
+
+        spans, offset = [], 0
+        for raw in raws:
+            spans.append((offset, offset + raw.nbytes))
+            offset += raw.nbytes
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for raw, (start, end) in zip(raws, spans):
+            self._shm.buf[start:end] = raw
+        self.handle = FrameHandle(self._shm.name, header, tuple(spans))
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self) -> "SharedFrame":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextmanager
+def attach_frame(handle: FrameHandle) -> Iterator[pd.DataFrame]:
+    """
+    Maps the DataFrame behind `handle`; its numeric columns are views of the
+    shared segment, so the reader should drop them before leaving the block.
+    """
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name=handle.name, track=False)
+    else:
+        # Readers started by multiprocessing share the owner's resource tracker,
+        # where registering the same segment again is a no-op.
+        shm = shared_memory.SharedMemory(name=handle.name)
+    try:
+        buffers = [shm.buf[start:end] for start, end in handle.spans]
+        yield pickle.loads(handle.header, buffers=buffers)
+    finally:
+        buffers = None
+        try:
+            shm.close()
+        except BufferError:
+            # Views are still referenced; the mapping goes away with them.
+            logging.debug(f"Shared frame {handle.name} still in use after detach")
@@ -1,6 +1,11 @@
 import os
 import re
-from typing import List, Tuple, Any, Union, Optional
+import time
+import asyncio
+import logging
+from typing import List, NamedTuple, Tuple, Any, Union, Optional
+
+from pipelines.common_files.columnar import ColumnarResult
 
 
 def clean_sql_query(query: str) -> str:
@@ -37,6 +42,44 @@ def extract_column_names_from_sql(sql_query: str) -> list:
     return cleaned
 
 
+_FROM_CLAUSE = re.compile(
+    r"\bfrom\s+(.*?)(?=\bwhere\b|\bgroup\b|\border\b|\bhaving\b|\bunion\b|\bfetch\b"
+    r"|\bconnect\b|\bstart\b|\b(?:inner|left|right|full|cross|natural)\b|\bjoin\b|[()]|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+_JOIN_TABLE = re.compile(r"\bjoin\s+([\w$#\".]+)", re.IGNORECASE)
+# Tables listed after a derived table: FROM (SELECT ...) x, Users u. May also
+# catch select-list columns; extra names only make invalidation broader.
+_AFTER_SUBQUERY = re.compile(
+    r"\)\s*(?:as\s+)?\w*\s*,\s*([\w$#\".]+)(?:\s+\w+)?\s*(?=\bwhere\b|\bjoin\b|\bgroup\b|\border\b|,|\)|$)",
+    re.IGNORECASE,
+)
+_CTE_NAME = re.compile(r"(?:\bwith|,)\s*(\w+)\s+as\s*\(", re.IGNORECASE)
+
+
+def extract_tables(sql_query: str) -> frozenset:
+    """
+    Upper-cased names of the tables a query reads, without schema prefixes.
+    CTE names and DUAL are left out.
+    """
+    sql = re.sub(r"'(?:[^']|'')*'", "''", sql_query)
+    # EXTRACT(YEAR FROM col) is not a table reference
+    sql = re.sub(r"\bextract\s*\([^()]*\)", "0", sql, flags=re.IGNORECASE)
+    names = []
+    for clause in _FROM_CLAUSE.findall(sql):
+        names.extend(part.split()[0] for part in clause.split(",") if part.split())
+    names.extend(_JOIN_TABLE.findall(sql))
+    names.extend(_AFTER_SUBQUERY.findall(sql))
+
+    ctes = {name.upper() for name in _CTE_NAME.findall(sql)}
+    tables = set()
+    for name in names:
+        name = name.split(".")[-1].strip('"').upper()
+        if re.fullmatch(r"[\w$#]+", name) and name not in ctes and name not in ("DUAL", "SELECT"):
+            tables.add(name)
+    return frozenset(tables)
+
+
 def _get_max_rows() -> int:
     """Returns maximum number of rows allowed from a query result."""
     try:
@@ -45,6 +88,14 @@ def _get_max_rows() -> int:
         return 1000
 
 
+def _get_fetch_arraysize() -> int:
+    """Rows the driver fetches per round trip (DBAPI cursor.arraysize)."""
+    try:
+        return max(1, int(os.getenv("SQL_FETCH_ARRAYSIZE", "1000")))
+    except ValueError:
+        return 1000
+
+
 def validate_sql_query(sql_query: str) -> Optional[str]:
     """
     Basic read-only validation for generated SQL.
@@ -80,36 +131,273 @@ def validate_sql_query(sql_query: str) -> Optional[str]:
     return None
 
 
-def execute_sql_safe(db, sql_query: str) -> Tuple[List[str], List[Any], Union[str, None]]:
+class SQLResult(NamedTuple):
+    headers: List[str]
+    rows: List[Any]
+    error: Optional[str] = None
+    # True when the query had more than SQL_MAX_ROWS rows and only those were kept
+    truncated: bool = False
+    # DBAPI type code per column from cursor.description (driver specific; None if unknown)
+    types: Tuple[Any, ...] = ()
+
+
+_TOP_LEVEL_TOKENS = re.compile(
+    r"[(),]|\b(?:select|from|join|where|group|order|having|union|intersect|minus|except"
+    r"|fetch|connect|start)\b",
+    re.IGNORECASE,
+)
+
+
+def _select_list(sql_query: str) -> Tuple[Optional[List[str]], bool]:
     """
-    Executes a SQL query safely and returns (headers, rows, error_message).
-    Standardizes the result format from SQLAlchemy/LangChain.
+    Items of the top-level SELECT list (after any WITH clause), split on
+    top-level commas, or None if they cannot be found; and whether its FROM
+    clause reads a single table or subquery (no top-level join or comma).
+    """
+    sql = re.sub(r"'(?:[^']|'')*'", "''", sql_query)
+    depth, start, items, in_from, sources = 0, None, [], False, 1
+    for match in _TOP_LEVEL_TOKENS.finditer(sql):
+        token = match.group(0).lower()
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth != 0:
+            continue
+        elif in_from:
+            if token not in (",", "join"):
+                break
+            sources += 1
+        elif token == "select" and start is None:
+            start = match.end()
+        elif token in (",", "from") and start is not None:
+            items.append(sql[start:match.start()].strip())
+            start = match.end()
+            in_from = token == "from"
+    if not in_from:
+        return None, False
+    return items, sources == 1
+
+
+def _column_name(item: str) -> Optional[str]:
+    """Name the database gives a select-list item, or None for * and t.*."""
+    item = re.sub(r"^(?:distinct|unique|all)\s+", "", item.strip(), flags=re.IGNORECASE)
+    if item.endswith("*") and not item.endswith("(*)"):
+        return None
+    alias = re.search(r'(?:\s+as)?\s+("[^"]+"|\w+)$', item, re.IGNORECASE)
+    if alias:
+        name = alias.group(1)
+    elif re.fullmatch(r'[\w$#".]+', item):
+        name = item.split(".")[-1]
+    else:
+        # Unaliased expressions are named after their text
+        name = item
+    # Quoted names keep their case; anything else compares case-insensitively
+    return name[1:-1] if name.startswith('"') else re.sub(r"\s+", "", name).upper()
+
+
+def has_unique_columns(sql_query: str) -> bool:
+    """
+    True when the top-level SELECT list names every column differently, so
+    the query can be wrapped in SELECT * FROM (...). Joins selecting the same
+    column twice (u.UserId, a.UserId) or * over a join are reported as not
+    unique, and so is anything the select list cannot be read from.
+    """
+    items, single_source = _select_list(sql_query)
+    if not items:
+        return False
+    names = [_column_name(item) for item in items]
+    if None in names:
+        # * repeats the columns that joined tables share
+        return single_source and len(names) == 1
+    return len(set(names)) == len(names)
+
+
+def limit_sql(sql_query: str, limit: int, dialect: str) -> str:
+    """
+    Wraps a query so the database itself stops after `limit` rows. Dialects
+    without a known syntax are returned unchanged (fetchmany still bounds them).
     """
+    sql_query = sql_query.strip().rstrip(";")
+    if dialect in ("oracle", "mysql", "mariadb") and not has_unique_columns(sql_query):
+        # These reject duplicate column names in the derived table (ORA-00918)
+        return sql_query
+    if dialect == "oracle":
+        # ROWNUM keeps the inner ORDER BY and works before 12c, unlike FETCH FIRST
+        return f"SELECT * FROM ({sql_query}) WHERE ROWNUM <= {limit}"
+    if dialect in ("postgresql", "sqlite", "mysql", "mariadb", "duckdb"):
+        return f"SELECT * FROM ({sql_query}) AS limited_query LIMIT {limit}"
+    return sql_query
+
+
+def _prepare(db, sql_query: str):
+    """Validates a query; returns (cleaned query, error, cached SQLResult)."""
     cleaned_query = clean_sql_query(sql_query)
 
     validation_error = validate_sql_query(cleaned_query)
     if validation_error:
-        return [], [], validation_error
+        return cleaned_query, validation_error, None
+
+    result_cache = getattr(db, "result_cache", None)
+    cached = result_cache.get(cleaned_query) if result_cache is not None else None
+    return cleaned_query, None, cached
+
+
+def _fetch(dbapi_connection, sql_query: str, max_rows: int, dialect=None) -> SQLResult:
+    """
+    Runs `sql_query` on a raw DBAPI cursor and fetches up to `max_rows` + 1
+    rows, which are packed into a ColumnarResult. Column names and types
+    come from cursor.description; names are normalized through `dialect` as
+    SQLAlchemy results do, so Oracle's upper-cased unquoted aliases come
+    back as the lower-case names the generated SQL and chart code use.
+    """
+    arraysize = min(max_rows + 1, _get_fetch_arraysize())
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.arraysize = arraysize
+        if hasattr(cursor, "prefetchrows"):
+            # python-oracledb / cx_Oracle: return the first batch with the execute round trip
+            cursor.prefetchrows = arraysize
+        # No bind parameters, so colons and percent signs in literals reach the database as written
+        cursor.execute(sql_query)
+        description = cursor.description or ()
+        rows = cursor.fetchmany(max_rows + 1)
+    finally:
+        cursor.close()
+
+    headers = [column[0] for column in description]
+    if dialect is not None and dialect.requires_name_normalize:
+        headers = [dialect.normalize_name(name) for name in headers]
+    types = tuple(column[1] for column in description)
+    columnar = ColumnarResult.from_rows(headers, rows[:max_rows])
+    return SQLResult(headers, columnar, None, len(rows) > max_rows, types)
+
+
+def execute_sql(db, sql_query: str) -> SQLResult:
+    """
+    Executes a read-only query and returns at most SQL_MAX_ROWS rows as a
+    ColumnarResult, which the UI, charts and result cache all share.
 
+    The row limit is pushed into the SQL (one extra row tells whether the
+    result was truncated) and rows are bulk fetched from a DBAPI cursor in
+    SQL_FETCH_ARRAYSIZE batches, bypassing SQLDatabase's dict per row.
+    Results are served from and stored in `db.result_cache` when the
+    pipeline attached one (see result_cache.ResultCache).
+    """
+    cleaned_query, error, cached = _prepare(db, sql_query)
+    if error:
+        return SQLResult([], [], error)
+    if cached is not None:
+        return cached
+
+    started_at = time.monotonic()
     max_rows = _get_max_rows()
+    engine = db._engine
 
     try:
-        result = db._execute(cleaned_query)
-        if isinstance(result, list):
-            headers = extract_column_names_from_sql(cleaned_query)
-            rows = result[:max_rows]
-        else:
-            headers = getattr(result, "columns", [])
-            if not isinstance(headers, list) and hasattr(headers, "keys"):
-                headers = list(headers.keys())
+        limited_query = limit_sql(cleaned_query, max_rows + 1, engine.dialect.name)
+        with engine.connect() as conn:
+            sql_result = _fetch(conn.connection, limited_query, max_rows, engine.dialect)
+    except Exception:
+        # Do not expose raw DB errors to the caller.
+        return SQLResult([], [], "Database error occurred while executing the query.")
+
+    result_cache = getattr(db, "result_cache", None)
+    if result_cache is not None:
+        result_cache.put(cleaned_query, sql_result, started_at=started_at)
+    return sql_result
+
+
+def execute_sql_safe(db, sql_query: str) -> Tuple[List[str], List[Any], Union[str, None]]:
+    """
+    Executes a SQL query safely and returns (headers, rows, error_message).
+    See execute_sql, which also reports whether the rows were truncated.
+    """
+    result = execute_sql(db, sql_query)
+    return result.headers, result.rows, result.error
+
 
-            rows_obj = getattr(result, "rows", result)
-            try:
-                rows = list(rows_obj)[:max_rows]
-            except TypeError:
-                rows = rows_obj
+# Sync SQLAlchemy dialect+driver -> async driver for the same database.
+ASYNC_DRIVERS = {
+    "oracle": "oracle+oracledb_async",
+    "oracle+cx_oracle": "oracle+oracledb_async",
+    "oracle+oracledb": "oracle+oracledb_async",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
 
-        return headers, rows, None
+
+def to_async_url(db_url: str) -> Optional[str]:
+    """Maps a sync database URL to its async driver, or None if there is none."""
+    scheme, sep, rest = db_url.partition("://")
+    if not sep:
+        return None
+    async_scheme = ASYNC_DRIVERS.get(scheme.lower())
+    if async_scheme is None:
+        # Already async (e.g. sqlite+aiosqlite) or no async driver known (mssql).
+        return db_url if scheme.lower() in ASYNC_DRIVERS.values() else None
+    return f"{async_scheme}://{rest}"
+
+
+def create_async_db_engine(db_url: str, **kwargs):
+    """
+    Creates an async SQLAlchemy engine for `db_url`, or returns None when the
+    database has no async driver or it is not installed.
+    """
+    async_url = to_async_url(db_url)
+    if async_url is None:
+        logging.warning("No async driver for this database; SQL will run in threads.")
+        return None
+    try:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        return create_async_engine(async_url, pool_pre_ping=True, **kwargs)
+    except Exception as e:
+        logging.warning(f"Async engine unavailable ({e}); SQL will run in threads.")
+        return None
+
+
+async def aexecute_sql(db, sql_query: str) -> SQLResult:
+    """
+    Async counterpart of execute_sql. Uses `db.async_engine` when the
+    pipeline attached one, otherwise runs the sync path in a worker thread.
+    """
+    async_engine = getattr(db, "async_engine", None)
+    if async_engine is None:
+        return await asyncio.to_thread(execute_sql, db, sql_query)
+
+    cleaned_query, error, cached = _prepare(db, sql_query)
+    if error:
+        return SQLResult([], [], error)
+    if cached is not None:
+        return cached
+
+    started_at = time.monotonic()
+    max_rows = _get_max_rows()
+
+    try:
+        limited_query = limit_sql(cleaned_query, max_rows + 1, async_engine.dialect.name)
+        async with async_engine.connect() as conn:
+            # run_sync lets the async driver's adapted cursor be used like a DBAPI one
+            sql_result = await conn.run_sync(
+                lambda sync_conn: _fetch(
+                    sync_conn.connection, limited_query, max_rows, sync_conn.dialect
+                )
+            )
     except Exception:
         # Do not expose raw DB errors to the caller.
-        return [], [], "Database error occurred while executing the query."
+        return SQLResult([], [], "Database error occurred while executing the query.")
+
+    result_cache = getattr(db, "result_cache", None)
+    if result_cache is not None:
+        result_cache.put(cleaned_query, sql_result, started_at=started_at)
+    return sql_result
+
+
+async def aexecute_sql_safe(db, sql_query: str) -> Tuple[List[str], List[Any], Union[str, None]]:
+    """Async counterpart of execute_sql_safe; see aexecute_sql."""
+    result = await aexecute_sql(db, sql_query)
+    return result.headers, result.rows, result.error
@@ -1,39 +1,66 @@
-def format_result_for_ui(result: dict) -> str:
+from pipelines.common_files.columnar import ColumnarResult, column_values
+
+
+def format_sql_block(sql_query: str) -> str:
+    return f"SQL Query:\n\n```sql\n{sql_query.strip()}\n```"
+
+
+def format_table(headers: list, rows: list) -> str:
+    table = [
+        "| " + " | ".join(headers) + " |",
+        "| " + " | ".join(["---"] * len(headers)) + " |"
+    ]
+    if isinstance(rows, ColumnarResult):
+        # Stringify a column at a time rather than cell by cell
+        cells = zip(*(map(str, column_values(column)) for column in rows.columns))
+        table.extend("| " + " | ".join(row) + " |" for row in cells)
+        return "\n".join(table)
+    for row in rows:
+        if isinstance(row, dict):
+            table.append("| " + " | ".join(str(row.get(h, row.get(h.lower(), ""))) for h in headers) + " |")
+        elif isinstance(row, (tuple, list)):
+            table.append("| " + " | ".join(str(cell) for cell in row) + " |")
+    return "\n".join(table)
+
+
+def format_truncation_note(row_count: int) -> str:
+    return f"_Showing the first {row_count} rows; the query returned more._"
+
+
+def format_result_for_ui(result: dict, exclude=()) -> str:
+    """
+    Renders an agent result as markdown. `exclude` names sections that were
+    already sent (e.g. while streaming): "agent", "explanation", "sql_query",
+    "table" or "error".
+    """
     parts = []
 
     # 1. Routed Agent Label
     agent = result.get("agent")
-    if agent:
+    if agent and "agent" not in exclude:
         parts.append(f"Routed to: `{agent.capitalize()} Agent`")
 
     # 2. Explanation
     explanation = result.get("explanation")
-    if explanation:
+    if explanation and "explanation" not in exclude:
         parts.append(f"Insight:\n> {explanation.strip()}")
 
     # 3. SQL Query Block
     sql_query = result.get("sql_query")
-    if sql_query:
-        parts.append("SQL Query:")
-        parts.append(f"```sql\n{sql_query.strip()}\n```")
+    if sql_query and "sql_query" not in exclude:
+        parts.append(format_sql_block(sql_query))
 
     # 4. Table
     headers = result.get("headers", [])
     rows = result.get("rows", [])
-    if rows and headers:
-        table = [
-            "| " + " | ".join(headers) + " |",
-            "| " + " | ".join(["---"] * len(headers)) + " |"
-        ]
-        for row in rows:
-            if isinstance(row, dict):
-                table.append("| " + " | ".join(str(row.get(h, row.get(h.lower(), ""))) for h in headers) + " |")
-            elif isinstance(row, (tuple, list)):
-                table.append("| " + " | ".join(str(cell) for cell in row) + " |")
-        parts.append("\n".join(table))
+    if rows and headers and "table" not in exclude:
+        table = format_table(headers, rows)
+        if result.get("truncated"):
+            table += "\n\n" + format_truncation_note(len(rows))
+        parts.append(table)
 
     # 6. Error
-    if result.get("error"):
+    if result.get("error") and "error" not in exclude:
         parts.append(f"Error: {result['error']}")
 
     return "\n\n".join(parts)
@@ -2,49 +2,64 @@ import os
 import uuid
 import pandas as pd
 import logging
-from typing import Annotated, List, Any, Union
+import threading
+from typing import List, Any, Optional
 from langchain_core.tools import tool
-from langchain_experimental.utilities import PythonREPL
 import re
 
-repl = PythonREPL()
+from pipelines.common_files.chart_pool import ChartPool
+from pipelines.common_files.columnar import ColumnarResult
+
+_chart_pool: Optional[ChartPool] = None
+_chart_pool_lock = threading.Lock()
 
 # Ensure CHARTS_DIR is defined relative to the project structure
 CHARTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "charts"))
 os.makedirs(CHARTS_DIR, exist_ok=True)
 
-@tool
-def python_repl(
-    code: Annotated[str, "The python code to execute to generate your chart."],
-    sql_query: Annotated[str, "The sql query to form the dataframe to be used as df in python code."],
-    filename: Annotated[str, "The ABSOLUTE filename path to save the chart."]
-):
-    """Use this to execute python code for visualization."""
-    if not sql_query:
-        return "Error: SQL query parameter is required."
-
-    filename = filename.replace("\\", "/") 
-
+def _env_number(name: str, default: float) -> float:
     try:
-        # Ensure Agg backend for headless plotting
-        if "matplotlib.use('Agg')" not in code:
-            code = "import matplotlib; matplotlib.use('Agg')\n" + code
+        return float(os.getenv(name, str(default)).strip('"\'') or default)
+    except ValueError:
+        return default
 
-        # Create directory if it doesn't exist
-        chart_dir = os.path.dirname(filename)
-        if chart_dir and not os.path.exists(chart_dir):
-            os.makedirs(chart_dir, exist_ok=True)
+def get_chart_pool() -> ChartPool:
+    """
+    Fallback pool for callers that do not own one (scripts, tests), started
+    from CHART_* env settings on first use. Pipelines own their pool and pass
+    it to run_chart, so a reload never closes a pool another instance uses.
+    """
+    global _chart_pool
+    with _chart_pool_lock:
+        if _chart_pool is None:
+            _chart_pool = ChartPool(
+                workers=int(_env_number("CHART_WORKERS", 2)),
+                timeout=_env_number("CHART_TIMEOUT", 30),
+                cpu_seconds=_env_number("CHART_CPU_SECONDS", 20),
+                memory_mb=int(_env_number("CHART_MEMORY_MB", 1024)),
+            )
+        return _chart_pool
 
-        # Patch code to use the correct savefig path
-        code = re.sub(r".*plt\.savefig\(.*\)", "", code)
-        code += f"\nplt.savefig(r'{filename}')"
+def close_chart_pool():
+    global _chart_pool
+    with _chart_pool_lock:
+        pool, _chart_pool = _chart_pool, None
+    if pool is not None:
+        pool.close()
 
-        result = repl.run(code)
-        return result
+def prepare_chart_code(code: str, filename: str) -> str:
+    """Forces the headless Agg backend and makes the code save to `filename`."""
+    # Strip markdown fences and a leading "python" the model may add
+    code = re.sub(r"^(\s|`)*(?i:python)?\s*", "", code)
+    code = re.sub(r"(\s|`)*$", "", code)
 
-    except Exception as e:
-        logging.error(f"Execution FAILED inside python_repl: {repr(e)}")
-        return f"Failed to execute. Error: {repr(e)}"
+    # Ensure Agg backend for headless plotting
+    if "matplotlib.use('Agg')" not in code:
+        code = "import matplotlib; matplotlib.use('Agg')\n" + code
+
+    # Patch code to use the correct savefig path
+    code = re.sub(r".*plt\.savefig\(.*\)", "", code)
+    return code + f"\nplt.savefig(r'{filename}')"
 
 @tool
 def get_unique_filename(a: int = 0):
@@ -55,19 +70,25 @@ def get_unique_filename(a: int = 0):
     unique_name = str(uuid.uuid4()) + ".png"
     return os.path.normpath(os.path.join(CHARTS_DIR, unique_name))
 
-def save_rows_to_csv(rows: List[Any], headers: List[str]) -> Union[str, None]:
+def to_dataframe(headers: List[str], rows: Any) -> pd.DataFrame:
+    """The rows of a query result as a DataFrame, sharing a ColumnarResult's arrays."""
+    if isinstance(rows, ColumnarResult):
+        return rows.to_pandas()
+    return pd.DataFrame(list(rows), columns=headers)
+
+def run_chart(code: str, df: pd.DataFrame, filename: str, pool: Optional[ChartPool] = None) -> str:
     """
-    Saves the provided rows and headers to a temporary CSV file.
+    Runs plotting `code` with `df` already bound, in a clean namespace in a
+    worker of `pool` (see chart_pool; get_chart_pool() if None), and saves
+    the figure to `filename`. `df` reaches the worker through shared memory;
+    nothing touches disk but the chart. Returns what the code printed, or
+    the error.
     """
+    filename = filename.replace("\\", "/")
     try:
-        unique_name = str(uuid.uuid4()) + ".csv"
-        csv_filename = os.path.normpath(os.path.join(CHARTS_DIR, unique_name))
-        
-        os.makedirs(os.path.dirname(csv_filename), exist_ok=True)
-        
-        df = pd.DataFrame(rows, columns=headers)
-        df.to_csv(csv_filename, index=False)
-        return csv_filename
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        pool = pool if pool is not None else get_chart_pool()
+        return pool.render(prepare_chart_code(code, filename), df)
     except Exception as e:
-        logging.error(f"Failed to save temp CSV: {e}")
-        return None
+        logging.error(f"Chart execution failed: {repr(e)}")
+        return f"Failed to execute. Error: {repr(e)}"
@@ -0,0 +1,107 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+
+# Cheap high-water mark per table: a value that moves whenever its data does.
+# Append-only logs use their sequence or timestamp. Master tables are updated in
+# place, so they pair the row count (deletes) with the newest ORA_ROWSCN (inserts
+# and updates; block-level SCNs can only move too often, never too rarely).
+STAFFCONNECT_WATERMARKS = {
+    "ELMAH_ERROR": "SELECT MAX(Sequence) FROM ELMAH_Error",
+    "AUDITTRAIL": "SELECT MAX(ACTIONTIMESTAMP) FROM AuditTrail",
+    "USERS": "SELECT COUNT(*), MAX(ORA_ROWSCN) FROM Users",
+    "MASTER_ROLE": "SELECT COUNT(*), MAX(ORA_ROWSCN) FROM Master_Role",
+    "MASTER_ACTIONTYPE": "SELECT COUNT(*), MAX(ORA_ROWSCN) FROM Master_ActionType",
+}
+
+# Marks a watermark that could not be read; never equal to a real value.
+_UNKNOWN = object()
+
+
+def _first_row(result: Any) -> Any:
+    """The watermark in `result`: its single value, or a tuple of several columns."""
+    if not result:
+        return None
+    row = result[0]
+    values = tuple(row.values()) if isinstance(row, dict) else tuple(row)
+    return values[0] if len(values) == 1 else values
+
+
+class WatermarkPoller:
+    """
+    Polls a watermark query per table and calls `on_change` with the tables
+    whose value moved since the previous poll, e.g. to invalidate cached
+    results that read them. The first poll only records the values.
+
+    A table whose query fails counts as changed, so caches never outlive an
+    unknown state.
+    """
+
+    def __init__(
+        self,
+        db,
+        on_change: Callable[[Set[str]], Any],
+        queries: Optional[Dict[str, str]] = None,
+        interval: float = 30.0,
+    ):
+        self.db = db
+        self.on_change = on_change
+        self.queries = {table.upper(): sql for table, sql in (queries or STAFFCONNECT_WATERMARKS).items()}
+        self.interval = interval
+
+        self.watermarks: Dict[str, Any] = {}
+        self._failing: Set[str] = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def tables(self) -> frozenset:
+        return frozenset(self.queries)
+
+    def _read(self, table: str) -> Any:
+        try:
+            # Straight to the database: execute_sql_safe would serve it from the result cache.
+            value = _first_row(self.db._execute(self.queries[table]))
+        except Exception as e:
+            if table not in self._failing:
+                logging.warning(f"Watermark query for {table} failed: {e}")
+                self._failing.add(table)
+            return _UNKNOWN
+        self._failing.discard(table)
+        return value
+
+    def poll(self) -> Set[str]:
+        """Reads every watermark; returns the tables that changed and reports them."""
+        changed = set()
+        for table in self.queries:
+            value = self._read(table)
+            previous = self.watermarks.get(table, value)
+            if value is _UNKNOWN or previous is _UNKNOWN or value != previous:
+                changed.add(table)
+            self.watermarks[table] = value
+
+        if changed:
+            logging.info(f"Watermarks moved: {', '.join(sorted(changed))}")
+            try:
+                self.on_change(changed)
+            except Exception as e:
+                logging.error(f"Watermark change handler failed: {e}")
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.poll()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="watermark-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
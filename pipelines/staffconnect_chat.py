@@ -10,8 +10,11 @@ requirements: aiofiles, langchain_openai, langchain_core, langchain_community, l
 
 import os
 import json
+import asyncio
 import base64
 import logging
+import threading
+import time
 import traceback
 from dotenv import load_dotenv
 from pydantic import BaseModel
@@ -19,10 +22,27 @@ from sqlalchemy import create_engine
 from langchain_openai import ChatOpenAI
 from werkzeug.utils import secure_filename
 from langchain_community.utilities import SQLDatabase
-from typing import List, Union, Generator, Iterator, Dict
+from typing import List, Union, Generator, Iterator, AsyncGenerator, Dict
+from pipelines.common_files.chart_pool import ChartPool
 from pipelines.common_files.logging_utils import OpenObserveHTTPHandler
-from pipelines.common_files.ui_utils import format_result_for_ui
+from pipelines.common_files.question_cache import QuestionCache, load_sentence_embedder
+from pipelines.common_files.result_cache import ResultCache
+from pipelines.common_files.schema_cache import SchemaCache
+from pipelines.common_files.sql_utils import create_async_db_engine
+from pipelines.common_files.ui_utils import (
+    format_result_for_ui, format_sql_block, format_table, format_truncation_note,
+)
+from pipelines.common_files.watermarks import WatermarkPoller
 from pipelines.staffconnect_chat_files.chains import create_staffconnect_chain
+from pipelines.staffconnect_chat_files.intent_classifier import LEARNED_EXAMPLES_PATH, IntentClassifier
+from pipelines.staffconnect_chat_files.registry import release_agents
+
+DEFAULT_QUESTION_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "staffconnect_chat_files", "memory", "question_cache.json"
+)
+SCHEMA_SNAPSHOT_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "staffconnect_chat_files", "memory", "schema_snapshot.pkl"
+)
 
 
 class Pipeline:
@@ -33,6 +53,45 @@ class Pipeline:
         OPENOBSERVE_USERNAME: str = ""
         OPENOBSERVE_PSWD: str = ""
         OPENAI_API_KEY: str = ""
+        # Model for the routing stage; empty uses the model selected for the request.
+        ROUTER_MODEL: str = ""
+        # Confidence the local intent classifier needs to skip the router LLM; above 1 always asks the LLM.
+        LOCAL_ROUTER_THRESHOLD: float = 0.75
+        # JSONL file the router's LLM decisions are learned into; empty uses staffconnect_chat_files/memory/router_learned.jsonl.
+        ROUTER_LEARNED_PATH: str = ""
+        # Run the graph on the event loop with async LLM and DB calls.
+        ASYNC_MODE: bool = False
+        # Async SQLAlchemy URL; empty derives it from DATABASE_URL (e.g. oracle+oracledb_async).
+        ASYNC_DATABASE_URL: str = ""
+        # Question -> generated SQL cache for the SQL agents; 0 entries disables it.
+        QUESTION_CACHE_SIZE: int = 1000
+        QUESTION_CACHE_TTL: int = 7 * 24 * 3600
+        # JSON file the cache persists to; empty uses staffconnect_chat_files/memory/question_cache.json.
+        QUESTION_CACHE_PATH: str = ""
+        # Local sentence-transformers model for similar (not just equal) questions; empty disables it.
+        QUESTION_CACHE_EMBEDDING_MODEL: str = ""
+        QUESTION_CACHE_SIMILARITY: float = 0.92
+        # Memory budget for cached SQL results; 0 disables the result cache.
+        RESULT_CACHE_MB: int = 64
+        # Result TTLs (seconds) for SQL using SYSDATE etc., other SQL, and SQL on past dates only.
+        RESULT_CACHE_VOLATILE_TTL: int = 60
+        RESULT_CACHE_DEFAULT_TTL: int = 300
+        RESULT_CACHE_HISTORICAL_TTL: int = 24 * 3600
+        # TTL for results whose tables all have watermarks; they are invalidated when one moves.
+        RESULT_CACHE_WATCHED_TTL: int = 3600
+        # Seconds between table watermark polls (MAX(Sequence), COUNT(*), ...); 0 disables polling.
+        WATERMARK_POLL_INTERVAL: float = 30.0
+        # Reflect only the agents' tables and reuse a snapshot while their DDL is unchanged.
+        SCHEMA_SNAPSHOT: bool = True
+        # Seconds between background schema version checks; 0 disables them.
+        SCHEMA_REFRESH_INTERVAL: float = 3600.0
+        # Warm processes that render charts, and the limits on each chart script.
+        CHART_WORKERS: int = 2
+        CHART_TIMEOUT: float = 30.0
+        CHART_CPU_SECONDS: float = 20.0
+        CHART_MEMORY_MB: int = 1024
+        # Let identical in-flight questions share one run.
+        coalesce: bool = False
 
     def __init__(self):
         self.type = "manifold"
@@ -45,10 +104,41 @@ class Pipeline:
             "OPENOBSERVE_USERNAME": os.getenv("OPENOBSERVE_USERNAME", "").strip('"\''), 
             "OPENOBSERVE_PSWD": os.getenv("OPENOBSERVE_PSWD", "").strip('"\''), 
             "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "").strip('"\''),
+            "ROUTER_MODEL": os.getenv("ROUTER_MODEL", "").strip('"\''),
+            "LOCAL_ROUTER_THRESHOLD": float(os.getenv("LOCAL_ROUTER_THRESHOLD", "0.75").strip('"\'') or 0.75),
+            "ROUTER_LEARNED_PATH": os.getenv("ROUTER_LEARNED_PATH", "").strip('"\''),
+            "ASYNC_MODE": os.getenv("ASYNC_MODE", "false").strip('"\'').lower() == "true",
+            "ASYNC_DATABASE_URL": os.getenv("ASYNC_DATABASE_URL", "").strip('"\''),
+            "QUESTION_CACHE_SIZE": int(os.getenv("QUESTION_CACHE_SIZE", "1000").strip('"\'') or 0),
+            "QUESTION_CACHE_TTL": int(os.getenv("QUESTION_CACHE_TTL", str(7 * 24 * 3600)).strip('"\'') or 0),
+            "QUESTION_CACHE_PATH": os.getenv("QUESTION_CACHE_PATH", "").strip('"\''),
+            "QUESTION_CACHE_EMBEDDING_MODEL": os.getenv("QUESTION_CACHE_EMBEDDING_MODEL", "").strip('"\''),
+            "QUESTION_CACHE_SIMILARITY": float(os.getenv("QUESTION_CACHE_SIMILARITY", "0.92").strip('"\'') or 0.92),
+            "RESULT_CACHE_MB": int(os.getenv("RESULT_CACHE_MB", "64").strip('"\'') or 0),
+            "RESULT_CACHE_VOLATILE_TTL": int(os.getenv("RESULT_CACHE_VOLATILE_TTL", "60").strip('"\'') or 0),
+            "RESULT_CACHE_DEFAULT_TTL": int(os.getenv("RESULT_CACHE_DEFAULT_TTL", "300").strip('"\'') or 0),
+            "RESULT_CACHE_HISTORICAL_TTL": int(os.getenv("RESULT_CACHE_HISTORICAL_TTL", str(24 * 3600)).strip('"\'') or 0),
+            "RESULT_CACHE_WATCHED_TTL": int(os.getenv("RESULT_CACHE_WATCHED_TTL", "3600").strip('"\'') or 0),
+            "WATERMARK_POLL_INTERVAL": float(os.getenv("WATERMARK_POLL_INTERVAL", "30").strip('"\'') or 0),
+            "SCHEMA_SNAPSHOT": os.getenv("SCHEMA_SNAPSHOT", "true").strip('"\'').lower() == "true",
+            "SCHEMA_REFRESH_INTERVAL": float(os.getenv("SCHEMA_REFRESH_INTERVAL", "3600").strip('"\'') or 0),
+            "CHART_WORKERS": int(os.getenv("CHART_WORKERS", "2").strip('"\'') or 2),
+            "CHART_TIMEOUT": float(os.getenv("CHART_TIMEOUT", "30").strip('"\'') or 30),
+            "CHART_CPU_SECONDS": float(os.getenv("CHART_CPU_SECONDS", "20").strip('"\'') or 0),
+            "CHART_MEMORY_MB": int(os.getenv("CHART_MEMORY_MB", "1024").strip('"\'') or 0),
         })
         self.pipelines = self.get_models()
         self._llm_map: Dict[str, Union[ChatOpenAI, None]] = {}
         self._llm_context_lengths: Dict[str, int] = {}
+        # model_id -> compiled LangGraph, built on first use of that model
+        self._graphs: Dict[str, object] = {}
+        self._graphs_lock = threading.Lock()
+        self._watermarks: Union[WatermarkPoller, None] = None
+        self._schema_cache: Union[SchemaCache, None] = None
+        # Shared by every model's graph; loaded with the first graph
+        self._classifier: Union[IntentClassifier, None] = None
+        # Owned by this instance, so a replacement started by a reload gets its own
+        self._chart_pool: Union[ChartPool, None] = None
 
     def get_models(self) -> List[Dict[str, str]]:
         return [
@@ -74,6 +164,16 @@ class Pipeline:
         cd = self.valves.CHART_DIRECTORY_STAFFCONNECT 
         if cd and not os.path.isdir(cd):
             os.makedirs(cd, exist_ok=True)
+        # Workers import matplotlib/pandas in the background, ready before the first chart
+        if self._chart_pool is not None:
+            await asyncio.to_thread(self._chart_pool.close)
+        self._chart_pool = await asyncio.to_thread(
+            ChartPool,
+            self.valves.CHART_WORKERS,
+            self.valves.CHART_TIMEOUT,
+            self.valves.CHART_CPU_SECONDS,
+            self.valves.CHART_MEMORY_MB,
+        )
 
         db_url = self.valves.DATABASE_URL
         if not db_url:
@@ -94,21 +194,66 @@ class Pipeline:
             except ValueError:
                 pass
 
+        # Schema reflection and client setup block; keep them off the event
+        # loop so other pipelines can start up concurrently.
+        await asyncio.to_thread(self._connect, db_url, connect_args)
+
+    def _connect(self, db_url: str, connect_args: dict):
         self.staffconnect_engine = create_engine(
             db_url,
             pool_pre_ping=True,
             connect_args=connect_args or None,
         )
-        self.staffconnect_db = SQLDatabase(self.staffconnect_engine)
+        if self._schema_cache is not None:
+            self._schema_cache.stop()
+            self._schema_cache = None
+        if self.valves.SCHEMA_SNAPSHOT:
+            self._schema_cache = SchemaCache(self.staffconnect_engine, SCHEMA_SNAPSHOT_PATH)
+            self.staffconnect_db = self._schema_cache.load_database()
+        else:
+            start = time.perf_counter()
+            self.staffconnect_db = SQLDatabase(self.staffconnect_engine)
+            logging.info(f"Schema reflected (full) in {time.perf_counter() - start:.3f}s")
+        # Picked up by the agents' async path (sql_utils.aexecute_sql_safe)
+        self.staffconnect_db.async_engine = None
+        if self.valves.ASYNC_MODE:
+            self.staffconnect_db.async_engine = create_async_db_engine(
+                self.valves.ASYNC_DATABASE_URL or db_url
+            )
+
+        # Picked up by the SQL agents (BaseAgent._cached_output)
+        self.staffconnect_db.question_cache = self._create_question_cache()
+        # Picked up by TrendAgent._render_chart
+        self.staffconnect_db.chart_pool = self._chart_pool
+        # Picked up by sql_utils.execute_sql_safe / aexecute_sql_safe
+        self.staffconnect_db.result_cache = None
+        if self.valves.RESULT_CACHE_MB > 0:
+            self.staffconnect_db.result_cache = ResultCache(
+                max_bytes=self.valves.RESULT_CACHE_MB * 1024 * 1024,
+                ttls={
+                    "volatile": self.valves.RESULT_CACHE_VOLATILE_TTL,
+                    "default": self.valves.RESULT_CACHE_DEFAULT_TTL,
+                    "historical": self.valves.RESULT_CACHE_HISTORICAL_TTL,
+                    "watched": self.valves.RESULT_CACHE_WATCHED_TTL,
+                },
+            )
+            if self.valves.WATERMARK_POLL_INTERVAL > 0:
+                self._start_watermarks(self.staffconnect_db.result_cache)
+
+        if self._schema_cache is not None and self.valves.SCHEMA_REFRESH_INTERVAL > 0:
+            self._schema_cache.start_refresh(
+                self.staffconnect_db,
+                self.valves.SCHEMA_REFRESH_INTERVAL,
+                on_refresh=self._on_schema_change,
+            )
 
         llm_main = None
+        llm_o3 = None
         llm_context_lengths = {}
 
         if self.valves.OPENAI_API_KEY:
             os.environ["OPENAI_API_KEY"] = self.valves.OPENAI_API_KEY
             llm_main = ChatOpenAI(model="gpt-4o-mini", temperature=0.1)
-        if self.valves.OPENAI_API_KEY:
-            os.environ["OPENAI_API_KEY"] = self.valves.OPENAI_API_KEY
             llm_o3 = ChatOpenAI(model="o3-mini")
 
         self._llm_map = {
@@ -117,13 +262,129 @@ class Pipeline:
         }
         self._llm_context_lengths = llm_context_lengths
 
-        # Build the LangGraph multi-agent chain
-        self.staffconnect_chain = create_staffconnect_chain(llm_main, self.staffconnect_db)
+        # LangGraph multi-agent chains are compiled per model on first use
+        with self._graphs_lock:
+            self._graphs = {}
+            self._classifier = None
+
+    def _create_question_cache(self) -> Union[QuestionCache, None]:
+        if self.valves.QUESTION_CACHE_SIZE <= 0:
+            return None
+        embedder = None
+        if self.valves.QUESTION_CACHE_EMBEDDING_MODEL:
+            embedder = load_sentence_embedder(self.valves.QUESTION_CACHE_EMBEDDING_MODEL)
+        return QuestionCache(
+            path=self.valves.QUESTION_CACHE_PATH or DEFAULT_QUESTION_CACHE_PATH,
+            max_entries=self.valves.QUESTION_CACHE_SIZE,
+            ttl=self.valves.QUESTION_CACHE_TTL,
+            embedder=embedder,
+            similarity=self.valves.QUESTION_CACHE_SIMILARITY,
+        )
+
+    def _on_schema_change(self):
+        # Cached results and SQL may not match the new columns
+        result_cache = getattr(self.staffconnect_db, "result_cache", None)
+        if result_cache is not None:
+            result_cache.clear()
+
+    def _start_watermarks(self, result_cache: ResultCache):
+        """Invalidates cached results and charts when a table they read changes."""
+        if self._watermarks is not None:
+            self._watermarks.stop()
+        self._watermarks = WatermarkPoller(
+            self.staffconnect_db,
+            result_cache.invalidate_tables,
+            interval=self.valves.WATERMARK_POLL_INTERVAL,
+        )
+        self._watermarks.start()
+        result_cache.watched = self._watermarks.tables
+
+    def metrics(self) -> Dict[str, float]:
+        """Cache counters, exported by the gateway's /metrics endpoint."""
+        db = getattr(self, "staffconnect_db", None)
+        stats = {}
+        for name in ("question_cache", "result_cache"):
+            cache = getattr(db, name, None)
+            if cache is not None:
+                stats.update({f"{name}_{key}": value for key, value in cache.stats().items()})
+        return stats
+
+    def _get_llm(self, model_id: str) -> Union[ChatOpenAI, None]:
+        llm = self._llm_map.get(model_id)
+        if llm is None and model_id and self.valves.OPENAI_API_KEY:
+            # Stage models (e.g. ROUTER_MODEL) may name models not offered in the UI.
+            llm = ChatOpenAI(model=model_id, temperature=0)
+            self._llm_map[model_id] = llm
+        return llm
+
+    def _get_graph(self, model_id: str):
+        """Returns the compiled graph for `model_id`, building it on first use."""
+        with self._graphs_lock:
+            graph = self._graphs.get(model_id)
+            if graph is None:
+                llm = self._llm_map.get(model_id)
+                router_llm = self._get_llm(self.valves.ROUTER_MODEL) or llm
+                if self._classifier is None:
+                    self._classifier = IntentClassifier.load(
+                        learned_path=self.valves.ROUTER_LEARNED_PATH or LEARNED_EXAMPLES_PATH
+                    )
+                graph = create_staffconnect_chain(
+                    llm, self.staffconnect_db, router_llm=router_llm, classifier=self._classifier
+                )
+                self._graphs[model_id] = graph
+            self._classifier.threshold = self.valves.LOCAL_ROUTER_THRESHOLD
+            return graph
+
+    async def _aget_graph(self, model_id: str):
+        """_get_graph for the event loop: the first build runs in a worker thread."""
+        graph = self._graphs.get(model_id)
+        if graph is None:
+            # Compiling the graph and loading the classifier block for a while
+            return await asyncio.to_thread(self._get_graph, model_id)
+        classifier = self._classifier
+        if classifier is not None:
+            classifier.threshold = self.valves.LOCAL_ROUTER_THRESHOLD
+        return graph
 
     async def on_shutdown(self):
         print(f"Pipeline {self.name} shutting down…")
+        if self._chart_pool is not None:
+            await asyncio.to_thread(self._chart_pool.close)
+            self._chart_pool = None
+        if self._watermarks is not None:
+            await asyncio.to_thread(self._watermarks.stop)
+            self._watermarks = None
+        if self._schema_cache is not None:
+            await asyncio.to_thread(self._schema_cache.stop)
+        if getattr(self, "staffconnect_db", None) is not None:
+            release_agents(self.staffconnect_db)
+            async_engine = getattr(self.staffconnect_db, "async_engine", None)
+            if async_engine is not None:
+                await async_engine.dispose()
+
+    def _load_chart(self, response: dict) -> Union[str, None]:
+        encoded_image = response.get("chart_base64")
+        filename = response.get("chart_filename")
+
+        if not encoded_image and filename:
+            if not filename.lower().endswith(".png"):
+                filename += ".png"
+            base_name = os.path.basename(filename)
+            safe_name = secure_filename(base_name)
+            chart_path = os.path.join(self.valves.CHART_DIRECTORY_STAFFCONNECT, safe_name)
+            try:
+                with open(chart_path, "rb") as f:
+                    encoded_image = base64.b64encode(f.read()).decode("utf-8")
+            except Exception as e:
+                self.logger.error(f"Chart load error: {e}", extra={"custom_job_name": self.name})
+        return encoded_image
 
-    def pipe(self, user_message: str, model_id: str, messages: List[dict], body: dict) -> Union[str, Iterator, Generator]:
+    def pipe(self, user_message: str, model_id: str, messages: List[dict], body: dict) -> Union[str, Iterator, Generator, AsyncGenerator]:
+        """
+        Streams Open WebUI status events while the graph runs, and sends the SQL
+        block and result table as soon as the agent has them. With ASYNC_MODE
+        the graph runs on the event loop and an async generator is returned.
+        """
         try:
             if isinstance(body, str):
                 body = json.loads(body)
@@ -138,43 +399,146 @@ class Pipeline:
                     }
                 )
 
-            # Run the LangGraph multi-agent chain
+            if self.valves.ASYNC_MODE:
+                return self._astream_answer(question, model_id)
+            return self._stream_answer(question, model_id)
+
+        except Exception:
+            return self._failure()[-1]
+
+    def _stream_answer(self, question: str, model_id: str) -> Generator:
+        try:
+            yield status_event("Routing question…")
+            progress = StreamProgress()
+            # Run the LangGraph multi-agent chain for the selected model; "updates"
+            # reports each finished node, "custom" the agents' progress events.
+            state = {"question": question, "route": None, "response": None}
+            for mode, chunk in self._get_graph(model_id).stream(
+                state, stream_mode=["updates", "custom"]
+            ):
+                yield from progress.render(mode, chunk)
+            yield from progress.finish(self._load_chart)
+        except Exception:
+            yield from self._failure()
+
+    async def _astream_answer(self, question: str, model_id: str) -> AsyncGenerator:
+        try:
+            yield status_event("Routing question…")
+            progress = StreamProgress()
             state = {"question": question, "route": None, "response": None}
-            result = self.staffconnect_chain.invoke(state)
-            response = result.get("response", {})
-            route = result.get("route", "")
-
-            # Embed chart if returned
-            encoded_image = response.get("chart_base64") if isinstance(response, dict) else None
-            filename = response.get("chart_filename") if isinstance(response, dict) else None
-
-            if not encoded_image and filename:
-                if not filename.lower().endswith(".png"):
-                    filename += ".png"
-                base_name = os.path.basename(filename)
-                safe_name = secure_filename(base_name)
-                chart_path = os.path.join(self.valves.CHART_DIRECTORY_STAFFCONNECT, safe_name)
-                try:
-                    with open(chart_path, "rb") as f:
-                        encoded_image = base64.b64encode(f.read()).decode("utf-8")
-                except Exception as e:
-                    self.logger.error(f"Chart load error: {e}", extra={"custom_job_name": self.name})
-
-            if isinstance(response, dict):
-                markdown = format_result_for_ui(response)
-                if encoded_image:
-                    return f"{markdown}\n\n![image](data:image/png;base64,{encoded_image})"
-                return markdown
-            elif isinstance(response, str):
-                return f"Routed to: `{route}`\n\n{response}"
-            else:
-                return str(response)
-            
+            graph = await self._aget_graph(model_id)
+            async for mode, chunk in graph.astream(
+                state, stream_mode=["updates", "custom"]
+            ):
+                for item in progress.render(mode, chunk):
+                    yield item
+            # Reading the chart file is blocking I/O
+            for item in await asyncio.to_thread(progress.finish, self._load_chart):
+                yield item
         except Exception:
-            tb = traceback.format_exc()
-            self.logger.error(f"Uncaught exception:\n{tb}",
-                              extra={"custom_job_name": self.name})
-            return json.dumps({
+            for item in self._failure():
+                yield item
+
+    def _failure(self) -> list:
+        tb = traceback.format_exc()
+        self.logger.error(f"Uncaught exception:\n{tb}",
+                          extra={"custom_job_name": self.name})
+        return [
+            status_event("Failed", done=True),
+            json.dumps({
                 "error": "Internal server error. See trace for details.",
                 "trace": tb
-            })
\ No newline at end of file
+            }),
+        ]
+
+
+def status_event(description: str, done: bool = False) -> dict:
+    return {"event": {"type": "status", "data": {"description": description, "done": done}}}
+
+
+class StreamProgress:
+    """
+    Turns graph.stream()/astream() events into chat chunks: status events,
+    the routed agent, the SQL block, the table and explanation tokens as they
+    arrive, and finally whatever of the agent's answer was not sent yet.
+    """
+
+    def __init__(self):
+        self.response = {}
+        self.sent = set()
+        # True while explanation tokens are being streamed into the Insight block
+        self.insight_open = False
+
+    def render(self, mode: str, chunk: dict) -> list:
+        out = []
+        if mode == "custom":
+            stage = chunk.get("stage")
+            if stage == "token":
+                text = chunk.get("text", "")
+                if not self.insight_open:
+                    text = text.lstrip()
+                    if not text or "explanation" in self.sent:
+                        return out
+                    out.append(status_event("Writing insight…"))
+                    text = f"Insight:\n> {text}"
+                    self.sent.add("explanation")
+                    self.insight_open = True
+                out.append(text)
+                return out
+
+            out.extend(self._close_insight())
+            if stage == "sql":
+                out.append(status_event("SQL generated, querying database…"))
+                out.append(format_sql_block(chunk["sql_query"]) + "\n\n")
+                self.sent.add("sql_query")
+            elif stage == "rows":
+                rows = chunk.get("rows") or []
+                truncated = chunk.get("truncated")
+                out.append(status_event(f"{len(rows)}{'+' if truncated else ''} rows fetched"))
+                if rows and chunk.get("headers"):
+                    out.append(format_table(chunk["headers"], rows) + "\n\n")
+                    if truncated:
+                        out.append(format_truncation_note(len(rows)) + "\n\n")
+                    self.sent.add("table")
+            elif stage == "cache":
+                out.append(status_event("Reusing SQL from an earlier question…"))
+            elif stage == "chart":
+                out.append(status_event("Rendering chart…"))
+            elif stage == "analysis":
+                out.append(status_event("Comparing against baseline…"))
+            return out
+
+        for node, update in chunk.items():
+            if node == "router":
+                route = (update or {}).get("route")
+                if route:
+                    out.append(status_event(f"Routed to {route} agent"))
+                    out.append(f"Routed to: `{route.capitalize()} Agent`\n\n")
+                    self.sent.add("agent")
+            elif update and "response" in update:
+                self.response = update["response"]
+        return out
+
+    def _close_insight(self) -> list:
+        if not self.insight_open:
+            return []
+        self.insight_open = False
+        return ["\n\n"]
+
+    def finish(self, load_chart) -> list:
+        out = self._close_insight()
+        response = self.response
+        if isinstance(response, dict):
+            markdown = format_result_for_ui(response, exclude=self.sent)
+            encoded_image = load_chart(response)
+            if encoded_image:
+                markdown = f"{markdown}\n\n![image](data:image/png;base64,{encoded_image})"
+            if markdown:
+                out.append(markdown)
+        elif isinstance(response, str):
+            out.append(response)
+        else:
+            out.append(str(response))
+
+        out.append(status_event("Done", done=True))
+        return out
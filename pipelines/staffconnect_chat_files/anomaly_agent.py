@@ -1,10 +1,14 @@
 import os
 import logging
+from functools import lru_cache
 from typing import List, Dict, Any
 from langchain_core.language_models import BaseLanguageModel
 from langchain_community.utilities import SQLDatabase
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_community.utilities.sql_database import truncate_word
+from pipelines.common_files.sql_utils import aexecute_sql_safe, execute_sql_safe
 from pipelines.staffconnect_chat_files.base_agent import BaseAgent
+from pipelines.staffconnect_chat_files.registry import register_agent
 
 ANOMALY_ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
     ("system",
@@ -19,49 +23,102 @@ Output: A short, human-readable summary of anomalies, root causes, and recommend
     ("user", "{input}")
 ])
 
+@lru_cache(maxsize=1)
+def load_baseline_memory() -> str:
+    """Reads the ELMAH baseline once per process; it only changes on redeploy."""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    path = os.path.join(current_dir, "memory", "elmah_baseline.txt")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except Exception:
+        return "No baseline found."
+
 class AnomalyAgent(BaseAgent):
     def __init__(self, llm: BaseLanguageModel, db: SQLDatabase):
         super().__init__(llm, db, "Anomaly")
         self.chain = ANOMALY_ANALYSIS_PROMPT | self.llm
-        self.memory_summary = self._load_baseline_memory()
-
-    def _load_baseline_memory(self) -> str:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        path = os.path.join(current_dir, "memory", "elmah_baseline.txt")
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return f.read()
-        except Exception:
-            return "No baseline found."
+        self.memory_summary = load_baseline_memory()
 
-    def run(self, question: str, history: List[Dict[str, str]] = []) -> Dict[str, Any]:
-        try:
-            sql_query = """
+    CURRENT_LOGS_SQL = """
 SELECT ErrorId, Application, Type, Source, Message, TimeUtc
 FROM ELMAH_Error
 WHERE TimeUtc >= SYSDATE - 1
 ORDER BY TimeUtc DESC
 FETCH NEXT 50 ROWS ONLY
 """
-            current_logs = self.db.run(sql_query)
-            
-            full_input = (
-                f"Baseline: {self.memory_summary}\n\n"
-                f"Current Logs: {current_logs}\n\n"
-                f"User Question: {question}"
+
+    def _analysis_input(self, current_logs: str, question: str) -> Dict[str, str]:
+        full_input = (
+            f"Baseline: {self.memory_summary}\n\n"
+            f"Current Logs: {current_logs}\n\n"
+            f"User Question: {question}"
+        )
+        return {"input": full_input}
+
+    def _format_logs(self, rows) -> str:
+        """The text db.run() would produce: one tuple per row, long values truncated."""
+        length = getattr(self.db, "_max_string_length", 300)
+        logs = [
+            tuple(
+                truncate_word(value, length=length)
+                for value in (row.values() if isinstance(row, dict) else row)
             )
+            for row in rows
+        ]
+        return str(logs) if logs else ""
+
+    def _result(self, sql_query: str, explanation: str) -> Dict[str, Any]:
+        return {
+            "agent": self.name.lower(),
+            "sql_query": sql_query,
+            "explanation": explanation
+        }
+
+    def run(self, question: str, history: List[Dict[str, str]] = []) -> Dict[str, Any]:
+        try:
+            sql_query = self.CURRENT_LOGS_SQL
+            self._emit("sql", sql_query=sql_query)
+            # Through execute_sql_safe so concurrent anomaly questions share the result cache
+            headers, rows, error = execute_sql_safe(self.db, sql_query)
+            if error:
+                raise RuntimeError(error)
+            current_logs = self._format_logs(rows)
+            self._emit("analysis")
+
+            # Streams the narrative token by token when run inside the graph
+            explanation = self._stream_chain(self.chain, self._analysis_input(current_logs, question))
+            return self._result(sql_query, explanation)
+
+        except Exception as e:
+            self.logger.error(f"Anomaly Agent error: {e}")
+            return {"error": str(e)}
+
+    async def arun(self, question: str, history: List[Dict[str, str]] = []) -> Dict[str, Any]:
+        try:
+            sql_query = self.CURRENT_LOGS_SQL
+            self._emit("sql", sql_query=sql_query)
+            headers, rows, error = await aexecute_sql_safe(self.db, sql_query)
+            if error:
+                raise RuntimeError(error)
+            current_logs = self._format_logs(rows)
+            self._emit("analysis")
 
-            response = self.chain.invoke({"input": full_input})
-            return {
-                "agent": self.name.lower(),
-                "sql_query": sql_query,
-                "explanation": response.content
-            }
+            explanation = await self._astream_chain(self.chain, self._analysis_input(current_logs, question))
+            return self._result(sql_query, explanation)
 
         except Exception as e:
             self.logger.error(f"Anomaly Agent error: {e}")
             return {"error": str(e)}
 
+@register_agent(
+    "anomaly",
+    "questions comparing baseline logs vs current logs for deviations or anomalies.",
+    keywords=(
+        r"\banomal", r"\bbaseline", r"\bdeviat", r"\b(un)?usual", r"\boutliers?\b",
+        r"\b(ab)?normal\b", r"\bexpected\b", r"\bout of the ordinary\b",
+    ),
+)
 def build_anomaly_agent(llm: BaseLanguageModel, db: SQLDatabase):
     agent = AnomalyAgent(llm, db)
-    return agent.run
+    return agent
@@ -1,10 +1,12 @@
 import re
+import asyncio
 import logging
 from typing import List, Dict, Any
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_community.utilities import SQLDatabase
 from langchain_core.language_models import BaseLanguageModel
 from pipelines.staffconnect_chat_files.base_agent import BaseAgent
+from pipelines.staffconnect_chat_files.registry import register_agent
 
 AUDITTRAIL_SQL_GENERATION_PROMPT = ChatPromptTemplate.from_messages([
     (
@@ -49,16 +51,44 @@ class AuditTrailAgent(BaseAgent):
     def run(self, question: str, history: List[Dict[str, str]] = []) -> Dict[str, Any]:
         try:
             messages = history + [{"role": "user", "content": question}]
-            response = self.chain.invoke({"messages": messages})
-            sql_query = response.content.replace('\n', ' ').strip()
+            output = self._cached_output(question, history)
+            cached = output is not None
+            if not cached:
+                response = self.chain.invoke({"messages": messages})
+                output = {"sql_query": response.content.replace('\n', ' ').strip()}
             
             # Use base class helper for execution
-            return self._execute_query(sql_query)
+            result = self._execute_query(output["sql_query"])
+            self._cache_outcome(question, history, output, result, cached)
+            return result
 
         except Exception as e:
             self.logger.error(f"AuditTrail Agent error: {e}")
             return {"error": str(e)}
 
+    async def arun(self, question: str, history: List[Dict[str, str]] = []) -> Dict[str, Any]:
+        try:
+            messages = history + [{"role": "user", "content": question}]
+            output = await asyncio.to_thread(self._cached_output, question, history)
+            cached = output is not None
+            if not cached:
+                response = await self.chain.ainvoke({"messages": messages})
+                output = {"sql_query": response.content.replace('\n', ' ').strip()}
+            
+            # Use base class helper for execution
+            result = await self._aexecute_query(output["sql_query"])
+            await asyncio.to_thread(self._cache_outcome, question, history, output, result, cached)
+            return result
+
+        except Exception as e:
+            self.logger.error(f"AuditTrail Agent error: {e}")
+            return {"error": str(e)}
+
+@register_agent(
+    "audittrail",
+    "questions related to audit trail logs, user activity, login/logout, shift changes.",
+    keywords=(r"\baudit", r"\blog ?(in|on|out)s?\b", r"\bshifts?\b", r"\buser activit", r"\bsign(ed)? (in|out)\b"),
+)
 def build_audittrail_agent(llm: BaseLanguageModel, db: SQLDatabase):
     agent = AuditTrailAgent(llm, db)
-    return agent.run
+    return agent
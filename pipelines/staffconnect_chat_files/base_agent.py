@@ -1,10 +1,13 @@
 from abc import ABC, abstractmethod
+import asyncio
 import logging
 import re
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Optional, Union
 from langchain_core.language_models import BaseLanguageModel
 from langchain_community.utilities import SQLDatabase
-from pipelines.common_files.sql_utils import execute_sql_safe
+from langgraph.config import get_stream_writer
+from pipelines.common_files.llm_utils import JsonStringFieldStreamer
+from pipelines.common_files.sql_utils import SQLResult, aexecute_sql, execute_sql
 
 class BaseAgent(ABC):
     def __init__(self, llm: BaseLanguageModel, db: SQLDatabase, name: str):
@@ -18,18 +21,103 @@ class BaseAgent(ABC):
         """Entry point for the agent logic."""
         pass
 
+    async def arun(self, question: str, history: List[Dict[str, str]] = []) -> Dict[str, Any]:
+        """Async entry point; agents without a native one run `run` in a thread."""
+        return await asyncio.to_thread(self.run, question, history)
+
+    def __call__(self, question: str, history: List[Dict[str, str]] = []) -> Dict[str, Any]:
+        return self.run(question, history)
+
+    def _emit(self, stage: str, **data):
+        """Sends a progress event to graph.stream(stream_mode="custom") consumers, if any."""
+        try:
+            writer = get_stream_writer()
+        except RuntimeError:
+            # Called outside a LangGraph run
+            return
+        writer({"agent": self.name.lower(), "stage": stage, **data})
+
+    def _cached_output(self, question: str, history: List[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+        """
+        LLM output cached for `question` by the pipeline's question cache
+        (`db.question_cache`), if any. Follow-up questions are not cached.
+        """
+        cache = getattr(self.db, "question_cache", None)
+        if cache is None or history:
+            return None
+        output = cache.get(self.name.lower(), question)
+        if output is not None:
+            self.logger.info(f"Question cache hit: {question}")
+            self._emit("cache")
+        return output
+
+    def _cache_outcome(self, question: str, history: List[Dict[str, str]],
+                       output: Dict[str, Any], result: Dict[str, Any], cached: bool):
+        """Stores LLM output whose SQL ran, and drops cached output whose SQL failed."""
+        cache = getattr(self.db, "question_cache", None)
+        if cache is None or history:
+            return
+        if "error" in result:
+            if cached:
+                cache.discard(self.name.lower(), question)
+        elif not cached:
+            cache.put(self.name.lower(), question, output)
+
+    def _stream_chain(self, chain, inputs: Dict[str, Any], field: Optional[str] = None) -> str:
+        """
+        Runs `chain` with chain.stream() and returns the complete output text.
+        Token deltas are emitted as "token" events while it runs: all of them,
+        or only the decoded text of JSON string `field` when given.
+        """
+        parts = []
+        streamer = JsonStringFieldStreamer(field) if field else None
+        for chunk in chain.stream(inputs):
+            text = getattr(chunk, "content", chunk)
+            if not isinstance(text, str) or not text:
+                continue
+            parts.append(text)
+            delta = streamer.feed(text) if streamer else text
+            if delta:
+                self._emit("token", text=delta)
+        return "".join(parts)
+
+    async def _astream_chain(self, chain, inputs: Dict[str, Any], field: Optional[str] = None) -> str:
+        """Async counterpart of `_stream_chain`, using chain.astream()."""
+        parts = []
+        streamer = JsonStringFieldStreamer(field) if field else None
+        async for chunk in chain.astream(inputs):
+            text = getattr(chunk, "content", chunk)
+            if not isinstance(text, str) or not text:
+                continue
+            parts.append(text)
+            delta = streamer.feed(text) if streamer else text
+            if delta:
+                self._emit("token", text=delta)
+        return "".join(parts)
+
     def _execute_query(self, sql_query: str) -> Dict[str, Any]:
         """Standard execution wrapper."""
         sql_query = re.sub(r'\s+', ' ', sql_query).strip()
-        headers, rows, error = execute_sql_safe(self.db, sql_query)
-        
-        if error:
-            self.logger.error(f"SQL execution failed: {error}")
-            return {"error": f"SQL execution failed: {error}", "sql_query": sql_query}
+        self._emit("sql", sql_query=sql_query)
+        return self._query_result(sql_query, execute_sql(self.db, sql_query))
+
+    async def _aexecute_query(self, sql_query: str) -> Dict[str, Any]:
+        """Async execution wrapper; see sql_utils.aexecute_sql."""
+        sql_query = re.sub(r'\s+', ' ', sql_query).strip()
+        self._emit("sql", sql_query=sql_query)
+        return self._query_result(sql_query, await aexecute_sql(self.db, sql_query))
+
+    def _query_result(self, sql_query: str, result: SQLResult) -> Dict[str, Any]:
+        if result.error:
+            self.logger.error(f"SQL execution failed: {result.error}")
+            return {"error": f"SQL execution failed: {result.error}", "sql_query": sql_query}
+
+        self._emit("rows", headers=result.headers, rows=result.rows, truncated=result.truncated)
 
         return {
             "agent": self.name.lower(),
             "sql_query": sql_query,
-            "headers": headers,
-            "rows": rows,
+            "headers": result.headers,
+            "rows": result.rows,
+            "truncated": result.truncated,
         }
@@ -0,0 +1,201 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pipelines.staffconnect_chat_files.registry import agent_specs
+
+# Hand-labeled seed questions, kept in git
+EXAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "memory", "router_examples.jsonl"
+)
+# Questions labeled by the LLM router at runtime (gitignored)
+LEARNED_EXAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "memory", "router_learned.jsonl"
+)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    route: Optional[str]
+    confidence: float
+    source: str  # "rules", "knn", "rules+knn" or "none"
+
+
+def _features(text: str, dims: int) -> Dict[int, float]:
+    """
+    Hashed, L2-normalised bag of word unigrams and bigrams. crc32 keeps the
+    hashing stable across processes, unlike hash().
+    """
+    tokens = _TOKEN.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    counts: Dict[int, float] = {}
+    for gram in grams:
+        index = zlib.crc32(gram.encode("utf-8")) % dims
+        counts[index] = counts.get(index, 0.0) + 1.0
+
+    for index, count in counts.items():
+        counts[index] = 1.0 + math.log(count)
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {index: value / norm for index, value in counts.items()}
+
+
+def _cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+
+class IntentClassifier:
+    """
+    Local router that answers confident cases without an LLM call.
+
+    Keyword rules registered with each agent are tried first. They are only
+    trusted when the top route leads the runner-up by `min_rule_hits`
+    keyword hits, so one broad word ("errors", "plot") is not enough on its
+    own; it still counts when the kNN vote below picks the same route. If the
+    rules are ambiguous, a k-nearest-neighbour vote over hashed n-gram vectors of
+    labeled example questions decides. Decisions under `threshold` return
+    no route so the caller can fall back to the LLM router, whose answers can
+    be fed back with `record()` to grow the example set; they are appended
+    to `learned_path`, never to the seed examples.
+    """
+
+    def __init__(
+        self,
+        examples: Iterable[Tuple[str, str]] = (),
+        keywords: Optional[Dict[str, Iterable[str]]] = None,
+        threshold: float = 0.75,
+        k: int = 5,
+        min_rule_hits: int = 2,
+        min_similarity: float = 0.25,
+        dims: int = 2 ** 18,
+        learned_path: Optional[str] = None,
+    ):
+        self.threshold = threshold
+        self.k = k
+        self.min_rule_hits = min_rule_hits
+        self.min_similarity = min_similarity
+        self.dims = dims
+        self.learned_path = learned_path
+
+        self._rules = {
+            route: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for route, patterns in (keywords or {}).items()
+        }
+        self._lock = threading.Lock()
+        self._examples: List[Tuple[Dict[int, float], str]] = []
+        self._seen = set()
+        for question, route in examples:
+            self._add(question, route)
+
+    @staticmethod
+    def _read_examples(path: str, routes) -> List[Tuple[str, str]]:
+        examples = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("route") in routes and record.get("question"):
+                    examples.append((record["question"], record["route"]))
+        return examples
+
+    @classmethod
+    def load(
+        cls, path: str = EXAMPLES_PATH, learned_path: str = LEARNED_EXAMPLES_PATH, **kwargs
+    ) -> "IntentClassifier":
+        """
+        Builds a classifier from the registered agents' keywords, the seed
+        examples at `path` and the learned ones at `learned_path`.
+        """
+        specs = agent_specs()
+        routes = {spec.route for spec in specs}
+        examples = []
+        try:
+            examples += cls._read_examples(path, routes)
+        except OSError:
+            logging.warning(f"No router examples at {path}")
+        try:
+            examples += cls._read_examples(learned_path, routes)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"Could not read learned router examples: {e}")
+
+        keywords = {spec.route: spec.keywords for spec in specs if spec.keywords}
+        return cls(examples, keywords=keywords, learned_path=learned_path, **kwargs)
+
+    def _add(self, question: str, route: str) -> bool:
+        key = (question.strip().lower(), route)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        self._examples.append((_features(question, self.dims), route))
+        return True
+
+    def classify_rules(self, question: str) -> RouteDecision:
+        hits = {
+            route: sum(1 for pattern in patterns if pattern.search(question))
+            for route, patterns in self._rules.items()
+        }
+        ranked = sorted(hits.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or not ranked[0][1]:
+            return RouteDecision(None, 0.0, "rules")
+        route, top = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0
+        return RouteDecision(route, (top - runner_up) / max(top, self.min_rule_hits), "rules")
+
+    def classify_knn(self, question: str) -> RouteDecision:
+        vector = _features(question, self.dims)
+        with self._lock:
+            scored = [(_cosine(vector, example), route) for example, route in self._examples]
+        neighbours = sorted(scored, reverse=True)[: self.k]
+        neighbours = [(score, route) for score, route in neighbours if score >= self.min_similarity]
+        if not neighbours:
+            return RouteDecision(None, 0.0, "knn")
+
+        votes: Dict[str, float] = {}
+        for score, route in neighbours:
+            votes[route] = votes.get(route, 0.0) + score
+        route, weight = max(votes.items(), key=lambda item: item[1])
+        # One pseudo-vote of `min_similarity` for "none of these", so a single
+        # weak match is not reported as certain.
+        return RouteDecision(route, weight / (sum(votes.values()) + self.min_similarity), "knn")
+
+    def classify(self, question: str) -> RouteDecision:
+        """Returns a confident local decision, or one with route None."""
+        rules = self.classify_rules(question)
+        if rules.route and rules.confidence >= self.threshold:
+            return rules
+        knn = self.classify_knn(question)
+        if knn.route and knn.confidence >= self.threshold:
+            return knn
+        # A keyword lead too small to trust alone, confirmed by the examples
+        if rules.route and knn.route == rules.route:
+            confidence = 1.0 - (1.0 - rules.confidence) * (1.0 - knn.confidence)
+            if confidence >= self.threshold:
+                return RouteDecision(rules.route, confidence, "rules+knn")
+        return RouteDecision(None, 0.0, "none")
+
+    def record(self, question: str, route: str, source: str = "llm"):
+        """Adds a labeled question and appends it to the learned examples file."""
+        with self._lock:
+            if not self._add(question, route) or not self.learned_path:
+                return
+            try:
+                with open(self.learned_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"question": question, "route": route, "source": source}) + "\n")
+            except OSError as e:
+                logging.warning(f"Could not record router example: {e}")
@@ -0,0 +1,76 @@
+import importlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from langchain_community.utilities import SQLDatabase
+from langchain_core.language_models import BaseLanguageModel
+
+# Agent modules, imported in this order so the router lists routes in a
+# stable order and falls back to the first one.
+AGENT_MODULES = [
+    "pipelines.staffconnect_chat_files.audittrail_agent",
+    "pipelines.staffconnect_chat_files.elmah_error_agent",
+    "pipelines.staffconnect_chat_files.trend_agent",
+    "pipelines.staffconnect_chat_files.anomaly_agent",
+]
+
+
+@dataclass(frozen=True)
+class AgentSpec:
+    route: str
+    description: str
+    # Returns the agent: callable with a question, and awaitable through `arun`
+    build: Callable[[BaseLanguageModel, SQLDatabase], Any]
+    # Regexes that point a question at this route without asking the router LLM
+    keywords: Tuple[str, ...] = ()
+
+    @property
+    def node(self) -> str:
+        return f"{self.route}_agent"
+
+
+_SPECS: Dict[str, AgentSpec] = {}
+# (route, id(llm), id(db)) -> (llm, db, agent); llm and db are kept so their ids stay unique.
+_INSTANCES: Dict[Tuple[str, int, int], Tuple[Any, Any, Callable]] = {}
+_lock = threading.Lock()
+
+
+def register_agent(route: str, description: str, keywords: Iterable[str] = ()):
+    """
+    Registers an agent factory under a router category. `description` is shown
+    to the router LLM when it classifies a question; `keywords` feed the local
+    intent classifier that runs before it.
+    """
+    def decorator(build):
+        _SPECS[route] = AgentSpec(route, description, build, tuple(keywords))
+        return build
+    return decorator
+
+
+def agent_specs() -> List[AgentSpec]:
+    for module_name in AGENT_MODULES:
+        importlib.import_module(module_name)
+    return list(_SPECS.values())
+
+
+def get_agent(route: str, llm: BaseLanguageModel, db: SQLDatabase) -> Callable[..., Dict[str, Any]]:
+    """Returns the agent for `route`, building it only once per (llm, db) pair."""
+    key = (route, id(llm), id(db))
+    with _lock:
+        cached = _INSTANCES.get(key)
+        if cached is None:
+            agent_specs()
+            cached = (llm, db, _SPECS[route].build(llm, db))
+            _INSTANCES[key] = cached
+        return cached[2]
+
+
+def get_agents(llm: BaseLanguageModel, db: SQLDatabase) -> Dict[str, Callable[..., Dict[str, Any]]]:
+    return {spec.route: get_agent(spec.route, llm, db) for spec in agent_specs()}
+
+
+def release_agents(db: SQLDatabase):
+    """Drops the agents built for `db`, e.g. when its pipeline shuts down."""
+    with _lock:
+        for key in [key for key, cached in _INSTANCES.items() if cached[1] is db]:
+            del _INSTANCES[key]
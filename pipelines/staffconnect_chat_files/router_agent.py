@@ -1,30 +1,34 @@
+import asyncio
 import logging
-from typing import Literal, TypedDict
+from typing import Optional, TypedDict
 from langchain_core.runnables import Runnable, RunnableLambda
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_community.utilities import SQLDatabase
 from langchain_core.language_models import BaseLanguageModel
 
-from pipelines.staffconnect_chat_files.audittrail_agent import build_audittrail_agent
-from pipelines.staffconnect_chat_files.elmah_error_agent import build_elmah_agent
-from pipelines.staffconnect_chat_files.trend_agent import build_trend_agent
-from pipelines.staffconnect_chat_files.anomaly_agent import build_anomaly_agent
+from pipelines.staffconnect_chat_files.intent_classifier import IntentClassifier
+from pipelines.staffconnect_chat_files.registry import agent_specs, get_agents
+
+NUMBER_WORDS = {2: "two", 3: "three", 4: "four", 5: "five", 6: "six", 7: "seven", 8: "eight"}
 
 class RouteOutput(TypedDict):
-    route: Literal["audittrail", "elmah", "trend", "anomaly"]
+    # One of the registered agent routes
+    route: str
 
 
 def create_router_prompt() -> ChatPromptTemplate:
-    system = """You are an intent classifier for a staffconnect application with access to various agents.
+    specs = agent_specs()
+    categories = "\n".join(f"- {spec.route}: {spec.description}" for spec in specs)
+    routes = ", ".join(spec.route for spec in specs)
+    count = NUMBER_WORDS.get(len(specs), str(len(specs)))
+
+    system = f"""You are an intent classifier for a staffconnect application with access to various agents.
 
 Classify the user question into one of the following categories:
 
-- audittrail: questions related to audit trail logs, user activity, login/logout, shift changes.
-- elmah: questions about ELMAH error logs, including application errors, API issues, or failed web requests.
-- trend: time-based trend or visualization questions (login frequency, error spikes, charts).
-- anomaly: questions comparing baseline logs vs current logs for deviations or anomalies.
+{categories}
 
-Respond only with one of the four words: audittrail, elmah, trend, anomaly.
+Respond only with one of the {count} words: {routes}.
 
 Do not answer the question. Just classify it."""
     return ChatPromptTemplate.from_messages([
@@ -32,8 +36,13 @@ Do not answer the question. Just classify it."""
         ("human", "{question}")
     ])
 
-def create_router(llm: BaseLanguageModel) -> Runnable:
+def create_router(llm: BaseLanguageModel, classifier: Optional[IntentClassifier] = None) -> Runnable:
+    """
+    LLM intent classifier. With a `classifier`, questions it routes confidently
+    skip the LLM call, and valid LLM decisions are recorded as new examples.
+    """
     prompt = create_router_prompt()
+    routes = [spec.route for spec in agent_specs()]
     
     def extract_route(output):
         # Handle dict, AIMessage, or plain string
@@ -45,26 +54,55 @@ def create_router(llm: BaseLanguageModel) -> Runnable:
             text = str(output)
         text = text.strip().lower()
 
-        valid_routes = {"audittrail", "elmah", "trend", "anomaly"}
-        if text not in valid_routes:
+        if text not in routes:
             logging.error(f"[Router] Invalid route returned by LLM: {text}")
-            text = "audittrail"
+            return {"route": routes[0], "fallback": True}
 
         logging.info(f"[Router] Classified route: {text}")
         return {"route": text}
     
-    return prompt | llm | RunnableLambda(extract_route)
+    llm_router = prompt | llm | RunnableLambda(extract_route)
+    if classifier is None:
+        return llm_router
 
+    def local_route(question: str):
+        decision = classifier.classify(question)
+        if decision.route:
+            logging.info(
+                f"[Router] Local route: {decision.route} "
+                f"({decision.source}, confidence {decision.confidence:.2f})"
+            )
+            return {"route": decision.route}
+        return None
 
-def build_router_executor(llm: BaseLanguageModel, db: SQLDatabase) -> Runnable:
-    router_chain = create_router(llm)
+    def learn(question: str, output):
+        if not output.get("fallback"):
+            classifier.record(question, output["route"])
+        return output
 
-    destinations = {
-        "audittrail": build_audittrail_agent(llm, db),
-        "elmah": build_elmah_agent(llm, db),
-        "trend": build_trend_agent(llm, db),
-        "anomaly": build_anomaly_agent(llm, db),
-    }
+    def decide(inputs):
+        return local_route(inputs["question"]) or learn(inputs["question"], llm_router.invoke(inputs))
+
+    async def adecide(inputs):
+        local = local_route(inputs["question"])
+        if local:
+            return local
+        output = await llm_router.ainvoke(inputs)
+        return await asyncio.to_thread(learn, inputs["question"], output)
+
+    return RunnableLambda(decide, afunc=adecide)
+
+
+def build_router_executor(
+    llm: BaseLanguageModel,
+    db: SQLDatabase,
+    router_llm: Optional[BaseLanguageModel] = None,
+    classifier: Optional[IntentClassifier] = None,
+) -> Runnable:
+    router_chain = create_router(router_llm or llm, classifier=classifier)
+
+    # Same instances the graph dispatches to; see registry.get_agent.
+    destinations = get_agents(llm, db)
 
     return {
         "router": router_chain,
@@ -1,13 +1,17 @@
+import os
 import re
+import time
+import asyncio
 import logging
 from typing import List, Dict, Any
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_community.utilities import SQLDatabase
 from langchain_core.language_models import BaseLanguageModel
 from pipelines.staffconnect_chat_files.base_agent import BaseAgent
+from pipelines.staffconnect_chat_files.registry import register_agent
 from pipelines.common_files.llm_utils import extract_json_from_markdown
-from pipelines.common_files.sql_utils import execute_sql_safe
-from pipelines.common_files.viz_utils import get_unique_filename, python_repl, save_rows_to_csv
+from pipelines.common_files.sql_utils import SQLResult, aexecute_sql, execute_sql
+from pipelines.common_files.viz_utils import get_unique_filename, run_chart, to_dataframe
 
 TREND_SQL_GENERATION_PROMPT = ChatPromptTemplate.from_messages([
     (
@@ -34,47 +38,115 @@ class TrendAgent(BaseAgent):
         super().__init__(llm, db, "Trend")
         self.chain = TREND_SQL_GENERATION_PROMPT | self.llm
 
+    def _parse(self, content: str) -> Dict[str, str]:
+        parsed = extract_json_from_markdown(content)
+        return {
+            "sql_query": parsed.get("sql_query", "").strip(),
+            "python_code": parsed.get("python_code", ""),
+            "explanation": parsed.get("explanation", ""),
+        }
+
+    def _render_chart(self, sql_query: str, python_code: str, headers, rows, started_at: float) -> str:
+        # Same SQL and plotting code draw the same chart while the result is valid
+        result_cache = getattr(self.db, "result_cache", None)
+        if result_cache is not None:
+            cached = result_cache.get_chart(sql_query, python_code)
+            if cached:
+                return cached
+
+        chart_filename = get_unique_filename.invoke({"a": 0})
+        # The result's arrays go straight to the plotting code as `df`; no temporary CSV
+        chart_pool = getattr(self.db, "chart_pool", None)
+        run_chart(python_code, to_dataframe(headers, rows), chart_filename, pool=chart_pool)
+        if result_cache is not None and os.path.exists(chart_filename):
+            result_cache.put_chart(sql_query, python_code, chart_filename, started_at=started_at)
+        return chart_filename
+
+    def _result(self, sql_query: str, result: SQLResult, chart_filename: str, explanation: str) -> Dict[str, Any]:
+        return {
+            "agent": self.name.lower(),
+            "sql_query": sql_query,
+            "headers": result.headers,
+            "rows": result.rows,
+            "truncated": result.truncated,
+            "chart_filename": chart_filename,
+            "explanation": explanation
+        }
+
     def run(self, question: str, history: List[Dict[str, str]] = []) -> Dict[str, Any]:
         try:
             messages = history + [{"role": "user", "content": question}]
-            response = self.chain.invoke({"messages": messages})
-            parsed = extract_json_from_markdown(response.content)
-
-            sql_query = parsed.get("sql_query", "").strip()
-            python_code = parsed.get("python_code", "")
-            explanation = parsed.get("explanation", "")
+            output = self._cached_output(question, history)
+            cached = output is not None
+            if not cached:
+                # Streams the explanation field while the JSON is being generated
+                content = self._stream_chain(self.chain, {"messages": messages}, field="explanation")
+                output = self._parse(content)
+            sql_query, python_code, explanation = (
+                output["sql_query"], output["python_code"], output["explanation"]
+            )
 
             # Execute SQL
-            headers, rows, error = execute_sql_safe(self.db, sql_query)
-            if error:
-                return {"error": f"SQL failed: {error}", "sql_query": sql_query}
+            self._emit("sql", sql_query=sql_query)
+            started_at = time.monotonic()
+            result = execute_sql(self.db, sql_query)
+            failure = {"error": f"SQL failed: {result.error}", "sql_query": sql_query} if result.error else {}
+            self._cache_outcome(question, history, output, failure, cached)
+            if failure:
+                return failure
+            self._emit("rows", headers=result.headers, rows=result.rows, truncated=result.truncated)
 
             # Visualization logic
-            csv_filename = save_rows_to_csv(rows, headers)
-            chart_filename = get_unique_filename.invoke({"a": 0})
-
-            data_injection = f"import pandas as pd\ndf = pd.read_csv(r'{csv_filename}')\n"
-            cleanup = f"\nimport os\nos.remove(r'{csv_filename}')"
-            
-            chart_response = python_repl.invoke({
-                "code": data_injection + python_code + cleanup,
-                "sql_query": sql_query,
-                "filename": chart_filename
-            })
-
-            return {
-                "agent": self.name.lower(),
-                "sql_query": sql_query,
-                "headers": headers,
-                "rows": rows,
-                "chart_filename": chart_filename,
-                "explanation": explanation
-            }
+            self._emit("chart")
+            chart_filename = self._render_chart(sql_query, python_code, result.headers, result.rows, started_at)
+
+            return self._result(sql_query, result, chart_filename, explanation)
 
         except Exception as e:
             self.logger.error(f"Trend Agent error: {e}")
             return {"error": str(e)}
 
+    async def arun(self, question: str, history: List[Dict[str, str]] = []) -> Dict[str, Any]:
+        try:
+            messages = history + [{"role": "user", "content": question}]
+            output = await asyncio.to_thread(self._cached_output, question, history)
+            cached = output is not None
+            if not cached:
+                content = await self._astream_chain(self.chain, {"messages": messages}, field="explanation")
+                output = self._parse(content)
+            sql_query, python_code, explanation = (
+                output["sql_query"], output["python_code"], output["explanation"]
+            )
+
+            self._emit("sql", sql_query=sql_query)
+            started_at = time.monotonic()
+            result = await aexecute_sql(self.db, sql_query)
+            failure = {"error": f"SQL failed: {result.error}", "sql_query": sql_query} if result.error else {}
+            await asyncio.to_thread(self._cache_outcome, question, history, output, failure, cached)
+            if failure:
+                return failure
+            self._emit("rows", headers=result.headers, rows=result.rows, truncated=result.truncated)
+
+            # matplotlib and the REPL are blocking; keep them off the event loop
+            self._emit("chart")
+            chart_filename = await asyncio.to_thread(
+                self._render_chart, sql_query, python_code, result.headers, result.rows, started_at
+            )
+
+            return self._result(sql_query, result, chart_filename, explanation)
+
+        except Exception as e:
+            self.logger.error(f"Trend Agent error: {e}")
+            return {"error": str(e)}
+
+@register_agent(
+    "trend",
+    "time-based trend or visualization questions (login frequency, error spikes, charts).",
+    keywords=(
+        r"\btrends?\b", r"\bcharts?\b", r"\bplot", r"\bgraph", r"\bvisuali[sz]", r"\bover time\b",
+        r"\bper (hour|day|week|month)\b", r"\b(daily|weekly|monthly|hourly)\b", r"\bspikes?\b",
+    ),
+)
 def build_trend_agent(llm: BaseLanguageModel, db: SQLDatabase):
     agent = TrendAgent(llm, db)
-    return agent.run
\ No newline at end of file
+    return agent
\ No newline at end of file
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+
+
+class SQLiteDB:
+    """
+    SQLDatabase stand-in over in-memory sqlite with a table t(n, d) of `rows`
+    rows. `queries` counts the SELECTs that reach sqlite; execute_sql uses the
+    DBAPI cursor directly, so they are counted at the sqlite3 level.
+    """
+
+    def __init__(self, rows=1, result_cache=None, question_cache=None):
+        self.result_cache = result_cache
+        self.question_cache = question_cache
+        self._engine = create_engine("sqlite://", poolclass=StaticPool)
+        event.listen(self._engine, "connect", lambda conn, record: conn.set_trace_callback(self._count))
+        with self._engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (n INTEGER, d TEXT)"))
+            for n in range(rows):
+                conn.execute(text("INSERT INTO t VALUES (:n, '2025-01-01')"), {"n": n + 1})
+        self.queries = 0
+
+    def _count(self, statement):
+        self.queries += statement.startswith("SELECT")
+
+
+@pytest.fixture
+def sqlite_db():
+    """Builds SQLiteDB instances: sqlite_db(rows=25, result_cache=ResultCache())."""
+    dbs = []
+
+    def make(**kwargs):
+        dbs.append(SQLiteDB(**kwargs))
+        return dbs[-1]
+
+    yield make
+    for db in dbs:
+        db._engine.dispose()
+
+
+@pytest.fixture
+def gateway(tmp_path, monkeypatch):
+    """The main module with empty pipeline state, loading pipelines from tmp_path."""
+    import main
+    from utils.pipelines.executor import PipelineExecutors
+    from utils.pipelines.registry import PipelineRegistry
+    from utils.pipelines.requirements import RequirementsResolver
+
+    monkeypatch.setattr(main, "PIPELINES_DIR", str(tmp_path))
+    for name in (
+        "PIPELINES",
+        "PIPELINE_MODULES",
+        "PIPELINE_NAMES",
+        "PIPELINE_LOAD_TIMES",
+        "LOAD_TIMINGS",
+        "PIPELINE_FILES",
+        "PIPELINE_DEPENDENCIES",
+    ):
+        monkeypatch.setattr(main, name, {})
+    monkeypatch.setattr(main, "RELOAD_LOCK", asyncio.Lock())
+    monkeypatch.setattr(main, "RETIRING_TASKS", set())
+    monkeypatch.setattr(main, "REGISTRY", PipelineRegistry(main.PIPELINE_MODULES))
+    monkeypatch.setattr(main, "PIPE_EXECUTORS", PipelineExecutors(max_concurrency=2, max_queue=2))
+    monkeypatch.setattr(main, "REQUIREMENTS", RequirementsResolver(str(tmp_path / "requirements.json")))
+    monkeypatch.setattr(main.app.state, "PIPELINES", {})
+
+    yield main
+    main.PIPE_EXECUTORS.shutdown()
@@ -0,0 +1,24 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from pipelines.staffconnect_chat_files import registry
+from pipelines.staffconnect_chat_files.chains import create_staffconnect_chain
+from pipelines.staffconnect_chat_files.router_agent import build_router_executor
+
+
+def test_agents_are_built_once_per_llm_and_db():
+    llm = FakeListChatModel(responses=["trend"])
+    db = object()
+
+    routes = [spec.route for spec in registry.agent_specs()]
+    assert routes == ["audittrail", "elmah", "trend", "anomaly"]
+
+    router = build_router_executor(llm, db)
+    graph = create_staffconnect_chain(llm, db)
+
+    assert router["destinations"] == registry.get_agents(llm, db)
+    assert {f"{route}_agent" for route in routes} <= set(graph.get_graph().nodes)
+    assert registry.get_agent("trend", llm, db) is router["destinations"]["trend"]
+    assert registry.get_agent("trend", llm, object()) is not router["destinations"]["trend"]
+
+    registry.release_agents(db)
+    assert registry.get_agent("trend", llm, db) is not router["destinations"]["trend"]
@@ -0,0 +1,39 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from pipelines.common_files.chart_pool import ChartPool
+
+
+def test_jobs_run_in_parallel_with_clean_namespaces():
+    pool = ChartPool(workers=2, timeout=30)
+    try:
+        df = pd.DataFrame({"N": range(10)})
+        jobs = [
+            "import time\nleaked = 1\ntime.sleep(0.5)\nprint(int(df['N'].sum()))",
+            "import time\ntime.sleep(0.5)\nprint('leaked' in globals(), len(df))",
+        ]
+        # Warm both workers first so only the jobs are timed
+        with ThreadPoolExecutor(2) as executor:
+            list(executor.map(lambda _: pool.render("pass"), range(2)))
+            start = time.monotonic()
+            results = list(executor.map(lambda code: pool.render(code, df), jobs))
+        assert time.monotonic() - start < 1.0
+        assert results == ["45\n", "False 10\n"]
+        assert pool.render("print(sorted(k for k in globals() if not k.startswith('__')))") == "['pd']\n"
+    finally:
+        pool.close()
+
+
+def test_runaway_job_is_stopped_and_its_worker_replaced():
+    pool = ChartPool(workers=1, timeout=30)
+    try:
+        start = time.monotonic()
+        assert pool.render("while True: pass", timeout=1) == "Execution timed out"
+        assert time.monotonic() - start < 5
+        assert pool.render("raise ValueError('bad chart')") == "ValueError('bad chart')"
+        assert pool.render("print('ok')") == "ok\n"
+        assert pool.stats()["timeouts"] == 1
+    finally:
+        pool.close()
@@ -0,0 +1,54 @@
+import asyncio
+
+from utils.pipelines.coalesce import RequestCoalescer, request_key
+
+
+def test_request_key_is_canonical():
+    messages = [{"role": "user", "content": "headcount by site"}]
+    reordered = [{"content": "headcount by site", "role": "user"}]
+
+    assert request_key("m", messages, False) == request_key("m", reordered, False)
+    assert request_key("m", messages, False) != request_key("m", messages, True)
+    assert request_key("m", messages, False) != request_key("other", messages, False)
+
+
+def test_followers_share_the_leaders_result():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"answer": 42}
+
+    async def run():
+        coalescer = RequestCoalescer()
+        leader = coalescer.lead("k", work())
+        follower = coalescer.join("k")
+        results = await asyncio.gather(leader, follower)
+        await asyncio.sleep(0)
+        return results, coalescer.join("k")
+
+    results, after = asyncio.run(run())
+    assert results == [{"answer": 42}, {"answer": 42}]
+    assert calls == [1]
+    assert after is None
+
+
+def test_stream_fans_out_to_late_subscribers():
+    async def source():
+        for chunk in ("a", "b", "c"):
+            await asyncio.sleep(0.01)
+            yield chunk
+
+    async def run():
+        coalescer = RequestCoalescer()
+        leader = coalescer.lead_stream("k", source())
+        first = await leader.__anext__()
+        follower = coalescer.join_stream("k")
+        rest = [chunk async for chunk in leader]
+        followed = [chunk async for chunk in follower]
+        return [first] + rest, followed
+
+    led, followed = asyncio.run(run())
+    assert led == ["a", "b", "c"]
+    assert followed == ["a", "b", "c"]
@@ -0,0 +1,45 @@
+import datetime
+
+import numpy as np
+
+from pipelines.common_files.columnar import ColumnarResult
+from pipelines.common_files.ui_utils import format_table
+
+
+ROWS = [
+    (1, 2.5, "web-01", datetime.datetime(2025, 7, 1, 10, 30), datetime.date(2025, 7, 1), None, True),
+    (2, 0.5, "web-02", datetime.datetime(2025, 7, 2, 11, 0), datetime.date(2025, 7, 2), "x", False),
+]
+NAMES = ["ID", "SCORE", "HOST", "TIMEUTC", "DAY", "NOTE", "FLAG"]
+
+
+def test_columnar_result_round_trips_rows():
+    result = ColumnarResult.from_rows(NAMES, ROWS)
+    text = "T" if hasattr(np.dtypes, "StringDType") else "O"
+    assert [dtype.kind for dtype in result.dtypes] == ["i", "f", text, "M", "M", text, "b"]
+    assert result == ROWS
+    assert list(result) == ROWS
+    assert result[-1] == ROWS[-1]
+    assert result[1:] == ROWS[1:]
+    assert len(ColumnarResult.from_rows(NAMES, [])) == 0
+
+
+def test_consumers_share_the_arrays():
+    result = ColumnarResult.from_rows(NAMES, ROWS)
+    df = result.to_pandas()
+    assert list(df.columns) == NAMES
+    assert np.shares_memory(df["ID"].to_numpy(), result.column("ID"))
+    assert format_table(NAMES, result) == format_table(NAMES, ROWS)
+
+
+def test_nullable_numeric_columns_are_float64_with_nan():
+    rows = [(1, 2.5, 10), (None, None, 2 ** 60), (3, 4, None)]
+    result = ColumnarResult.from_rows(["N", "MIXED", "BIG"], rows)
+    assert [dtype.kind for dtype in result.dtypes] == ["f", "f", "O"]
+    assert list(result) == [(1, 2.5, 10), (None, None, 2 ** 60), (3, 4.0, None)]
+    assert result[2:] == [(3, 4.0, None)]
+    assert format_table(["N", "MIXED", "BIG"], result).splitlines()[3] == "| None | None | 1152921504606846976 |"
+
+    df = result.to_pandas()
+    assert df["N"].dtype == np.float64 and df["N"].mean() == 2.0
+    assert df["MIXED"].isna().tolist() == [False, True, False]
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+
+import pytest
+
+from utils.pipelines.executor import (
+    AdmissionLimiter,
+    PipeExecutor,
+    PipelineExecutors,
+    QueueFullError,
+)
+
+
+def collect(executor, pipe):
+    async def run():
+        res = await executor.call(pipe, user_message="hi")
+        if isinstance(res, str):
+            return res
+        return [item async for item in executor.iterate(res)]
+
+    return asyncio.run(run())
+
+
+def test_sync_pipes_run_off_the_event_loop():
+    executor = PipeExecutor(max_workers=2)
+    main_thread = threading.current_thread()
+
+    def pipe(user_message):
+        assert threading.current_thread() is not main_thread
+        yield user_message
+        yield "!"
+
+    assert collect(executor, pipe) == ["hi", "!"]
+    executor.shutdown()
+
+
+def test_async_pipes_are_awaited_and_iterated():
+    executor = PipeExecutor(max_workers=1)
+
+    async def pipe(user_message):
+        return user_message.upper()
+
+    async def stream(user_message):
+        for char in user_message:
+            yield char
+
+    assert collect(executor, pipe) == "HI"
+    assert collect(executor, stream) == ["h", "i"]
+    executor.shutdown()
+
+
+def test_limiter_queues_then_rejects():
+    async def run():
+        limiter = AdmissionLimiter("slow", max_concurrency=1, max_queue=1)
+        first = await limiter.acquire()
+
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+
+        with pytest.raises(QueueFullError) as excinfo:
+            await limiter.acquire()
+        assert excinfo.value.retry_after >= 1
+
+        limiter.release(first)
+        second = await waiting
+        assert limiter.active == 1 and limiter.queued == 0
+        limiter.release(second)
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 0
+    assert stats["admitted"] == 2
+    assert stats["rejected"] == 1
+    assert stats["wait_seconds_max"] > 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        limiter = AdmissionLimiter("slow", max_concurrency=1, max_queue=1)
+        first = await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.sleep(0)
+        assert limiter.queued == 0
+        limiter.release(first)
+        return limiter.active
+
+    assert asyncio.run(run()) == 0
+
+
+def test_pipelines_get_their_own_executor_and_limits():
+    class Heavy:
+        max_concurrency = 2
+        max_queue = 0
+
+    class Light:
+        pass
+
+    executors = PipelineExecutors(max_concurrency=4, max_queue=8)
+    heavy_executor, heavy_limiter = executors.get("heavy", Heavy())
+    light_executor, light_limiter = executors.get("light", Light())
+
+    assert heavy_executor is not light_executor
+    assert (heavy_limiter.max_concurrency, heavy_limiter.max_queue) == (2, 0)
+    assert (light_limiter.max_concurrency, light_limiter.max_queue) == (4, 8)
+    assert executors.get("heavy", Heavy())[0] is heavy_executor
+
+    executors.discard("heavy")
+    assert list(executors.stats()) == ["light"]
+    executors.shutdown()
+
+
+def test_resized_executor_outlives_running_streams():
+    class Small:
+        max_concurrency = 1
+
+    class Large:
+        max_concurrency = 3
+
+    def pipe(user_message):
+        yield user_message
+        yield "!"
+
+    async def run():
+        executors = PipelineExecutors(max_concurrency=4, max_queue=8)
+        executor = executors.get("p", Small())[0].lease()
+        stream = executor.iterate(await executor.call(pipe, user_message="hi"))
+        assert await stream.__anext__() == "hi"
+
+        assert executors.get("p", Large())[0] is not executor
+        assert await stream.__anext__() == "!"
+        executor.release()
+        assert executor._executor._shutdown
+        executors.shutdown()
+
+    asyncio.run(run())
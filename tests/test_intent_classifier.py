@@ -0,0 +1,76 @@
+import json
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from pipelines.staffconnect_chat_files.intent_classifier import IntentClassifier
+from pipelines.staffconnect_chat_files.router_agent import create_router
+
+
+EXAMPLES = [
+    ("Who logged in yesterday?", "audittrail"),
+    ("List the shift changes made today", "audittrail"),
+    ("Show the latest ELMAH errors", "elmah"),
+    ("Which API calls failed yesterday?", "elmah"),
+    ("Plot daily error counts for this month", "trend"),
+    ("Chart the number of logins per hour today", "trend"),
+]
+
+
+def test_rules_and_knn_route_confident_questions():
+    classifier = IntentClassifier(
+        EXAMPLES,
+        keywords={
+            "anomaly": [r"\banomal", r"\bexpected\b", r"\b(un)?usual"],
+            "elmah": [r"\berrors?\b", r"\bapi\b"],
+            "trend": [r"\bchart"],
+        },
+    )
+
+    decision = classifier.classify("Any unusual anomalies today?")
+    assert (decision.route, decision.source) == ("anomaly", "rules")
+
+    # A single broad keyword is not enough to skip the LLM
+    assert classifier.classify_rules("Were there more errors than expected?").confidence < 0.75
+    assert classifier.classify("Is the api slower than expected?").route is None
+
+    decision = classifier.classify("Who logged in yesterday evening?")
+    assert (decision.route, decision.source) == ("audittrail", "knn")
+
+    # Ambiguous or unknown questions are left to the LLM
+    assert classifier.classify("Chart the anomalies").route is None
+    assert classifier.classify("What is the weather like?").route is None
+
+
+def test_router_skips_llm_when_confident_and_records_llm_decisions(tmp_path):
+    path = tmp_path / "learned.jsonl"
+    classifier = IntentClassifier(EXAMPLES, learned_path=str(path))
+    llm = FakeListChatModel(responses=["anomaly", "nonsense"])
+    router = create_router(llm, classifier=classifier)
+
+    assert router.invoke({"question": "Who logged in yesterday?"}) == {"route": "audittrail"}
+    assert llm.i == 0
+
+    question = "Compare current logs with July"
+    assert router.invoke({"question": question}) == {"route": "anomaly"}
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert records == [{"question": question, "route": "anomaly", "source": "llm"}]
+    assert classifier.classify_knn(question).route == "anomaly"
+
+    # Invalid LLM output falls back to a route but is not learned from
+    assert router.invoke({"question": "Hello there"})["route"] == "audittrail"
+    assert len(path.read_text().splitlines()) == 1
+
+
+def test_load_reads_learned_examples_without_touching_the_seed_file(tmp_path):
+    seed = tmp_path / "seed.jsonl"
+    seed.write_text(json.dumps({"question": "Who logged in yesterday?", "route": "audittrail"}) + "\n")
+    learned = tmp_path / "learned.jsonl"
+
+    classifier = IntentClassifier.load(str(seed), str(learned))
+    classifier.record("Compare current logs with July", "anomaly")
+    assert seed.read_text().count("\n") == 1
+    assert len(learned.read_text().splitlines()) == 1
+
+    reloaded = IntentClassifier.load(str(seed), str(learned))
+    assert reloaded.classify_knn("Compare current logs with July").route == "anomaly"
+    assert reloaded.classify_knn("Who logged in yesterday?").route == "audittrail"
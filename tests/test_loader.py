@@ -0,0 +1,27 @@
+import os
+
+from utils.pipelines.loader import diff_pipeline_files
+
+
+def test_diff_pipeline_files(tmp_path):
+    (tmp_path / "alpha.py").write_text("class Pipeline: pass\n")
+    (tmp_path / "beta.py").write_text("class Pipeline: pass\n")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    changed, removed, fingerprints = diff_pipeline_files(str(tmp_path), {})
+    assert sorted(changed) == ["alpha", "beta"]
+    assert removed == []
+
+    # Touching a file without changing its content is not a change.
+    os.utime(tmp_path / "alpha.py", ns=(1, 1))
+    (tmp_path / "beta.py").write_text("class Pipeline:\n    name = 'beta'\n")
+    (tmp_path / "gamma.py").write_text("class Pipeline: pass\n")
+    os.remove(tmp_path / "notes.txt")
+
+    changed, removed, _ = diff_pipeline_files(str(tmp_path), fingerprints)
+    assert sorted(changed) == ["beta", "gamma"]
+    assert removed == []
+
+    os.remove(tmp_path / "alpha.py")
+    _, removed, _ = diff_pipeline_files(str(tmp_path), fingerprints)
+    assert removed == ["alpha"]
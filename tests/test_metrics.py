@@ -0,0 +1,49 @@
+import pytest
+
+from utils.pipelines.metrics import MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    metrics = MetricsRegistry()
+    latency = metrics.histogram("pipe_seconds", "Pipe time.", ("pipeline",), buckets=(0.1, 1.0))
+    latency.observe(0.05, pipeline="sql")
+    latency.observe(0.5, pipeline="sql")
+    latency.observe(3, pipeline="sql")
+
+    lines = metrics.render().splitlines()
+
+    assert "# TYPE pipe_seconds histogram" in lines
+    assert 'pipe_seconds_bucket{pipeline="sql",le="0.1"} 1' in lines
+    assert 'pipe_seconds_bucket{pipeline="sql",le="1"} 2' in lines
+    assert 'pipe_seconds_bucket{pipeline="sql",le="+Inf"} 3' in lines
+    assert 'pipe_seconds_sum{pipeline="sql"} 3.55' in lines
+    assert 'pipe_seconds_count{pipeline="sql"} 3' in lines
+
+
+def test_histogram_quantiles():
+    metrics = MetricsRegistry()
+    latency = metrics.histogram("t", "T.", ("pipeline",), buckets=(1, 2, 3, 4))
+    for value in (0.5, 1.5, 2.5, 3.5):
+        latency.observe(value, pipeline="p")
+
+    assert latency.quantile(0.5, pipeline="p") == pytest.approx(2.0)
+    assert latency.quantile(0.99, pipeline="p") == pytest.approx(3.96)
+    assert latency.quantile(0.5, pipeline="other") is None
+
+
+def test_counters_gauges_and_label_escaping():
+    metrics = MetricsRegistry()
+    errors = metrics.counter("errors_total", "Errors.", ("pipeline", "stage"))
+    inflight = metrics.gauge("inflight", "In flight.", ("pipeline",))
+
+    errors.inc(pipeline='a"b', stage="pipe")
+    inflight.inc(pipeline="p")
+    inflight.inc(pipeline="p")
+    inflight.dec(pipeline="p")
+
+    output = metrics.render()
+    assert 'errors_total{pipeline="a\\"b",stage="pipe"} 1' in output
+    assert 'inflight{pipeline="p"} 1' in output
+
+    with pytest.raises(ValueError):
+        metrics.counter("errors_total", "Duplicate.")
@@ -0,0 +1,66 @@
+import datetime
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from pipelines.common_files.question_cache import QuestionCache, normalize_question
+from pipelines.staffconnect_chat_files.audittrail_agent import AuditTrailAgent
+
+
+def test_normalize_question_resolves_relative_dates():
+    today = datetime.date(2025, 8, 2)
+    assert normalize_question("logins yesterday", today) == "login 2025-08-01"
+    assert normalize_question("Show  Logins yesterday?", today) == "login 2025-08-01"
+    assert normalize_question("logins on 2025-08-01", today) == "login 2025-08-01"
+    assert normalize_question("errors last month", today) == "error month 2025-07"
+
+
+def test_normalize_question_keeps_count_intent():
+    today = datetime.date(2025, 8, 2)
+    count = normalize_question("How many users logged in today?", today)
+    assert count == "count user logged 2025-08-02"
+    assert normalize_question("Number of users logged in today", today) == count
+    assert normalize_question("count users logged in today", today) == count
+    assert normalize_question("Which users logged in today?", today) == "user logged 2025-08-02"
+    assert normalize_question("List all users", today) == normalize_question("Show users", today)
+    assert normalize_question("How many users are there?", today) != normalize_question("List all users", today)
+
+
+def test_question_cache_lru_ttl_and_persistence(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = QuestionCache(path=path, max_entries=2)
+    cache.put("elmah", "top errors", {"sql_query": "SELECT 1 FROM dual"})
+    cache.put("elmah", "errors by host", {"sql_query": "SELECT 2 FROM dual"})
+    assert cache.get("elmah", "Show the top errors") == {"sql_query": "SELECT 1 FROM dual"}
+    assert cache.get("audittrail", "top errors") is None
+
+    cache.put("elmah", "errors by user", {"sql_query": "SELECT 3 FROM dual"})
+    assert cache.get("elmah", "errors by host") is None  # least recently used
+
+    reloaded = QuestionCache(path=path)
+    assert reloaded.get("elmah", "errors by user") == {"sql_query": "SELECT 3 FROM dual"}
+
+    expired = QuestionCache(path=path, ttl=1e-9)
+    assert expired.get("elmah", "errors by user") is None
+
+
+def test_semantic_tier_requires_same_dates():
+    vectors = {"login 2025-08-01": [1.0, 0.0], "logon 2025-08-01": [0.99, 0.14]}
+    cache = QuestionCache(embedder=lambda texts: [vectors.get(t, [0.0, 1.0]) for t in texts])
+    cache.put("audittrail", "logins on 2025-08-01", {"sql_query": "SELECT 1 FROM dual"})
+
+    assert cache.get("audittrail", "logons on 2025-08-01") == {"sql_query": "SELECT 1 FROM dual"}
+    assert cache.semantic_hits == 1
+    assert cache.get("audittrail", "logons on 2025-08-02") is None
+
+
+def test_agent_skips_llm_on_cache_hit(sqlite_db):
+    db = sqlite_db(question_cache=QuestionCache())
+    llm = FakeListChatModel(responses=["SELECT COUNT(*) FROM t", "SELECT 0 FROM dual"])
+    agent = AuditTrailAgent(llm, db)
+
+    first = agent("number of logins yesterday")
+    second = agent("How many logins yesterday?")
+
+    assert llm.i == 1
+    assert db.queries == 2
+    assert first["rows"] == second["rows"] == [(1,)]
@@ -0,0 +1,77 @@
+from utils.pipelines.registry import PipelineRegistry
+
+
+class Manifold:
+    type = "manifold"
+    name = "Provider/"
+
+    def __init__(self):
+        self.calls = 0
+
+    def pipelines(self):
+        self.calls += 1
+        return [{"id": "small", "name": "small"}, {"id": "large", "name": "large"}]
+
+
+class Pipe:
+    name = "Plain pipe"
+
+
+def test_registry_is_built_once_until_invalidated():
+    manifold = Manifold()
+    registry = PipelineRegistry({"provider": manifold, "plain": Pipe()})
+
+    first = registry.get()
+    assert set(first) == {"provider.small", "provider.large", "plain"}
+    assert first["provider.small"]["name"] == "Provider/small"
+    assert registry.get() is first
+    assert manifold.calls == 1
+
+    generation = registry.generation
+    registry.invalidate("provider")
+    assert registry.generation == generation + 1
+    assert registry.get() is not first
+    assert manifold.calls == 2
+
+
+def test_manifold_listing_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("utils.pipelines.registry.time.monotonic", lambda: now[0])
+
+    manifold = Manifold()
+    registry = PipelineRegistry({"provider": manifold}, manifold_ttl=30)
+
+    registry.get()
+    now[0] += 10
+    registry.get()
+    assert manifold.calls == 1
+
+    now[0] += 30
+    registry.get()
+    assert manifold.calls == 2
+
+
+def test_drain_waits_for_inflight_requests():
+    import asyncio
+
+    registry = PipelineRegistry({})
+    pipeline = Pipe()
+
+    async def scenario():
+        registry.acquire(pipeline)
+        assert not await registry.drain(pipeline, timeout=0.05)
+
+        asyncio.get_running_loop().call_later(0.05, registry.release, pipeline)
+        assert await registry.drain(pipeline, timeout=1)
+        assert registry.inflight(pipeline) == 0
+
+    asyncio.run(scenario())
+
+
+def test_swap_replaces_modules():
+    registry = PipelineRegistry({"plain": Pipe()})
+    first = registry.get()
+
+    registry.swap({"other": Pipe()}, ["plain", "other"])
+    assert registry.get() is not first
+    assert set(registry.get()) == {"other"}
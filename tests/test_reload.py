@@ -0,0 +1,120 @@
+import asyncio
+
+import httpx
+import pytest
+
+PIPELINE = """
+import asyncio
+
+
+class Pipeline:
+    def __init__(self):
+        self.name = "Alpha"
+        self.version = {version}
+        self.shut_down = False
+
+    async def on_startup(self):
+        self.gate = asyncio.Event()
+        {startup}
+
+    async def on_shutdown(self):
+        self.shut_down = True
+
+    async def pipe(self, user_message, model_id, messages, body):
+        await self.gate.wait()
+        return "v{version}"
+"""
+
+
+def write_pipeline(directory, version=1, startup="pass", source=None):
+    path = directory / "alpha.py"
+    path.write_text(source or PIPELINE.format(version=version, startup=startup))
+
+
+def client(gateway):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=gateway.app), base_url="http://test")
+
+
+def test_reload_swaps_in_the_new_version_and_retires_the_old(gateway, tmp_path):
+    async def scenario():
+        write_pipeline(tmp_path, 1)
+        await gateway.on_startup()
+        old = gateway.PIPELINE_MODULES["alpha"]
+
+        write_pipeline(tmp_path, 2)
+        await gateway.reload()
+        new = gateway.PIPELINE_MODULES["alpha"]
+        assert new.version == 2
+        assert gateway.REGISTRY.get()["alpha"]["name"] == "Alpha"
+
+        await asyncio.gather(*gateway.RETIRING_TASKS)
+        assert old.shut_down and not new.shut_down
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize(
+    "broken",
+    [
+        {"source": "class Pipeline(:\n"},
+        {"version": 2, "startup": "raise RuntimeError('no database')"},
+    ],
+    ids=["import", "on_startup"],
+)
+def test_failed_replacement_keeps_the_running_version(gateway, tmp_path, broken):
+    async def scenario():
+        write_pipeline(tmp_path, 1)
+        await gateway.on_startup()
+        old = gateway.PIPELINE_MODULES["alpha"]
+
+        write_pipeline(tmp_path, **broken)
+        await gateway.reload()
+        assert gateway.PIPELINE_MODULES["alpha"] is old
+        assert gateway.REGISTRY.get()["alpha"]["name"] == "Alpha"
+        assert not gateway.RETIRING_TASKS and not old.shut_down
+        # The broken file is not recorded, so the next reload retries it.
+        assert "alpha" not in gateway.PIPELINE_FILES
+
+        write_pipeline(tmp_path, 3)
+        await gateway.reload()
+        assert gateway.PIPELINE_MODULES["alpha"].version == 3
+        await asyncio.gather(*gateway.RETIRING_TASKS)
+        assert old.shut_down
+
+    asyncio.run(scenario())
+
+
+def test_pipeline_removed_mid_request_finishes_before_shutdown(gateway, tmp_path):
+    request = {"model": "alpha", "stream": False, "messages": [{"role": "user", "content": "hi"}]}
+
+    async def scenario():
+        write_pipeline(tmp_path, 1)
+        await gateway.on_startup()
+        old = gateway.PIPELINE_MODULES["alpha"]
+
+        async with client(gateway) as http:
+            pending = asyncio.create_task(http.post("/v1/chat/completions", json=request))
+            while gateway.REGISTRY.inflight(old) == 0:
+                await asyncio.sleep(0.01)
+
+            (tmp_path / "alpha.py").unlink()
+            await gateway.reload()
+            assert "alpha" not in gateway.PIPELINE_MODULES
+
+            # Lookups that race the reload get a 404, not a KeyError.
+            assert (await http.get("/v1/alpha/valves")).status_code == 404
+            assert (await http.post("/v1/alpha/valves/update", json={})).status_code == 404
+            assert (await http.post("/v1/chat/completions", json=request)).status_code == 404
+
+            # The old instance drains its in-flight request before shutting down.
+            await asyncio.sleep(0.05)
+            assert not old.shut_down
+            old.gate.set()
+            response = await pending
+            assert response.json()["choices"][0]["message"]["content"] == "v1"
+
+        await asyncio.gather(*gateway.RETIRING_TASKS)
+        assert old.shut_down
+        assert "alpha" not in gateway.PIPE_EXECUTORS.stats()
+
+    asyncio.run(scenario())
@@ -0,0 +1,45 @@
+from utils.pipelines import requirements as requirements_module
+from utils.pipelines.requirements import (
+    RequirementsResolver,
+    is_satisfied,
+    parse_requirements,
+)
+
+
+def test_parse_requirements():
+    assert parse_requirements("requests, pydantic>=2 ,") == ["requests", "pydantic>=2"]
+    assert parse_requirements("") == []
+
+
+def test_is_satisfied():
+    assert is_satisfied("pytest")
+    assert not is_satisfied("pytest<1")
+    assert not is_satisfied("surely-not-an-installed-package-xyz")
+
+
+def test_resolver_batches_missing_and_caches(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        requirements_module.subprocess, "check_call", lambda cmd: calls.append(cmd)
+    )
+    state_path = str(tmp_path / "state.json")
+    pending = {
+        "a": ["pytest", "missing-pkg-one"],
+        "b": ["missing-pkg-one", "missing-pkg-two"],
+    }
+
+    stats = RequirementsResolver(state_path).resolve(pending)
+    assert stats["installed"] == ["missing-pkg-one", "missing-pkg-two"]
+    assert len(calls) == 1
+    assert calls[0][-2:] == ["missing-pkg-one", "missing-pkg-two"]
+
+    # A fresh resolver reads the persisted hashes and skips both modules.
+    stats = RequirementsResolver(state_path).resolve(pending)
+    assert stats["cached"] == 2
+    assert len(calls) == 1
+
+    # A deleted module is resolved again when it comes back.
+    RequirementsResolver(state_path).forget("a")
+    stats = RequirementsResolver(state_path).resolve(pending)
+    assert stats["cached"] == 1
+    assert len(calls) == 2
@@ -0,0 +1,75 @@
+import datetime
+import time
+
+from pipelines.common_files.result_cache import ResultCache, sql_fingerprint, ttl_class
+from pipelines.common_files.sql_utils import SQLResult, execute_sql_safe
+
+
+def test_fingerprint_ignores_case_whitespace_and_comments_but_not_literals():
+    assert sql_fingerprint("SELECT a,b FROM t WHERE x = 'A'") == sql_fingerprint(
+        "select a , b\n  from T -- recent\n where X='A';"
+    )
+    assert sql_fingerprint("SELECT a FROM t WHERE x = 'A'") != sql_fingerprint(
+        "SELECT a FROM t WHERE x = 'a'"
+    )
+
+
+def test_ttl_class():
+    today = datetime.date(2025, 10, 17)
+    assert ttl_class("SELECT * FROM ELMAH_Error WHERE TimeUtc >= SYSDATE - 1", today) == "volatile"
+    assert ttl_class(
+        "SELECT COUNT(*) FROM ELMAH_Error WHERE TimeUtc >= DATE '2025-07-01' "
+        "AND TimeUtc < DATE '2025-08-01'", today
+    ) == "historical"
+    # Open-ended or still-running periods can change
+    assert ttl_class("SELECT * FROM ELMAH_Error WHERE TimeUtc >= DATE '2025-07-01'", today) == "default"
+    assert ttl_class("SELECT * FROM t WHERE TO_CHAR(d, 'YYYY-MM') = '2025-10'", today) == "default"
+    assert ttl_class("SELECT * FROM Master_Role", today) == "default"
+
+
+def test_size_aware_eviction():
+    rows = [(i, "x" * 100) for i in range(10)]
+    cache = ResultCache(max_bytes=4000, max_entry_bytes=3000)
+    cache.put("SELECT 1 FROM t1", SQLResult(["a", "b"], rows))
+    cache.put("SELECT 1 FROM t2", SQLResult(["a", "b"], rows))
+    cache.put("SELECT 1 FROM t3", SQLResult(["a", "b"], rows * 10))  # over max_entry_bytes
+
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["evictions"] == 1
+    assert cache.get("SELECT 1 FROM t1") is None
+    assert cache.get("select 1 from T2") == SQLResult(["a", "b"], rows)
+    assert cache.stats()["bytes"] <= 4000
+
+
+def test_execute_sql_safe_uses_result_cache(sqlite_db):
+    db = sqlite_db(result_cache=ResultCache(ttls={"volatile": 0}))
+    assert execute_sql_safe(db, "SELECT n FROM t") == (["n"], [(1,)], None)
+    assert execute_sql_safe(db, "select n  from t")[1] == [(1,)]
+    assert db.result_cache.stats()["hits"] == 1
+
+    # A zero TTL disables caching for its class
+    execute_sql_safe(db, "SELECT n FROM t WHERE d > CURRENT_DATE")
+    execute_sql_safe(db, "SELECT n FROM t WHERE d > CURRENT_DATE")
+    assert db.queries == 3
+
+
+def test_invalidate_tables_drops_dependent_results_and_charts(tmp_path):
+    chart = tmp_path / "chart.png"
+    chart.write_bytes(b"png")
+    cache = ResultCache()
+    cache.watched = frozenset({"AUDITTRAIL", "USERS", "MASTER_ROLE"})
+    cache.put("SELECT * FROM AuditTrail a JOIN Users u ON a.USERID = u.USERID", SQLResult(["a"], [(1,)]))
+    cache.put("SELECT * FROM Master_Role", SQLResult(["r"], [(2,)]))
+    cache.put_chart("SELECT * FROM Master_Role", "plt.bar(df.r, df.r)", str(chart))
+
+    assert cache.invalidate_tables({"Users"}) == 1
+    assert cache.get("SELECT * FROM AuditTrail a JOIN Users u ON a.USERID = u.USERID") is None
+    assert cache.get("SELECT * FROM Master_Role") == SQLResult(["r"], [(2,)])
+    assert cache.get_chart("SELECT * FROM Master_Role", "plt.bar(df.r, df.r)") == str(chart)
+
+    # Results of queries that started before an invalidation are not stored
+    started_at = time.monotonic()
+    cache.invalidate_tables({"MASTER_ROLE"})
+    cache.put("SELECT * FROM Master_Role", SQLResult(["r"], [(3,)]), started_at=started_at)
+    assert cache.get("SELECT * FROM Master_Role") is None
+    assert cache.get_chart("SELECT * FROM Master_Role", "plt.bar(df.r, df.r)") is None
@@ -0,0 +1,37 @@
+from sqlalchemy import create_engine, text
+
+from pipelines.common_files import schema_cache
+from pipelines.common_files.schema_cache import SchemaCache
+
+
+def make_db(path):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE Users (USERID INTEGER PRIMARY KEY, LOGIN VARCHAR(50))"))
+        conn.execute(text("CREATE TABLE Master_Role (ROLEID INTEGER PRIMARY KEY)"))
+        conn.execute(text("CREATE TABLE Unrelated (id INTEGER PRIMARY KEY)"))
+    return engine
+
+
+def test_snapshot_skips_reflection_until_schema_changes(tmp_path, monkeypatch):
+    engine = make_db(tmp_path / "sc.db")
+    snapshot = str(tmp_path / "schema.pkl")
+    tables = ("Users", "Master_Role", "ELMAH_Error")
+
+    db = SchemaCache(engine, snapshot, tables).load_database()
+    assert db.get_usable_table_names() == ["Master_Role", "Users"]
+    assert "LOGIN" in db.get_table_info(["Users"])
+
+    # Warm start: no reflection at all
+    monkeypatch.setattr(schema_cache, "reflect_tables", None)
+    cache = SchemaCache(engine, snapshot, tables)
+    warm = cache.load_database()
+    assert warm.get_usable_table_names() == ["Master_Role", "Users"]
+    assert warm.run("SELECT COUNT(*) FROM Users") == "[(0,)]"
+    assert cache.refresh(warm) is False
+    monkeypatch.undo()
+
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE Users ADD COLUMN FULLNAME VARCHAR(100)"))
+    assert cache.refresh(warm) is True
+    assert "FULLNAME" in warm.get_table_info(["Users"])
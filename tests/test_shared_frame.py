@@ -0,0 +1,47 @@
+import datetime
+import multiprocessing
+
+from pipelines.common_files.chart_pool import ChartPool
+from pipelines.common_files.columnar import ColumnarResult
+from pipelines.common_files.shared_frame import SharedFrame, attach_frame
+from pipelines.common_files.viz_utils import run_chart
+
+
+def frame():
+    rows = [(i, i / 2, f"web-{i % 3}", datetime.datetime(2025, 7, 1, i % 24)) for i in range(100)]
+    return ColumnarResult.from_rows(["N", "HALF", "HOST", "TIMEUTC"], rows).to_pandas()
+
+
+def _sum_in_child(handle, queue):
+    with attach_frame(handle) as df:
+        queue.put((int(df["N"].sum()), df["HOST"].iloc[4]))
+        del df
+
+
+def test_shared_frame_reaches_another_process():
+    df = frame()
+    with SharedFrame(df) as shared:
+        with attach_frame(shared.handle) as attached:
+            assert attached.equals(df)
+            del attached
+
+        queue = multiprocessing.get_context("spawn").Queue()
+        child = multiprocessing.get_context("spawn").Process(
+            target=_sum_in_child, args=(shared.handle, queue)
+        )
+        child.start()
+        assert queue.get(timeout=60) == (4950, "web-1")
+        child.join(timeout=60)
+
+
+def test_run_chart_plots_the_dataframe_in_memory(tmp_path):
+    filename = str(tmp_path / "chart.png")
+    code = "import matplotlib.pyplot as plt\nplt.plot(df['TIMEUTC'], df['N'])\nprint(len(df))"
+    pool = ChartPool(workers=1)
+    try:
+        assert run_chart(code, frame(), filename, pool=pool).strip() == "100"
+        assert pool.stats()["jobs"] == 1
+    finally:
+        pool.close()
+    assert (tmp_path / "chart.png").stat().st_size > 0
+    assert list(tmp_path.iterdir()) == [tmp_path / "chart.png"]
@@ -0,0 +1,75 @@
+from sqlalchemy.dialects.oracle.base import OracleDialect
+
+from pipelines.common_files.result_cache import ResultCache
+from pipelines.common_files.sql_utils import execute_sql, extract_tables, limit_sql
+
+
+def test_extract_tables():
+    assert extract_tables(
+        'SELECT a.USERID FROM AuditTrail a JOIN Master_ActionType m ON a.ACTIONTYPEID = m.ACTIONTYPEID '
+        'LEFT JOIN "SC"."Users" u ON u.USERID = a.USERID'
+    ) == {"AUDITTRAIL", "MASTER_ACTIONTYPE", "USERS"}
+    assert extract_tables(
+        "WITH r AS (SELECT * FROM Master_Role) SELECT * FROM r, Users "
+        "WHERE EXTRACT(YEAR FROM CREATED) = 2025 AND Name <> 'from x'"
+    ) == {"MASTER_ROLE", "USERS"}
+    assert extract_tables("SELECT SYSDATE FROM dual") == frozenset()
+
+
+def test_limit_sql():
+    assert limit_sql("SELECT * FROM t ORDER BY n;", 11, "oracle") == (
+        "SELECT * FROM (SELECT * FROM t ORDER BY n) WHERE ROWNUM <= 11"
+    )
+    assert limit_sql("SELECT * FROM t", 11, "sqlite").endswith(") AS limited_query LIMIT 11")
+    assert limit_sql("SELECT * FROM t", 11, "mssql") == "SELECT * FROM t"
+
+    # Wrapping a join that selects the same column twice raises ORA-00918
+    join = "SELECT u.UserId, a.UserId, COUNT(*) FROM Users u JOIN AuditTrail a ON u.UserId = a.UserId"
+    assert limit_sql(join, 11, "oracle") == join
+    assert limit_sql("SELECT * FROM Users u, AuditTrail a", 11, "oracle") == "SELECT * FROM Users u, AuditTrail a"
+    assert limit_sql(join.replace("a.UserId,", "a.UserId AS audit_user,"), 11, "oracle").endswith("ROWNUM <= 11")
+    assert limit_sql(
+        "WITH x AS (SELECT n, n FROM t) SELECT x.n, (SELECT MAX(n) FROM t) top FROM x", 11, "oracle"
+    ).endswith("ROWNUM <= 11")
+
+
+def test_execute_sql_reports_truncation(sqlite_db, monkeypatch):
+    monkeypatch.setenv("SQL_MAX_ROWS", "10")
+    db = sqlite_db(rows=25, result_cache=ResultCache())
+
+    result = execute_sql(db, "SELECT n FROM t ORDER BY n DESC")
+    assert result.rows == [(n,) for n in range(25, 15, -1)]
+    assert result.truncated and result.error is None
+    # Served from the cache with the flag intact
+    assert execute_sql(db, "SELECT n FROM t ORDER BY n DESC").truncated
+    assert not execute_sql(db, "SELECT n FROM t WHERE n <= 10").truncated
+
+
+def test_duplicate_column_join_is_bounded_by_fetchmany(sqlite_db, monkeypatch):
+    monkeypatch.setenv("SQL_MAX_ROWS", "10")
+    db = sqlite_db(rows=25)
+    monkeypatch.setattr(db._engine.dialect, "name", "oracle")
+
+    result = execute_sql(db, "SELECT a.n, b.n FROM t a JOIN t b ON a.n = b.n ORDER BY a.n")
+    assert result.error is None and result.truncated
+    assert result.rows == [(n, n) for n in range(1, 11)]
+
+
+def test_execute_sql_reads_headers_from_cursor(sqlite_db):
+    db = sqlite_db(rows=2)
+    result = execute_sql(db, "SELECT *, n * 2 AS doubled, UPPER(SUBSTR(d, 1, 4)) FROM t ORDER BY n")
+    assert result.headers == ["n", "d", "doubled", "UPPER(SUBSTR(d, 1, 4))"]
+    assert result.rows == [(1, "2025-01-01", 2, "2025"), (2, "2025-01-01", 4, "2025")]
+    assert len(result.types) == 4
+    assert result.rows.column("doubled").tolist() == [2, 4]
+
+
+def test_execute_sql_normalizes_upper_case_names_like_sqlalchemy(sqlite_db, monkeypatch):
+    db = sqlite_db(rows=2)
+    # sqlite reports the aliases as written, like Oracle reports unquoted names in upper case
+    monkeypatch.setattr(db._engine.dialect, "requires_name_normalize", True, raising=False)
+    monkeypatch.setattr(db._engine.dialect, "normalize_name", OracleDialect().normalize_name, raising=False)
+    result = execute_sql(db, 'SELECT n AS LOGIN_COUNT, d AS "Day", COUNT(*) FROM t GROUP BY n, d')
+    assert result.headers == ["login_count", "Day", "COUNT(*)"]
+    assert result.rows.column("login_count").tolist() == [1, 2]
+    assert result.rows.to_pandas()["login_count"].sum() == 3
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from pipelines import staffconnect_chat
+from pipelines.staffconnect_chat_files import registry
+
+
+def make_pipeline(tmp_path):
+    pipeline = staffconnect_chat.Pipeline()
+    pipeline.valves.ROUTER_MODEL = "router-model"
+    pipeline.valves.ROUTER_LEARNED_PATH = str(tmp_path / "learned.jsonl")
+    # Above 1: every question goes to the router LLM
+    pipeline.valves.LOCAL_ROUTER_THRESHOLD = 2.0
+    pipeline._llm_map = {
+        "gpt-4o-mini": FakeListChatModel(responses=["trend", "trend"]),
+        "o3-mini": FakeListChatModel(responses=["trend"]),
+        "router-model": FakeListChatModel(responses=["elmah", "anomaly"]),
+    }
+    pipeline.staffconnect_db = object()
+    return pipeline
+
+
+def first_route(graph):
+    state = {"question": "Hello there", "route": None, "response": None}
+    for chunk in graph.stream(state, stream_mode="updates"):
+        return chunk["router"]["route"]
+
+
+def test_graphs_are_compiled_per_model_and_route_with_router_model(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+
+    graph = pipeline._get_graph("gpt-4o-mini")
+    assert pipeline._get_graph("gpt-4o-mini") is graph
+    assert pipeline._get_graph("o3-mini") is not graph
+    o3_agents = registry.get_agents(pipeline._llm_map["o3-mini"], pipeline.staffconnect_db)
+    assert o3_agents["trend"].llm is pipeline._llm_map["o3-mini"]
+
+    assert first_route(graph) == "elmah"
+    assert pipeline._llm_map["router-model"].i == 1
+    assert pipeline._llm_map["gpt-4o-mini"].i == 0
+    registry.release_agents(pipeline.staffconnect_db)
+
+
+def test_async_mode_builds_the_graph_in_a_worker_thread(tmp_path, monkeypatch):
+    pipeline = make_pipeline(tmp_path)
+    threads = []
+    build = staffconnect_chat.create_staffconnect_chain
+
+    def create_chain(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(staffconnect_chat, "create_staffconnect_chain", create_chain)
+
+    async def scenario():
+        loop_thread = threading.current_thread()
+        graph = await pipeline._aget_graph("gpt-4o-mini")
+        assert await pipeline._aget_graph("gpt-4o-mini") is graph
+        assert threads and threads[0] is not loop_thread
+
+    asyncio.run(scenario())
+    assert len(threads) == 1
+    registry.release_agents(pipeline.staffconnect_db)
@@ -0,0 +1,56 @@
+import asyncio
+
+PIPELINE = """
+import asyncio
+import time
+
+time.sleep({import_seconds})
+
+
+class Pipeline:
+    def __init__(self):
+        self.name = "{name}"
+
+    async def on_startup(self):
+        await asyncio.sleep({startup_seconds})
+
+    def pipe(self, user_message, model_id, messages, body):
+        return "{name}"
+"""
+
+
+def write_pipeline(directory, name, import_seconds=0, startup_seconds=0):
+    (directory / f"{name}.py").write_text(
+        PIPELINE.format(name=name, import_seconds=import_seconds, startup_seconds=startup_seconds)
+    )
+
+
+def test_hung_on_startup_times_out_without_blocking_the_others(gateway, tmp_path, monkeypatch):
+    monkeypatch.setattr(gateway, "PIPELINES_STARTUP_TIMEOUT", 0.5)
+    write_pipeline(tmp_path, "hung", startup_seconds=3600)
+    write_pipeline(tmp_path, "slow", startup_seconds=0.3)
+    write_pipeline(tmp_path, "quick")
+
+    asyncio.run(gateway.on_startup())
+
+    assert set(gateway.PIPELINE_MODULES) == {"slow", "quick"}
+    assert set(gateway.REGISTRY.get()) == {"slow", "quick"}
+    assert gateway.PIPELINE_LOAD_TIMES["hung"]["status"] == "timeout"
+    assert gateway.PIPELINE_LOAD_TIMES["slow"]["status"] == "ok"
+    # Hooks run concurrently: the wait is the timeout, not the sum of the hooks.
+    assert gateway.LOAD_TIMINGS["startup"] < 0.75
+    # Not recorded as loaded, so the next reload tries it again.
+    assert "hung" not in gateway.PIPELINE_FILES
+
+
+def test_modules_import_in_parallel_and_broken_ones_are_skipped(gateway, tmp_path):
+    write_pipeline(tmp_path, "first", import_seconds=0.5)
+    write_pipeline(tmp_path, "second", import_seconds=0.5)
+    (tmp_path / "broken.py").write_text("raise ImportError('missing dependency')\n")
+    (tmp_path / "empty.py").write_text("VALUE = 1\n")
+
+    asyncio.run(gateway.on_startup())
+
+    assert set(gateway.PIPELINE_MODULES) == {"first", "second"}
+    assert set(gateway.PIPELINE_FILES) == {"first", "second"}
+    assert gateway.LOAD_TIMINGS["import"] < 0.9
@@ -22,3 +22,49 @@ def test_extract_json_from_markdown():
     result = extract_json_from_markdown(text)
     assert result["sql_query"] == "SELECT 1"
     assert result["explanation"] == "test"
+
+def test_format_result_for_ui_skips_excluded_sections():
+    from pipelines.common_files.ui_utils import format_result_for_ui
+
+    result = {
+        "agent": "trend",
+        "explanation": "Logins peak on Mondays.",
+        "sql_query": "SELECT 1",
+        "headers": ["X"],
+        "rows": [(1,)],
+    }
+    full = format_result_for_ui(result)
+    assert "Routed to: `Trend Agent`" in full
+    assert "```sql\nSELECT 1\n```" in full
+    assert "| X |" in full
+
+    rest = format_result_for_ui(result, exclude={"agent", "sql_query", "table"})
+    assert rest == "Insight:\n> Logins peak on Mondays."
+
+    truncated = format_result_for_ui({**result, "truncated": True})
+    assert "_Showing the first 1 rows; the query returned more._" in truncated
+    assert "returned more" not in full
+
+def test_json_string_field_streamer_decodes_partial_json():
+    import json
+    from pipelines.common_files.llm_utils import JsonStringFieldStreamer
+
+    explanation = 'Errors "spiked"\nafter 10:00 \\ retry'
+    raw = json.dumps({"sql_query": "SELECT 1", "explanation": explanation, "python_code": ""})
+    streamer = JsonStringFieldStreamer("explanation")
+
+    deltas = [streamer.feed(raw[i:i + 2]) for i in range(0, len(raw), 2)]
+
+    assert "".join(deltas) == explanation
+    assert streamer.done
+
+def test_to_async_url_maps_drivers():
+    from pipelines.common_files.sql_utils import to_async_url
+
+    assert to_async_url("oracle+cx_oracle://u:p@h:1521/?service_name=s") == (
+        "oracle+oracledb_async://u:p@h:1521/?service_name=s"
+    )
+    assert to_async_url("postgresql://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert to_async_url("sqlite:///local.db") == "sqlite+aiosqlite:///local.db"
+    assert to_async_url("sqlite+aiosqlite:///local.db") == "sqlite+aiosqlite:///local.db"
+    assert to_async_url("mssql+pyodbc://u:p@h/db") is None
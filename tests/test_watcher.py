@@ -0,0 +1,35 @@
+import os
+import sys
+
+from utils.pipelines.watcher import affected_modules, module_dependencies, snapshot
+
+
+def test_dependencies_follow_imports_within_the_pipelines_dir(tmp_path, monkeypatch):
+    root = tmp_path / "plugins"
+    (root / "shared").mkdir(parents=True)
+    (root / "__init__.py").write_text("")
+    (root / "shared" / "__init__.py").write_text("")
+    (root / "shared" / "sql.py").write_text("import os\n")
+    (root / "shared" / "charts.py").write_text("from .sql import *\n")
+    (root / "uses_shared.py").write_text("from plugins.shared import charts\nimport json\n")
+    (root / "standalone.py").write_text("import os\n")
+    monkeypatch.setattr(sys, "path", [str(tmp_path)] + sys.path)
+
+    dependencies = {
+        name: module_dependencies(str(root / f"{name}.py"), str(root))
+        for name in ("uses_shared", "standalone")
+    }
+    sql_path = os.path.realpath(root / "shared" / "sql.py")
+
+    assert sql_path in dependencies["uses_shared"]
+    assert dependencies["standalone"] == set()
+    assert affected_modules([str(root / "shared" / "sql.py")], dependencies) == {"uses_shared"}
+
+
+def test_snapshot_skips_pycache(tmp_path):
+    (tmp_path / "__pycache__").mkdir()
+    (tmp_path / "__pycache__" / "cached.py").write_text("")
+    (tmp_path / "pipeline.py").write_text("")
+    (tmp_path / "valves.json").write_text("{}")
+
+    assert list(snapshot(str(tmp_path))) == [str(tmp_path / "pipeline.py")]
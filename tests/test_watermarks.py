@@ -0,0 +1,48 @@
+from pipelines.common_files.watermarks import WatermarkPoller
+
+
+class FakeDB:
+    def __init__(self):
+        self.values = {"SELECT MAX(Sequence) FROM ELMAH_Error": 10, "SELECT COUNT(*) FROM Users": 3}
+
+    def _execute(self, sql):
+        value = self.values[sql]
+        if isinstance(value, Exception):
+            raise value
+        return [{"value": value}]
+
+
+def test_poller_reports_tables_whose_watermark_moved():
+    db = FakeDB()
+    changes = []
+    poller = WatermarkPoller(
+        db,
+        changes.append,
+        queries={"ELMAH_Error": "SELECT MAX(Sequence) FROM ELMAH_Error", "Users": "SELECT COUNT(*) FROM Users"},
+    )
+
+    assert poller.poll() == set()
+    db.values["SELECT MAX(Sequence) FROM ELMAH_Error"] = 11
+    assert poller.poll() == {"ELMAH_ERROR"}
+    assert poller.poll() == set()
+
+    # Unreadable watermarks count as changed until they can be read again
+    db.values["SELECT COUNT(*) FROM Users"] = RuntimeError("ORA-03113")
+    assert poller.poll() == {"USERS"}
+    db.values["SELECT COUNT(*) FROM Users"] = 3
+    assert poller.poll() == {"USERS"}
+    assert poller.poll() == set()
+    assert changes == [{"ELMAH_ERROR"}, {"USERS"}, {"USERS"}]
+
+
+def test_poller_sees_updates_that_keep_the_row_count():
+    sql = "SELECT COUNT(*), MAX(ORA_ROWSCN) FROM Users"
+    db = FakeDB()
+    db.values[sql] = (3, 100)
+    db._execute = lambda query: [dict(zip(("count", "scn"), db.values[query]))]
+    poller = WatermarkPoller(db, lambda tables: None, queries={"Users": sql})
+
+    assert poller.poll() == set()
+    assert poller.watermarks["USERS"] == (3, 100)
+    db.values[sql] = (3, 101)  # a role rename: same row count, newer SCN
+    assert poller.poll() == {"USERS"}
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import json
+from typing import AsyncIterator, Awaitable, Dict, List, Optional
+
+
+def request_key(model: str, messages: List[Dict], stream: bool) -> str:
+    """Canonical hash of a chat completion request, used to spot duplicates."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "stream": bool(stream)},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Broadcast:
+    """
+    Buffers the chunks of one stream so any number of subscribers can read
+    it. Late subscribers replay the chunks produced so far, then follow live.
+    """
+
+    def __init__(self):
+        self._chunks: List = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def feed(self, source: AsyncIterator):
+        try:
+            async for chunk in source:
+                self._chunks.append(chunk)
+                self._notify()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done = True
+            self._notify()
+
+    async def subscribe(self):
+        index = 0
+        while True:
+            while index < len(self._chunks):
+                yield self._chunks[index]
+                index += 1
+            if self._done:
+                if self._error is not None:
+                    raise self._error
+                return
+            await self._changed.wait()
+
+
+class RequestCoalescer:
+    """
+    Single-flight for identical in-flight requests.
+
+    The first request for a key becomes the leader and its work runs as a
+    background task, so a disconnecting leader does not cut off the others.
+    Requests arriving while it runs subscribe to its result (or its stream)
+    instead of doing the work again. Nothing is kept once the leader finishes.
+    """
+
+    def __init__(self):
+        self._results: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, Broadcast] = {}
+        self._tasks = set()
+
+        self.leaders = 0
+        self.followers = 0
+
+    def _track(self, task: asyncio.Task, registry: Dict, key: str, value):
+        def done(_):
+            self._tasks.discard(task)
+            if registry.get(key) is value:
+                del registry[key]
+
+        self._tasks.add(task)
+        task.add_done_callback(done)
+
+    def join(self, key: str) -> Optional[Awaitable]:
+        """Awaitable for the leader's result, or None if no leader is running."""
+        task = self._results.get(key)
+        if task is None:
+            return None
+        self.followers += 1
+        return asyncio.shield(task)
+
+    def lead(self, key: str, coro: Awaitable) -> Awaitable:
+        task = asyncio.ensure_future(coro)
+        self._results[key] = task
+        self._track(task, self._results, key, task)
+        self.leaders += 1
+        return asyncio.shield(task)
+
+    def join_stream(self, key: str) -> Optional[AsyncIterator]:
+        """Iterator over the leader's stream, or None if no leader is running."""
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            return None
+        self.followers += 1
+        return broadcast.subscribe()
+
+    def lead_stream(self, key: str, source: AsyncIterator) -> AsyncIterator:
+        broadcast = Broadcast()
+        self._streams[key] = broadcast
+        task = asyncio.ensure_future(broadcast.feed(source))
+        self._track(task, self._streams, key, broadcast)
+        self.leaders += 1
+        return broadcast.subscribe()
+
+    async def wait(self):
+        """Waits for leaders that are still running, e.g. on shutdown."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
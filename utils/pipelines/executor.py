@@ -0,0 +1,271 @@
+import asyncio
+import collections
+import functools
+import inspect
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+
+_EXHAUSTED = object()
+
+
+class PipeExecutor:
+    """
+    Runs pipeline `pipe()` callables for the gateway.
+
+    `async def pipe` and async generator pipes run directly on the event loop.
+    Sync pipes, and every `next()` on a sync generator they return, run on a
+    bounded thread pool so a long-lived stream only borrows a thread while it
+    is actually producing a chunk.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="pipe"
+        )
+        # Requests holding this executor; a retired one shuts down after the last.
+        self.leases = 0
+        self.retired = False
+
+    def lease(self) -> "PipeExecutor":
+        """Marks a request as using this executor; pair with `release`."""
+        self.leases += 1
+        return self
+
+    def release(self):
+        self.leases -= 1
+        if self.retired and self.leases <= 0:
+            self.shutdown(cancel_futures=False)
+
+    def retire(self):
+        """Shuts down once every request holding a lease has released it."""
+        self.retired = True
+        if self.leases <= 0:
+            self.shutdown(cancel_futures=False)
+
+    async def call(self, pipe, **kwargs):
+        if inspect.iscoroutinefunction(pipe):
+            return await pipe(**kwargs)
+        if inspect.isasyncgenfunction(pipe):
+            return pipe(**kwargs)
+
+        loop = asyncio.get_running_loop()
+        res = await loop.run_in_executor(self._executor, functools.partial(pipe, **kwargs))
+        if inspect.isawaitable(res):
+            res = await res
+        return res
+
+    async def iterate(self, res):
+        """Yields the items of a sync or async iterator without blocking the loop."""
+        if hasattr(res, "__aiter__"):
+            async for item in res:
+                yield item
+            return
+
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(self._executor, next, res, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                break
+            yield item
+
+    def shutdown(self, cancel_futures: bool = True):
+        self._executor.shutdown(wait=False, cancel_futures=cancel_futures)
+
+
+class QueueFullError(Exception):
+    """Raised when a pipeline's wait queue is full; `retry_after` is in seconds."""
+
+    def __init__(self, pipeline_id: str, retry_after: int):
+        super().__init__(f"Pipeline {pipeline_id} is at capacity")
+        self.pipeline_id = pipeline_id
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Caps how many requests a pipeline serves at once.
+
+    Up to `max_concurrency` requests are admitted immediately, up to
+    `max_queue` more wait in FIFO order, and anything beyond that is rejected
+    with `QueueFullError` instead of piling up behind slow requests.
+    """
+
+    # Weight of the newest sample in the moving average of service time.
+    SMOOTHING = 0.2
+
+    def __init__(self, pipeline_id: str, max_concurrency: int, max_queue: int):
+        self.pipeline_id = pipeline_id
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+
+        self.active = 0
+        self._waiters = collections.deque()
+
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.service_seconds_avg = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Rough seconds until a queue slot frees up, for the Retry-After header."""
+        service = self.service_seconds_avg or 1.0
+        waves = (self.queued + 1) / max(self.max_concurrency, 1)
+        return max(1, math.ceil(service * waves))
+
+    async def acquire(self) -> float:
+        """
+        Waits for a slot and returns the time it was admitted; pass that to
+        `release`. Raises QueueFullError if the wait queue is full.
+        """
+        start = time.perf_counter()
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+        else:
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFullError(self.pipeline_id, self.retry_after())
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                # The releasing request hands its slot over to us.
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.release()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+
+        admitted_at = time.perf_counter()
+        waited = admitted_at - start
+        self.admitted += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        return admitted_at
+
+    def release(self, admitted_at: Optional[float] = None):
+        if admitted_at is not None:
+            elapsed = time.perf_counter() - admitted_at
+            if self.service_seconds_avg is None:
+                self.service_seconds_avg = elapsed
+            else:
+                self.service_seconds_avg += self.SMOOTHING * (
+                    elapsed - self.service_seconds_avg
+                )
+
+        if self.active > self.max_concurrency:
+            # Limit was lowered while requests were running.
+            self.active -= 1
+            return
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def resize(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        while self._waiters and self.active < self.max_concurrency:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "wait_seconds_avg": round(
+                self.wait_seconds_total / self.admitted if self.admitted else 0.0, 6
+            ),
+            "service_seconds_avg": (
+                round(self.service_seconds_avg, 6)
+                if self.service_seconds_avg is not None
+                else None
+            ),
+        }
+
+
+class PipelineExecutors:
+    """
+    One PipeExecutor and AdmissionLimiter per pipeline, so a burst of slow
+    requests on one pipeline cannot starve the others of threads.
+
+    Limits default to `max_concurrency` / `max_queue` and can be overridden by
+    a pipeline through attributes of the same name.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._executors: Dict[str, PipeExecutor] = {}
+        self._limiters: Dict[str, AdmissionLimiter] = {}
+
+    def limits(self, pipeline) -> Tuple[int, int]:
+        max_concurrency = getattr(pipeline, "max_concurrency", None) or self.max_concurrency
+        max_queue = getattr(pipeline, "max_queue", None)
+        if max_queue is None:
+            max_queue = self.max_queue
+        return max(1, int(max_concurrency)), max(0, int(max_queue))
+
+    def get(self, pipeline_id: str, pipeline) -> Tuple[PipeExecutor, AdmissionLimiter]:
+        """
+        Returns the pipeline's executor and limiter. Callers that run work on
+        the executor should hold a `lease()` until they are done with it, so a
+        resize does not shut it down under them.
+        """
+        max_concurrency, max_queue = self.limits(pipeline)
+
+        limiter = self._limiters.get(pipeline_id)
+        if limiter is None:
+            limiter = AdmissionLimiter(pipeline_id, max_concurrency, max_queue)
+            self._limiters[pipeline_id] = limiter
+        elif (limiter.max_concurrency, limiter.max_queue) != (max_concurrency, max_queue):
+            limiter.resize(max_concurrency, max_queue)
+
+        executor = self._executors.get(pipeline_id)
+        if executor is None or executor.max_workers != max_concurrency:
+            if executor is not None:
+                # Streams still running on the old executor keep it until they finish.
+                executor.retire()
+            executor = PipeExecutor(max_workers=max_concurrency)
+            self._executors[pipeline_id] = executor
+
+        return executor, limiter
+
+    def discard(self, pipeline_id: str):
+        """Drops the executor of a pipeline that is no longer loaded."""
+        self._limiters.pop(pipeline_id, None)
+        executor = self._executors.pop(pipeline_id, None)
+        if executor is not None:
+            executor.retire()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            pipeline_id: limiter.stats()
+            for pipeline_id, limiter in sorted(self._limiters.items())
+        }
+
+    def shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown()
+        self._executors.clear()
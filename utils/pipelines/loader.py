@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+
+async def run_hook(pipeline_id: str, pipeline, hook: str, timeout: Optional[float]):
+    """
+    Awaits `pipeline.<hook>()` with a timeout.
+
+    Returns a (status, seconds) tuple where status is "ok", "timeout", "error"
+    or "skipped" when the pipeline does not define the hook.
+    """
+    if not hasattr(pipeline, hook):
+        return "skipped", 0.0
+
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(getattr(pipeline, hook)(), timeout=timeout)
+        return "ok", time.perf_counter() - start
+    except asyncio.TimeoutError:
+        elapsed = time.perf_counter() - start
+        logging.error(f"{hook} for {pipeline_id} timed out after {elapsed:.2f}s")
+        return "timeout", elapsed
+    except Exception:
+        elapsed = time.perf_counter() - start
+        logging.exception(f"{hook} for {pipeline_id} failed")
+        return "error", elapsed
+
+
+async def run_hooks(modules: Dict, hook: str, timeout: Optional[float] = None) -> Dict:
+    """Runs `hook` on every pipeline concurrently. Returns {pipeline_id: (status, seconds)}."""
+    pipeline_ids = list(modules.keys())
+    results = await asyncio.gather(
+        *(
+            run_hook(pipeline_id, modules[pipeline_id], hook, timeout)
+            for pipeline_id in pipeline_ids
+        )
+    )
+    return dict(zip(pipeline_ids, results))
+
+
+def file_fingerprint(path: str, previous: Optional[Dict] = None) -> Dict:
+    """
+    Returns {"mtime_ns", "size", "sha256"} for `path`. The file is only hashed
+    again when its mtime or size differ from `previous`.
+    """
+    stat = os.stat(path)
+    if (
+        previous is not None
+        and previous["mtime_ns"] == stat.st_mtime_ns
+        and previous["size"] == stat.st_size
+    ):
+        return previous
+
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest}
+
+
+def diff_pipeline_files(directory: str, fingerprints: Dict):
+    """
+    Compares the top-level `.py` files in `directory` against `fingerprints`
+    ({module_name: fingerprint}) from the last load.
+
+    Returns (changed, removed, current) where `changed` lists added or
+    modified module names, `removed` lists module names whose file is gone and
+    `current` is the fresh {module_name: fingerprint} mapping.
+    """
+    current = {}
+    for filename in os.listdir(directory):
+        if filename.endswith(".py"):
+            module_name = filename[:-3]
+            try:
+                current[module_name] = file_fingerprint(
+                    os.path.join(directory, filename), fingerprints.get(module_name)
+                )
+            except OSError:
+                continue
+
+    changed = [
+        module_name
+        for module_name, fingerprint in current.items()
+        if fingerprints.get(module_name, {}).get("sha256") != fingerprint["sha256"]
+    ]
+    removed = [module_name for module_name in fingerprints if module_name not in current]
+    return changed, removed, current
@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def build_pipeline_entries(pipeline_id: str, pipeline, manifold_pipelines=None) -> Dict:
+    """
+    Builds the public registry entries (as served by /v1/models) for one loaded
+    pipeline module. `manifold_pipelines` is the already resolved list of
+    sub-pipelines for manifold modules.
+    """
+    pipelines = {}
+
+    if hasattr(pipeline, "type"):
+        if pipeline.type == "manifold":
+            for p in manifold_pipelines or []:
+                manifold_pipeline_id = f'{pipeline_id}.{p["id"]}'
+
+                manifold_pipeline_name = p["name"]
+                if hasattr(pipeline, "name"):
+                    manifold_pipeline_name = f"{pipeline.name}{manifold_pipeline_name}"
+
+                pipelines[manifold_pipeline_id] = {
+                    "module": pipeline_id,
+                    "type": pipeline.type if hasattr(pipeline, "type") else "pipe",
+                    "id": manifold_pipeline_id,
+                    "name": manifold_pipeline_name,
+                    "valves": (
+                        pipeline.valves if hasattr(pipeline, "valves") else None
+                    ),
+                }
+        if pipeline.type == "filter":
+            pipelines[pipeline_id] = {
+                "module": pipeline_id,
+                "type": (pipeline.type if hasattr(pipeline, "type") else "pipe"),
+                "id": pipeline_id,
+                "name": (pipeline.name if hasattr(pipeline, "name") else pipeline_id),
+                "pipelines": (
+                    pipeline.valves.pipelines
+                    if hasattr(pipeline, "valves")
+                    and hasattr(pipeline.valves, "pipelines")
+                    else []
+                ),
+                "priority": (
+                    pipeline.valves.priority
+                    if hasattr(pipeline, "valves")
+                    and hasattr(pipeline.valves, "priority")
+                    else 0
+                ),
+                "valves": pipeline.valves if hasattr(pipeline, "valves") else None,
+            }
+    else:
+        pipelines[pipeline_id] = {
+            "module": pipeline_id,
+            "type": (pipeline.type if hasattr(pipeline, "type") else "pipe"),
+            "id": pipeline_id,
+            "name": (pipeline.name if hasattr(pipeline, "name") else pipeline_id),
+            "valves": pipeline.valves if hasattr(pipeline, "valves") else None,
+        }
+
+    return pipelines
+
+
+class PipelineRegistry:
+    """
+    Cached view over the loaded pipeline modules.
+
+    The flattened pipelines dict is built once and reused until something
+    invalidates it (reload, add, upload, delete, valves update). Every
+    invalidation bumps `generation`, so callers can cheaply tell whether the
+    registry they hold is still current.
+
+    Manifold `pipelines()` callables are only re-invoked when their module is
+    invalidated or, if `manifold_ttl` is set, once their cached result expires.
+    """
+
+    def __init__(self, modules: Dict, manifold_ttl: Optional[float] = None):
+        self.modules = modules
+        self.manifold_ttl = manifold_ttl
+        self.generation = 0
+
+        self._lock = threading.RLock()
+        self._pipelines: Optional[Dict] = None
+        self._built_generation = -1
+        self._expires_at: Optional[float] = None
+        self._manifold_cache: Dict[str, tuple] = {}
+        # id(pipeline instance) -> number of requests currently using it
+        self._inflight: Dict[int, int] = {}
+
+    def invalidate(self, pipeline_id: Optional[str] = None):
+        """Marks the registry stale. Drops one module's manifold cache, or all of them."""
+        with self._lock:
+            if pipeline_id is None:
+                self._manifold_cache.clear()
+            else:
+                self._manifold_cache.pop(pipeline_id, None)
+            self.generation += 1
+
+    def swap(self, modules: Dict, pipeline_ids: Optional[List[str]] = None):
+        """
+        Atomically replaces the modules dict, e.g. with one built and started
+        off to the side during a reload. Only the manifold listings of
+        `pipeline_ids` are dropped; pass None to drop all of them.
+        """
+        with self._lock:
+            self.modules = modules
+            if pipeline_ids is None:
+                self._manifold_cache.clear()
+            else:
+                for pipeline_id in pipeline_ids:
+                    self._manifold_cache.pop(pipeline_id, None)
+            self.generation += 1
+
+    def acquire(self, pipeline):
+        """Marks a request as in flight on `pipeline`; pair with `release`."""
+        with self._lock:
+            key = id(pipeline)
+            self._inflight[key] = self._inflight.get(key, 0) + 1
+
+    def release(self, pipeline):
+        with self._lock:
+            key = id(pipeline)
+            count = self._inflight.get(key, 0) - 1
+            if count > 0:
+                self._inflight[key] = count
+            else:
+                self._inflight.pop(key, None)
+
+    def inflight(self, pipeline) -> int:
+        return self._inflight.get(id(pipeline), 0)
+
+    async def drain(self, pipeline, timeout: Optional[float] = None) -> bool:
+        """Waits until no request is using `pipeline`. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.inflight(pipeline):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.1)
+        return True
+
+    def manifold_pipelines(self, pipeline_id: str, pipeline) -> List[Dict]:
+        # Check if pipelines is a function or a list
+        if not callable(pipeline.pipelines):
+            return pipeline.pipelines
+
+        now = time.monotonic()
+        with self._lock:
+            cached = self._manifold_cache.get(pipeline_id)
+            if cached is not None:
+                expires_at, manifold_pipelines = cached
+                if expires_at is None or now < expires_at:
+                    return manifold_pipelines
+
+            manifold_pipelines = pipeline.pipelines()
+            expires_at = now + self.manifold_ttl if self.manifold_ttl else None
+            self._manifold_cache[pipeline_id] = (expires_at, manifold_pipelines)
+            return manifold_pipelines
+
+    def build(self) -> Dict:
+        """Builds the pipelines dict from scratch, reusing cached manifold listings."""
+        pipelines = {}
+        expires_at = None
+        with self._lock:
+            for pipeline_id, pipeline in list(self.modules.items()):
+                manifold_pipelines = None
+                if getattr(pipeline, "type", None) == "manifold":
+                    manifold_pipelines = self.manifold_pipelines(pipeline_id, pipeline)
+                    cached = self._manifold_cache.get(pipeline_id)
+                    if cached is not None and cached[0] is not None:
+                        expires_at = (
+                            cached[0] if expires_at is None else min(expires_at, cached[0])
+                        )
+
+                pipelines.update(
+                    build_pipeline_entries(pipeline_id, pipeline, manifold_pipelines)
+                )
+
+            self._expires_at = expires_at
+        return pipelines
+
+    def get(self) -> Dict:
+        """Returns the cached pipelines dict, rebuilding it only when stale."""
+        with self._lock:
+            stale = (
+                self._pipelines is None
+                or self._built_generation != self.generation
+                or (
+                    self._expires_at is not None
+                    and time.monotonic() >= self._expires_at
+                )
+            )
+            if stale:
+                generation = self.generation
+                self._pipelines = self.build()
+                self._built_generation = generation
+            return self._pipelines
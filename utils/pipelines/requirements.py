@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import re
+import subprocess
+import sys
+import threading
+import time
+from importlib import metadata
+from typing import Dict, List
+
+try:
+    from packaging.requirements import InvalidRequirement, Requirement
+except ImportError:
+    Requirement = None
+
+
+def parse_requirements(requirements: str) -> List[str]:
+    """Splits a frontmatter `requirements:` value into individual specs."""
+    if not requirements:
+        return []
+    return [req.strip() for req in requirements.split(",") if req.strip()]
+
+
+def is_satisfied(spec: str) -> bool:
+    """True when `spec` is already installed in the running interpreter."""
+    if Requirement is None:
+        # Without `packaging` only bare names can be checked.
+        if not re.fullmatch(r"[A-Za-z0-9._-]+", spec):
+            return False
+        try:
+            metadata.version(spec)
+            return True
+        except metadata.PackageNotFoundError:
+            return False
+
+    try:
+        req = Requirement(spec)
+    except InvalidRequirement:
+        # URLs, paths and other pip-only syntax; let pip decide.
+        return False
+
+    if req.url:
+        return False
+    if req.marker is not None and not req.marker.evaluate():
+        return True
+
+    try:
+        installed = metadata.version(req.name)
+    except metadata.PackageNotFoundError:
+        return False
+
+    return req.specifier.contains(installed, prereleases=True)
+
+
+class RequirementsResolver:
+    """
+    Installs frontmatter requirements for pipeline modules.
+
+    Specs that are already satisfied are skipped, everything missing goes to
+    a single `pip install` call, and a hash of each module's requirements is
+    persisted to `state_path` so unchanged modules are not resolved again.
+    """
+
+    def __init__(self, state_path: str):
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._hashes = self._load_state()
+
+    def _load_state(self) -> Dict[str, str]:
+        try:
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        try:
+            with open(self.state_path, "w") as f:
+                json.dump(self._hashes, f, indent=2, sort_keys=True)
+        except OSError as e:
+            logging.warning(f"Could not persist requirements state: {e}")
+
+    @staticmethod
+    def requirements_hash(specs: List[str]) -> str:
+        # Tie the hash to the interpreter so a new virtualenv re-resolves.
+        payload = json.dumps([sys.executable, sorted(specs)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def resolve(self, pending: Dict[str, List[str]]) -> Dict:
+        """
+        Ensures the requirements of every module in `pending` are installed.
+
+        Returns timing and counts: {"seconds", "check_seconds", "install_seconds",
+        "modules", "cached", "installed"}.
+        """
+        start = time.perf_counter()
+        stats = {
+            "modules": len(pending),
+            "cached": 0,
+            "installed": [],
+            "check_seconds": 0.0,
+            "install_seconds": 0.0,
+        }
+
+        with self._lock:
+            stale = {}
+            for module_name, specs in pending.items():
+                specs_hash = self.requirements_hash(specs)
+                if self._hashes.get(module_name) == specs_hash:
+                    stats["cached"] += 1
+                else:
+                    stale[module_name] = specs_hash
+
+            specs_to_check = []
+            for module_name in stale:
+                for spec in pending[module_name]:
+                    if spec not in specs_to_check:
+                        specs_to_check.append(spec)
+
+            missing = [spec for spec in specs_to_check if not is_satisfied(spec)]
+            stats["check_seconds"] = time.perf_counter() - start
+
+            if missing:
+                print(f"Installing requirements: {' '.join(missing)}")
+                install_start = time.perf_counter()
+                subprocess.check_call([sys.executable, "-m", "pip", "install", *missing])
+                stats["install_seconds"] = time.perf_counter() - install_start
+                stats["installed"] = missing
+
+            if stale:
+                self._hashes.update(stale)
+                self._save_state()
+
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+    def forget(self, module_name: str):
+        """Drops a removed module's hash, so adding it back resolves it again."""
+        with self._lock:
+            if self._hashes.pop(module_name, None) is not None:
+                self._save_state()
@@ -0,0 +1,257 @@
+import ast
+import asyncio
+import logging
+import os
+import sys
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+
+def _is_within(path: str, root: str) -> bool:
+    try:
+        return os.path.commonpath([path, root]) == root
+    except ValueError:
+        # Different drives on Windows
+        return False
+
+
+def _search_paths() -> List[str]:
+    return [os.path.realpath(entry or os.getcwd()) for entry in sys.path]
+
+
+def resolve_module(name: str, search_paths: Iterable[str]) -> List[str]:
+    """
+    Returns the source files that importing `name` executes: the module itself
+    plus the `__init__.py` of every parent package. Empty if not found.
+    """
+    parts = name.split(".")
+    for base in search_paths:
+        files = []
+        for i in range(1, len(parts)):
+            init = os.path.join(base, *parts[:i], "__init__.py")
+            if os.path.isfile(init):
+                files.append(init)
+
+        module_file = os.path.join(base, *parts) + ".py"
+        package_init = os.path.join(base, *parts, "__init__.py")
+        if os.path.isfile(module_file):
+            return files + [module_file]
+        if os.path.isfile(package_init):
+            return files + [package_init]
+    return []
+
+
+def _imported_names(path: str) -> Set[str]:
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError):
+        return set()
+
+    package = os.path.dirname(path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                # Relative import: express it as a path-based name rooted at the package.
+                base = package
+                for _ in range(node.level - 1):
+                    base = os.path.dirname(base)
+                prefix = base + os.sep + (node.module or "").replace(".", os.sep)
+                names.add(prefix.rstrip(os.sep))
+                names.update(
+                    os.path.join(prefix, alias.name) for alias in node.names
+                )
+            elif node.module:
+                names.add(node.module)
+                # `from package import submodule`
+                names.update(f"{node.module}.{alias.name}" for alias in node.names)
+    return names
+
+
+def module_dependencies(path: str, root: str) -> Set[str]:
+    """
+    Source files under `root` that the module at `path` imports, directly or
+    transitively. Imports are read statically, so nothing is executed.
+    """
+    root = os.path.realpath(root)
+    search_paths = _search_paths()
+    seen = set()
+    pending = [os.path.realpath(path)]
+
+    while pending:
+        current = pending.pop()
+        for name in _imported_names(current):
+            if os.path.isabs(name):
+                candidates = [
+                    f for f in (name + ".py", os.path.join(name, "__init__.py"))
+                    if os.path.isfile(f)
+                ]
+            else:
+                candidates = resolve_module(name, search_paths)
+
+            for candidate in candidates:
+                candidate = os.path.realpath(candidate)
+                if candidate in seen or not _is_within(candidate, root):
+                    continue
+                seen.add(candidate)
+                pending.append(candidate)
+
+    seen.discard(os.path.realpath(path))
+    return seen
+
+
+def affected_modules(changed_paths: Iterable[str], dependencies: Dict[str, Set[str]]) -> Set[str]:
+    """Pipeline module names whose dependency set includes any changed path."""
+    changed = {os.path.realpath(path) for path in changed_paths}
+    return {
+        module_name
+        for module_name, module_deps in dependencies.items()
+        if module_deps & changed
+    }
+
+
+def purge_modules(paths: Iterable[str]):
+    """Drops cached imports of `paths` from sys.modules so they are re-executed."""
+    paths = {os.path.realpath(path) for path in paths}
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, "__file__", None)
+        if module_file and os.path.realpath(module_file) in paths:
+            del sys.modules[name]
+
+
+def _watched(path: str) -> bool:
+    return path.endswith(".py") and "__pycache__" not in path
+
+
+def snapshot(directory: str) -> Dict[str, int]:
+    """{path: mtime_ns} for every watched file under `directory`."""
+    mtimes = {}
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [d for d in dirnames if d != "__pycache__" and not d.startswith(".")]
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if _watched(path):
+                try:
+                    mtimes[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    pass
+    return mtimes
+
+
+class PipelineWatcher:
+    """
+    Watches a pipelines directory (including subpackages) and calls
+    `on_change(paths)` with the set of changed `.py` files once changes have
+    been quiet for `debounce` seconds.
+
+    Uses inotify through watchdog when it is installed and supported, and
+    otherwise polls file mtimes every `poll_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        on_change: Callable[[Set[str]], Awaitable[None]],
+        debounce: float = 1.0,
+        poll_interval: float = 2.0,
+        mode: str = "auto",
+    ):
+        self.directory = os.path.realpath(directory)
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.mode = mode
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Set[str] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._observer = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+
+        if self.mode in ("auto", "inotify") and Observer is not None:
+            try:
+                self._start_observer()
+                logging.info(f"Watching {self.directory} for pipeline changes (inotify)")
+                return
+            except OSError as e:
+                if self.mode == "inotify":
+                    raise
+                logging.warning(f"inotify unavailable ({e}); falling back to polling")
+        elif self.mode == "inotify":
+            raise RuntimeError("watchdog is required for PIPELINES_WATCH_MODE=inotify")
+
+        self._poll_task = self._loop.create_task(self._poll())
+        logging.info(f"Watching {self.directory} for pipeline changes (polling)")
+
+    def _start_observer(self):
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # Ignore opened/closed-without-write events; reloading reads files.
+                if event.is_directory or event.event_type not in (
+                    "created",
+                    "modified",
+                    "deleted",
+                    "moved",
+                ):
+                    return
+                for path in (event.src_path, getattr(event, "dest_path", "")):
+                    if path and _watched(path):
+                        watcher._loop.call_soon_threadsafe(watcher._notify, path)
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), self.directory, recursive=True)
+        self._observer.start()
+
+    async def _poll(self):
+        previous = await asyncio.to_thread(snapshot, self.directory)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await asyncio.to_thread(snapshot, self.directory)
+            for path in set(previous) | set(current):
+                if previous.get(path) != current.get(path):
+                    self._notify(path)
+            previous = current
+
+    def _notify(self, path: str):
+        self._pending.add(path)
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = self._loop.call_later(self.debounce, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        paths, self._pending = self._pending, set()
+        task = self._loop.create_task(self._dispatch(paths))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, paths: Set[str]):
+        try:
+            await self.on_change(paths)
+        except Exception:
+            logging.exception("Pipeline reload after file change failed")
+
+    async def stop(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        if self._observer is not None:
+            self._observer.stop()
+            await asyncio.to_thread(self._observer.join)
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+        for task in list(self._tasks):
+            await task